@@ -0,0 +1,59 @@
+"""
+Benchmark ConfigManager update and read throughput
+
+Run from the repository root:
+    python -m benchmarks.bench_config [--rounds 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+from src.config.config_manager import ConfigManager
+
+CHANGES = {
+    "download_frequency": "hourly",
+    "wallpaper_type": "nature",
+    "daily_download_limit": 8,
+    "resolution": "3840x2160",
+    "preview_fetch_count": 12,
+}
+
+def alternate(rounds):
+    """Yield CHANGES with values that differ every round"""
+    for i in range(rounds):
+        yield {key: (value if i % 2 else f"{value}-{i}") for key, value in CHANGES.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--reads', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manager = ConfigManager(os.path.join(directory, 'config.json'))
+        manager.load_config()
+
+        start = time.perf_counter()
+        for changes in alternate(args.rounds):
+            for key, value in changes.items():
+                manager.set_setting(key, value)
+        one_by_one = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for changes in alternate(args.rounds):
+            manager.update_settings(changes)
+        batched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            manager.get_setting('resolution')
+        reads = time.perf_counter() - start
+
+    updates = args.rounds * len(CHANGES)
+    print(f"{args.rounds} rounds of {len(CHANGES)} settings")
+    print(f"  set_setting one by one : {updates / one_by_one:10.0f} settings/s ({one_by_one * 1000:.1f} ms)")
+    print(f"  update_settings batch  : {updates / batched:10.0f} settings/s ({batched * 1000:.1f} ms)")
+    print(f"  get_setting            : {args.reads / reads:10.0f} reads/s")
+
+if __name__ == '__main__':
+    main()
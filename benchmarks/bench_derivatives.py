@@ -0,0 +1,65 @@
+"""
+Benchmark the derivative pipeline against the naive full-decode resize path
+
+Run from the repository root:
+    python -m benchmarks.bench_derivatives [--images 8] [--size 3840x2160]
+"""
+import argparse
+import os
+import tempfile
+import time
+from PIL import Image, ImageOps
+from src.config.settings import RESOLUTION_OPTIONS
+from src.utils.image_utils import _lanczos, derivative_path, generate_derivatives_batch, parse_resolution
+
+def make_originals(directory, count, size):
+    """Write synthetic photo-like JPEG originals"""
+    width, height = size
+    paths = []
+    for i in range(count):
+        noise = Image.effect_noise((width // 4, height // 4), 40 + i).convert('RGB')
+        gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        image = Image.blend(noise.resize((width, height)), gradient, 0.5)
+        path = os.path.join(directory, f'original_{i}.jpg')
+        image.save(path, 'JPEG', quality=92)
+        paths.append(path)
+    return paths
+
+def naive_derivatives(source_path, output_dir, resolutions):
+    """Decode the full original once per size and resize it, one image at a time"""
+    for resolution in resolutions:
+        with Image.open(source_path) as image:
+            image = ImageOps.fit(image.convert('RGB'), parse_resolution(resolution), method=_lanczos())
+            image.save(derivative_path(source_path, resolution, output_dir), 'JPEG', quality=90)
+
+def run(label, resolutions, paths, output_dir):
+    start = time.perf_counter()
+    for path in paths:
+        naive_derivatives(path, output_dir, resolutions)
+    naive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_derivatives_batch(paths, output_dir, resolutions)
+    pipeline = time.perf_counter() - start
+
+    print(f"{label}: {', '.join(resolutions)}")
+    print(f"  naive resize        : {naive * 1000:9.1f} ms")
+    print(f"  draft + process pool: {pipeline * 1000:9.1f} ms")
+    print(f"  speedup             : {naive / pipeline:9.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('--size', default='3840x2160')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_originals(directory, args.images, parse_resolution(args.size))
+        output_dir = os.path.join(directory, 'derivatives')
+        os.makedirs(output_dir)
+        print(f"{args.images} originals at {args.size}, {os.cpu_count()} CPUs")
+        run("All RESOLUTION_OPTIONS", RESOLUTION_OPTIONS, paths, output_dir)
+        run("Screen sizes below the original", ["1920x1080", "1280x720"], paths, output_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Offline benchmark of the fetch and download paths against a local stand-in
+for Bing, Unsplash and their CDNs
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch [--latency 0.05] [--bandwidth 5000000]
+        [--error-rate 0.0] [--image-size 524288] [--requests 40] [--json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.fake_bing_server import FakeBingServer, pointed_at
+from src.downloader.bing_api import fetch_wallpaper_data
+from src.downloader.category_hit_rates import CategoryHitRates, set_default_hit_rates
+from src.downloader.metadata_cache import MetadataCache, set_default_cache
+from src.downloader.providers.bing_provider import BingProvider
+from src.downloader.providers.rate_limiter import configure_rate_limiter
+from src.downloader.providers.unsplash_provider import UnsplashProvider
+from src.downloader.resolution_resolver import ResolutionResolver
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def timed(operation):
+    """Run operation, returns (seconds, result or exception)"""
+    start = time.perf_counter()
+    try:
+        result = operation()
+    except Exception as e:
+        result = e
+    return time.perf_counter() - start, result
+
+def report(name, latencies, wall_time, failures=0, transferred=None):
+    result = {
+        'scenario': name,
+        'operations': len(latencies),
+        'failures': failures,
+        'throughput_ops': len(latencies) / wall_time if wall_time else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) * 1000 if latencies else None,
+        'wall_ms': wall_time * 1000,
+    }
+    if transferred is not None:
+        result['bytes_per_sec'] = transferred / wall_time if wall_time else 0.0
+    return result
+
+def run_serial(name, operation, count, bytes_for=None):
+    latencies = []
+    failures = 0
+    transferred = 0
+    start = time.perf_counter()
+    for i in range(count):
+        elapsed, result = timed(lambda: operation(i))
+        latencies.append(elapsed)
+        if isinstance(result, Exception) or result is False:
+            failures += 1
+        elif bytes_for:
+            transferred += bytes_for(i)
+    wall_time = time.perf_counter() - start
+    return report(name, latencies, wall_time, failures, transferred if bytes_for else None)
+
+def bench_fetch_wallpaper_data(directory, count):
+    cache = MetadataCache(os.path.join(directory, 'cold.json'), ttl=0, max_stale=0)
+    warm = MetadataCache(os.path.join(directory, 'warm.json'))
+
+    results = []
+    previous = set_default_cache(None)
+    for label, active in (('fetch_wallpaper_data (uncached)', cache), ('fetch_wallpaper_data (cached)', warm)):
+        set_default_cache(active)
+        results.append(run_serial(label, lambda i: fetch_wallpaper_data(num=2, wallpaper_type='nature', offset=i % 8), count))
+    set_default_cache(previous)
+    return results
+
+def bench_providers(directory, count):
+    previous = set_default_cache(MetadataCache(os.path.join(directory, 'providers.json'), ttl=0, max_stale=0))
+    for name in ('Bing', 'Unsplash'):
+        configure_rate_limiter(name, rate=1e6, burst=1e6, max_retries=0)
+
+    bing = BingProvider()
+    bing_uhd = BingProvider(resolver=ResolutionResolver(os.path.join(directory, 'variants.json')))
+    unsplash = UnsplashProvider()
+    results = [
+        run_serial('BingProvider.fetch_wallpapers', lambda i: bing.fetch_wallpapers(count=4, offset=i % 8), count),
+        run_serial(
+            'BingProvider.fetch_wallpapers (UHD)',
+            lambda i: bing_uhd.fetch_wallpapers(count=4, resolution='3840x2160', offset=i % 8),
+            count,
+        ),
+        run_serial(
+            'UnsplashProvider.fetch_wallpapers',
+            lambda i: unsplash.fetch_wallpapers(count=10, category='nature', offset=i, api_key='benchmark'),
+            count,
+        ),
+    ]
+    set_default_cache(previous)
+    return results
+
+def bench_downloads(server, directory, count, image_size):
+    urls = [f"{server.url}/th?id=OHR.Bench{i}_EN-US{i}_1920x1080.jpg" for i in range(count)]
+
+    serial = WallpaperDownloader(download_limit=count * 2)
+    result_serial = run_serial(
+        'download_wallpaper (serial)',
+        lambda i: serial.download_wallpaper(urls[i], os.path.join(directory, 'serial', f'{i}.jpg')),
+        count,
+        bytes_for=lambda i: image_size,
+    )
+
+    batch = WallpaperDownloader(download_limit=count * 2, max_workers=8, per_host_limit=8)
+    items = [(url, os.path.join(directory, 'batch', f'{i}.jpg')) for i, url in enumerate(urls)]
+    start = time.perf_counter()
+    outcomes = batch.download_many(items)
+    wall_time = time.perf_counter() - start
+    succeeded = sum(outcome['success'] for outcome in outcomes)
+    # Per-item latency isn't observable inside the batch, report the batch as one operation each
+    result_batch = report(
+        'download_many (8 workers)', [wall_time / count] * count, wall_time,
+        failures=count - succeeded, transferred=succeeded * image_size,
+    )
+    return [result_serial, result_batch]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every response')
+    parser.add_argument('--bandwidth', type=float, default=None, help='bytes per second per connection')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 500')
+    parser.add_argument('--image-size', type=int, default=512 * 1024, help='bytes per 1920x1080 image')
+    parser.add_argument('--requests', type=int, default=40, help='operations per scenario')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    server = FakeBingServer(
+        latency=args.latency, bandwidth=args.bandwidth, error_rate=args.error_rate,
+        image_sizes={'1920x1080': args.image_size},
+    )
+    with server, pointed_at(server), tempfile.TemporaryDirectory() as directory:
+        previous = set_default_hit_rates(CategoryHitRates(os.path.join(directory, 'hit_rates.json')))
+        try:
+            results = []
+            results += bench_fetch_wallpaper_data(directory, args.requests)
+            results += bench_providers(directory, args.requests)
+            results += bench_downloads(server, directory, args.requests, args.image_size)
+        finally:
+            set_default_hit_rates(previous)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"latency={args.latency}s bandwidth={args.bandwidth or 'unlimited'} "
+          f"error_rate={args.error_rate} image_size={args.image_size}B requests={args.requests}")
+    print(f"{'scenario':36s} {'ops/s':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'MB/s':>8s} {'fail':>5s}")
+    for result in results:
+        bytes_per_sec = result.get('bytes_per_sec')
+        mb_per_sec = f"{bytes_per_sec / 1e6:8.2f}" if bytes_per_sec is not None else f"{'-':>8s}"
+        print(f"{result['scenario']:36s} {result['throughput_ops']:9.1f} {result['p50_ms']:8.2f} "
+              f"{result['p99_ms']:8.2f} {mb_per_sec} {result['failures']:5d}")
+    print(f"server: {server.requests} requests, {server.errors} injected errors, "
+          f"{server.bytes_sent / 1e6:.1f} MB sent")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Measure cold-start import time of the provider factory
+
+Each sample runs in a fresh interpreter. "eager" also creates every
+built-in provider, which is what importing the factory used to cost.
+
+Run from the repository root:
+    python -m benchmarks.bench_import_time [--runs 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SNIPPETS = {
+    'interpreter only': "pass",
+    'lazy factory import': "from src.downloader.providers.provider_factory import ProviderFactory",
+    'eager (all providers)': (
+        "from src.downloader.providers.provider_factory import ProviderFactory, BUILTIN_PROVIDERS\n"
+        "[ProviderFactory.get_provider(name) for name in BUILTIN_PROVIDERS]"
+    ),
+}
+
+def sample(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+
+    medians = {}
+    for label, code in SNIPPETS.items():
+        sample(code)  # Warm the filesystem and bytecode caches
+        medians[label] = statistics.median(sample(code) for _ in range(args.runs))
+
+    baseline = medians['interpreter only']
+    for label, median in medians.items():
+        print(f"{label:24s}: {median * 1000:7.1f} ms (+{(median - baseline) * 1000:6.1f} ms over bare interpreter)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Local stand-in for the Bing archive API, the Unsplash search API and their
+image CDNs, with configurable latency, bandwidth, error rate and image sizes
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Bytes served per image variant suffix; anything else gets the default size
+DEFAULT_IMAGE_SIZES = {
+    'UHD': 2 * 1024 * 1024,
+    '1920x1080': 500 * 1024,
+    '320x180': 20 * 1024,
+}
+DEFAULT_IMAGE_SIZE = 500 * 1024
+ARCHIVE_DAYS = 15
+WRITE_BLOCK = 16 * 1024
+
+class FakeBingServer:
+    """
+    Serve HPImageArchive.aspx JSON, /search/photos JSON and image bytes on localhost
+
+    Args:
+        latency: Seconds added before every response
+        bandwidth: Bytes per second per connection (None for unthrottled)
+        error_rate: Fraction of requests answered with a 500
+        image_sizes: Bytes served per image variant suffix
+        seed: Seed for the error injection
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, error_rate=0.0, image_sizes=None, seed=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.image_sizes = dict(DEFAULT_IMAGE_SIZES, **(image_sizes or {}))
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._payloads = {}
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def archive(self, idx, n, mkt):
+        """Build an archive page like HPImageArchive.aspx?format=js returns"""
+        today = date(2025, 4, 6)
+        images = []
+        for day in range(idx, min(idx + n, ARCHIVE_DAYS)):
+            start = today - timedelta(days=day)
+            name = f"OHR.FakeImage{day}"
+            urlbase = f"/th?id={name}_{mkt.upper()}{1000 + day}"
+            images.append({
+                'startdate': start.strftime('%Y%m%d'),
+                'enddate': (start + timedelta(days=1)).strftime('%Y%m%d'),
+                'url': f"{urlbase}_1920x1080.jpg&rf=LaDigue_1920x1080.jpg&pid=hp",
+                'urlbase': urlbase,
+                'copyright': f"Mountain lake and forest number {day} (© Fake Photographer)",
+                'title': f"Scenic valley {day}",
+                'hsh': hashlib.md5(name.encode()).hexdigest(),
+            })
+        return {'images': images}
+
+    def search(self, query, per_page, page):
+        """Build a page like Unsplash's /search/photos returns"""
+        results = []
+        for i in range(per_page):
+            photo_id = f"{query}-{page}-{i}"
+            results.append({
+                'id': photo_id,
+                'description': f"{query} photo {photo_id}",
+                'urls': {
+                    variant: f"{self.url}/photos/{photo_id}_{variant}.jpg"
+                    for variant in ('raw', 'full', 'regular', 'small')
+                },
+            })
+        return {'total': 1000, 'total_pages': 1000 // max(per_page, 1), 'results': results}
+
+    def _image_size(self, path):
+        for suffix, size in self.image_sizes.items():
+            if f"_{suffix}." in path:
+                return size
+        return self.image_sizes.get('default', DEFAULT_IMAGE_SIZE)
+
+    def payload(self, key, size):
+        """Deterministic pseudo-random bytes for an image"""
+        with self._lock:
+            data = self._payloads.get(key)
+            if data is None or len(data) != size:
+                seed = hashlib.sha256(key.encode()).digest()
+                data = (seed * (size // len(seed) + 1))[:size]
+                self._payloads[key] = data
+            return data
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, don't let Nagle delay keep-alive responses
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def _respond(self, send_body):
+                self.send_body = send_body
+                with server._lock:
+                    server.requests += 1
+                    failed = server._random.random() < server.error_rate
+                    if failed:
+                        server.errors += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if failed:
+                    return self._send(500, b'', 'text/plain')
+
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                if parts.path == '/HPImageArchive.aspx':
+                    data = server.archive(int(query.get('idx', 0)), int(query.get('n', 1)), query.get('mkt', 'en-US'))
+                    return self._send(200, json.dumps(data).encode(), 'application/json')
+                if parts.path == '/search/photos':
+                    data = server.search(query.get('query', ''), int(query.get('per_page', 10)), int(query.get('page', 1)))
+                    return self._send(200, json.dumps(data).encode(), 'application/json')
+                if parts.path == '/th' or parts.path.startswith('/photos/'):
+                    key = query.get('id', parts.path)
+                    return self._send_image(server.payload(key, server._image_size(key)))
+                return self._send(404, b'', 'text/plain')
+
+            def _send_image(self, body):
+                start = 0
+                range_header = self.headers.get('Range')
+                if range_header:
+                    start = min(int(range_header.split('=', 1)[1].split('-', 1)[0]), len(body))
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+                else:
+                    self.send_response(200)
+                self._write(body[start:], 'image/jpeg')
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self._write(body, content_type)
+
+            def _write(self, body, content_type):
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not self.send_body:
+                    return
+                for offset in range(0, len(body), WRITE_BLOCK):
+                    block = body[offset:offset + WRITE_BLOCK]
+                    started = time.perf_counter()
+                    self.wfile.write(block)
+                    if server.bandwidth:
+                        remaining = len(block) / server.bandwidth - (time.perf_counter() - started)
+                        if remaining > 0:
+                            time.sleep(remaining)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        return Handler
+
+@contextmanager
+def pointed_at(server):
+    """Point the Bing and Unsplash modules at a FakeBingServer while the block runs"""
+    from src.downloader import bing_api
+    from src.downloader.providers import unsplash_provider
+
+    saved = (bing_api.BING_BASE_URL, bing_api.BING_API_URL, unsplash_provider.UNSPLASH_API_URL)
+    bing_api.BING_BASE_URL = server.url
+    bing_api.BING_API_URL = f"{server.url}/HPImageArchive.aspx"
+    unsplash_provider.UNSPLASH_API_URL = server.url
+    try:
+        yield server
+    finally:
+        bing_api.BING_BASE_URL, bing_api.BING_API_URL, unsplash_provider.UNSPLASH_API_URL = saved
\ No newline at end of file
@@ -12,6 +12,7 @@ setup(
         'requests',
         'Pillow',
         'schedule',
+        'numpy',
     ],
     entry_points={
         'console_scripts': [
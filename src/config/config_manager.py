@@ -1,26 +1,105 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from .settings import (
+    DEFAULT_RETENTION_POLICY, DEFAULT_STORAGE_MAX_BYTES, DEFAULT_STORAGE_MAX_FILES, DEFAULT_TRANSCODE_FORMAT,
+    DEFAULT_TRANSCODE_QUALITY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Type of every known setting, used to build the typed settings view
+SETTING_TYPES = {
+    "download_frequency": str,
+    "wallpaper_type": str,
+    "daily_download_limit": int,
+    "manual_download": bool,
+    "resolution": str,
+    "save_location": str,
+    "preview_fetch_count": int,
+    "storage_max_bytes": int,
+    "storage_max_files": int,
+    "retention_policy": str,
+    "transcode_format": str,
+    "transcode_quality": int,
+}
+
+Settings = namedtuple('Settings', list(SETTING_TYPES))
+
+DEFAULT_RELOAD_INTERVAL = 1.0  # Seconds between checks of the config file's mtime
+
+def _coerce(value, setting_type):
+    if value is None:
+        return None
+    if setting_type is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    try:
+        return setting_type(value)
+    except (TypeError, ValueError):
+        return value
+
+class _Batch:
+    saved = True
+
 class ConfigManager:
-    def __init__(self, config_file='config.json'):
+    def __init__(self, config_file='config.json', reload_interval=DEFAULT_RELOAD_INTERVAL):
         self.config_file = config_file
         self.config = {}
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._batch_depth = 0
+        self._dirty = False
+        self._snapshot = {}
+        self._file_state = None
+        self._next_check = 0.0
+        self._settings = None
 
-    def load_config(self):
-        import json
+    def _stat_file(self):
         try:
-            with open(self.config_file, 'r') as file:
-                self.config = json.load(file)
-        except FileNotFoundError:
-            self.config = self.default_config()
-            self.save_config()
+            stat = os.stat(self.config_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def load_config(self):
+        old_config = self._load()
+        self._notify(old_config, self.config)
+        return self.config
+
+    def _load(self):
+        """Read the config file, returns the previous config (listeners are not notified)"""
+        with self._lock:
+            old_config = self.config
+            try:
+                with open(self.config_file, 'r') as file:
+                    self.config = json.load(file)
+                self._file_state = self._stat_file()
+            except FileNotFoundError:
+                self.config = self.default_config()
+                self.save_config()
+            self._settings = None
+            self._next_check = time.monotonic() + self.reload_interval
+            return old_config
 
     def save_config(self):
-        import json
-        try:
-            with open(self.config_file, 'w') as file:
-                json.dump(self.config, file, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving config: {str(e)}")
-            return False
+        """Write the config atomically (temp file + rename)"""
+        with self._lock:
+            temp_file = f"{self.config_file}.tmp"
+            try:
+                with open(temp_file, 'w') as file:
+                    json.dump(self.config, file, indent=4)
+                os.replace(temp_file, self.config_file)
+                self._file_state = self._stat_file()
+                self._dirty = False
+                return True
+            except Exception as e:
+                logger.error("Error saving config: %s", e)
+                return False
 
     def default_config(self):
         return {
@@ -29,12 +108,145 @@ class ConfigManager:
             "daily_download_limit": 5,
             "manual_download": False,
             "resolution": "1920x1080",
-            "preview_fetch_count": 8  # NEW default fetch count
+            "preview_fetch_count": 8,  # NEW default fetch count
+            "storage_max_bytes": DEFAULT_STORAGE_MAX_BYTES,
+            "storage_max_files": DEFAULT_STORAGE_MAX_FILES,
+            "retention_policy": DEFAULT_RETENTION_POLICY,
+            "transcode_format": DEFAULT_TRANSCODE_FORMAT,
+            "transcode_quality": DEFAULT_TRANSCODE_QUALITY,
         }
 
+    def _maybe_reload(self):
+        """
+        Reload the file if another process changed it, checking at most once per reload_interval
+
+        Call with the lock held and pass the result to _notify_reload once it
+        is released, so listeners never run under the lock.
+
+        Returns:
+            (old config, new config) if the file was reloaded, otherwise None
+        """
+        now = time.monotonic()
+        if now < self._next_check or self._batch_depth:
+            return None
+        self._next_check = now + self.reload_interval
+        state = self._stat_file()
+        if state is not None and state != self._file_state:
+            try:
+                return self._load(), self.config
+            except ValueError as e:
+                # Caught mid-write by a non-atomic writer, keep the current values
+                logger.warning("Error reloading config: %s", e)
+        return None
+
+    def _notify_reload(self, reloaded):
+        if reloaded:
+            self._notify(*reloaded)
+
     def get_setting(self, key):
-        return self.config.get(key)
+        with self._lock:
+            reloaded = self._maybe_reload()
+            value = self.config.get(key)
+        self._notify_reload(reloaded)
+        return value
+
+    @property
+    def settings(self):
+        """Typed, read-only view of the current settings"""
+        with self._lock:
+            reloaded = self._maybe_reload()
+            if self._settings is None:
+                defaults = self.default_config()
+                self._settings = Settings(**{
+                    key: _coerce(self.config.get(key, defaults.get(key)), setting_type)
+                    for key, setting_type in SETTING_TYPES.items()
+                })
+            settings = self._settings
+        self._notify_reload(reloaded)
+        return settings
 
     def set_setting(self, key, value):
-        self.config[key] = value
-        self.save_config()
\ No newline at end of file
+        return self.update_settings({key: value})
+
+    def update_settings(self, values):
+        """
+        Apply several settings with a single write
+
+        Returns:
+            False if saving failed (always True inside batch_update, where
+            the write happens when the block exits)
+        """
+        with self.batch_update() as batch:
+            with self._lock:
+                for key, value in values.items():
+                    if key not in self.config or self.config[key] != value:
+                        self.config[key] = value
+                        self._dirty = True
+                        self._settings = None
+        return batch.saved
+
+    @contextmanager
+    def batch_update(self):
+        """
+        Group set_setting/update_settings calls into one transaction
+
+        Changes are written once, and listeners notified, when the outermost
+        block exits. If a block raises, the config is rolled back to where
+        that block started (a caught failure of a nested block keeps the
+        outer block's changes), and nothing is written for it. If the write
+        fails, all the changes are rolled back and listeners aren't notified.
+        """
+        batch = _Batch()
+        with self._lock:
+            # Every nesting level rolls back to its own starting point
+            snapshot = dict(self.config)
+            dirty = self._dirty
+            if self._batch_depth == 0:
+                self._snapshot = snapshot
+            self._batch_depth += 1
+        try:
+            yield batch
+        except BaseException:
+            with self._lock:
+                self._batch_depth -= 1
+                self.config = snapshot
+                self._dirty = dirty
+                self._settings = None
+            raise
+        with self._lock:
+            self._batch_depth -= 1
+            if self._batch_depth or not self._dirty:
+                return
+            old_config = self._snapshot
+            if self.config == old_config:
+                # Only rolled-back nested changes, nothing to write
+                self._dirty = False
+                return
+            batch.saved = self.save_config()
+            if not batch.saved:
+                # Keep memory in line with the file, listeners never saw these changes
+                self.config = dict(old_config)
+                self._dirty = False
+                self._settings = None
+                return
+        self._notify(old_config, self.config)
+
+    def add_listener(self, callback):
+        """Call callback(changes) with a dict of changed keys whenever settings change"""
+        self._listeners.append(callback)
+
+    def _notify(self, old_config, new_config):
+        if not self._listeners:
+            return
+        changes = {
+            key: new_config.get(key)
+            for key in set(old_config) | set(new_config)
+            if old_config.get(key) != new_config.get(key) or (key in old_config) != (key in new_config)
+        }
+        if not changes:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.exception("Error in config listener: %s", e)
\ No newline at end of file
@@ -15,6 +15,7 @@ WALLPAPER_TYPES = [
     "travel"
 ]
 DAILY_DOWNLOAD_LIMIT = 5  # Default limit for daily downloads
+DEFAULT_SAVE_LOCATION = "data/wallpapers"  # Used when save_location isn't set
 RESOLUTION_OPTIONS = ["1920x1080", "2560x1440", "3840x2160"]  # Available resolution options
 MANUAL_DOWNLOAD_OPTION = True  # Allow manual download of wallpapers
 
@@ -35,3 +36,42 @@ DEFAULT_API_KEYS = {
     "Pexels": "", 
     "Pixabay": ""
 }
+
+# Bing markets queried by the archive crawler
+BING_MARKETS = [
+    "en-US",
+    "en-GB",
+    "en-CA",
+    "en-AU",
+    "en-IN",
+    "de-DE",
+    "fr-FR",
+    "ja-JP",
+    "zh-CN"
+]
+
+# (idx, n) archive windows queried per market; Bing serves at most 8 images
+# per call and stops going back after idx 7, so these cover ~15 days
+BING_ARCHIVE_WINDOWS = [(0, 8), (7, 8)]
+
+# Request pacing per provider: sustained requests per second and burst size.
+# Unsplash's demo tier allows 50 requests per hour.
+PROVIDER_RATE_LIMITS = {
+    "Bing": {"rate": 2.0, "burst": 5},
+    "Unsplash": {"rate": 50 / 3600, "burst": 5},
+    "Pexels": {"rate": 200 / 3600, "burst": 5},
+    "Pixabay": {"rate": 100 / 60, "burst": 10}
+}
+
+# Library retention: byte and file-count budget for downloaded wallpapers
+# (0 for no limit) and which files are evicted first ("lru" or "age").
+# Favorites are never evicted.
+DEFAULT_STORAGE_MAX_BYTES = 0
+DEFAULT_STORAGE_MAX_FILES = 0
+RETENTION_POLICIES = ["lru", "age"]
+DEFAULT_RETENTION_POLICY = "lru"
+
+# Background re-encoding of downloaded wallpapers ("" to keep the originals)
+TRANSCODE_FORMATS = ["", "webp", "avif"]
+DEFAULT_TRANSCODE_FORMAT = ""
+DEFAULT_TRANSCODE_QUALITY = 80
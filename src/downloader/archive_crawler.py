@@ -0,0 +1,98 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from .bing_api import fetch_archive_page, matches_category
+from ..config.settings import BING_ARCHIVE_WINDOWS, BING_MARKETS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+# Market suffix Bing appends to urlbase, e.g. "/th?id=OHR.Name_EN-US1234567890"
+_MARKET_SUFFIX = re.compile(r'_[A-Za-z]{2}-[A-Za-z]{2}\d*$')
+
+def _image_keys(image):
+    """Return the identities of an archive entry that are stable across markets"""
+    keys = []
+    if image.get('hsh'):
+        keys.append(('hsh', image['hsh']))
+    urlbase = image.get('urlbase')
+    if urlbase:
+        keys.append(('urlbase', _MARKET_SUFFIX.sub('', urlbase)))
+    elif image.get('url'):
+        keys.append(('url', image['url']))
+    return keys
+
+class ArchiveCrawler:
+    """
+    Query several Bing markets and archive windows concurrently
+
+    All pages are fetched in parallel over one pooled session (through the
+    metadata cache) and merged into a single catalog, deduplicated by hsh and
+    market-independent urlbase and ordered newest first.
+    """
+
+    def __init__(self, markets=None, windows=None, max_workers=DEFAULT_MAX_WORKERS, cache=None, requester=None):
+        self.markets = list(markets or BING_MARKETS)
+        self.windows = list(windows or BING_ARCHIVE_WINDOWS)
+        self.max_workers = max_workers
+        self.cache = cache
+        if requester is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            requester = session.get
+        self.requester = requester
+
+    def _fetch(self, job):
+        mkt, idx, n = job
+        try:
+            return fetch_archive_page(idx=idx, n=n, mkt=mkt, cache=self.cache, requester=self.requester)
+        except Exception as e:
+            logger.warning("Error fetching Bing archive for %s idx=%s: %s", mkt, idx, e)
+            return None
+
+    def crawl(self, category='all'):
+        """
+        Fetch every configured (market, window) page and merge the results
+
+        Args:
+            category: Only keep images matching this category
+
+        Returns:
+            List of image dicts ordered by startdate (newest first). Each
+            image carries 'mkt' (first market it was found in) and 'markets'.
+        """
+        jobs = [(mkt, idx, n) for mkt in self.markets for idx, n in self.windows]
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(self._fetch, jobs))
+
+        catalog = []
+        seen = {}
+        for (mkt, _, _), data in zip(jobs, pages):
+            if not data:
+                continue
+            for image in data.get('images', []):
+                keys = _image_keys(image)
+                existing = next((seen[key] for key in keys if key in seen), None)
+                if existing is not None:
+                    if mkt not in existing['markets']:
+                        existing['markets'].append(mkt)
+                    for key in keys:
+                        seen.setdefault(key, existing)
+                    continue
+                if not matches_category(image, category):
+                    continue
+                entry = dict(image, mkt=mkt, markets=[mkt])
+                catalog.append(entry)
+                for key in keys:
+                    seen[key] = entry
+
+        # Stable sort keeps market/window order among images of the same day
+        catalog.sort(key=lambda image: image.get('startdate', ''), reverse=True)
+        logger.debug("Crawled %d archive pages, %d unique images", len(jobs), len(catalog))
+        return catalog
\ No newline at end of file
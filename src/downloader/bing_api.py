@@ -1,7 +1,19 @@
+import logging
 import requests
 import random
+from .category_classifier import CategoryClassifier
+from .category_hit_rates import get_default_hit_rates
+from .metadata_cache import get_default_cache
+from .resolution_resolver import get_default_resolver
+from ..utils.metrics import metrics
 
-BING_API_URL = "https://www.bing.com/HPImageArchive.aspx"
+logger = logging.getLogger(__name__)
+
+BING_BASE_URL = "https://www.bing.com"
+BING_API_URL = f"{BING_BASE_URL}/HPImageArchive.aspx"
+# The archive endpoint returns at most 8 images per call and ignores idx beyond 7
+BING_MAX_IMAGES = 8
+BING_MAX_IDX = 7
 
 # Keywords associated with each category for filtering
 CATEGORY_KEYWORDS = {
@@ -25,6 +37,8 @@ EXCLUDE_KEYWORDS = {
     "landscape": ["animal", "person", "people", "building"]
 }
 
+_classifier = CategoryClassifier(CATEGORY_KEYWORDS, EXCLUDE_KEYWORDS)
+
 def matches_category(image_data, category):
     """
     Check if an image matches a given category based on its metadata
@@ -36,37 +50,99 @@ def matches_category(image_data, category):
     Returns:
         Boolean indicating if image matches category
     """
-    # If category is "all", always match
-    if category == "all":
-        return True
-        
-    # Get title, copyright, and description (all lowercase)
-    title = image_data.get('title', '').lower()
-    copyright_text = image_data.get('copyright', '').lower()
-    description = image_data.get('desc', '').lower()
+    return _classifier.matches(image_data, category)
+
+def classify_many(images):
+    """
+    Classify a batch of images against every category in one pass each
     
-    # Combine all text fields for searching
-    combined_text = f"{title} {copyright_text} {description}"
+    Args:
+        images: List of image data from Bing API
     
-    # Check if any keywords for this category are in the text
-    keywords = CATEGORY_KEYWORDS.get(category, [])
-    excludes = EXCLUDE_KEYWORDS.get(category, [])
+    Returns:
+        List of category sets, one per image
+    """
+    return _classifier.classify_many(images)
+
+def bing_url(path):
+    """Turn a path from the archive response into an absolute URL"""
+    return f"{BING_BASE_URL}{path}"
+
+def fetch_archive_page(idx=0, n=8, mkt='en-US', cache=None, requester=None):
+    """
+    Fetch one raw page of the Bing image archive, served from the metadata cache when possible
+
+    Args:
+        idx: Archive offset (0 = today)
+        n: Number of images in the page
+        mkt: Market code
+        cache: MetadataCache to use (defaults to the shared cache)
+        requester: Callable with the requests.get signature used on a cache miss
+
+    Returns:
+        JSON data as returned by the archive endpoint
+    """
+    params = {
+        'format': 'js',
+        'idx': idx,
+        'n': n,
+        'mkt': mkt,
+    }
+    cache = cache or get_default_cache()
+    with metrics.timer('bing_api_fetch_seconds'):
+        return cache.fetch(BING_API_URL, params, requester=requester)
+
+def collect_images(num, category='all', offset=0, mkt='en-US', requester=None, hit_rates=None):
+    """
+    Collect num archive images matching category in as few API calls as possible
+    
+    Each request is sized from the category's observed hit rate, and further
+    idx windows are only walked while matches are still missing. The result
+    is short only when the whole archive doesn't hold num matches.
     
-    # Check if any exclude keywords are in the text
-    for word in excludes:
-        if word in combined_text:
-            return False
+    Args:
+        num: Number of matching images wanted
+        category: Category to filter by ('all' for no filtering)
+        offset: Archive idx to start from (0 = most recent)
+        mkt: Bing market to query
+        requester: Callable with the requests.get signature used on a cache miss
+        hit_rates: CategoryHitRates to size requests with (defaults to the shared one)
     
-    # Must match at least one keyword
-    if keywords:
-        for word in keywords:
-            if word in combined_text:
-                return True
-        return False  # No keywords matched
+    Returns:
+        List of raw image dicts from the archive response
+    """
+    hit_rates = hit_rates or get_default_hit_rates()
+    idx = min(offset, BING_MAX_IDX)
+    collected = []
+    seen = set()
     
-    return True  # No keywords to filter by
+    while len(collected) < num:
+        needed = num - len(collected)
+        n = hit_rates.request_size(category, needed, BING_MAX_IMAGES)
+        if idx == BING_MAX_IDX:
+            # Last window Bing serves, take everything it has
+            n = BING_MAX_IMAGES
+        logger.debug("Fetching from Bing API with idx=%d, n=%d", idx, n)
+        
+        images = fetch_archive_page(idx=idx, n=n, mkt=mkt, requester=requester).get('images', [])
+        fresh = [image for image in images if (image.get('hsh') or image.get('url')) not in seen]
+        seen.update(image.get('hsh') or image.get('url') for image in fresh)
+        
+        if category == 'all':
+            matched = fresh
+        else:
+            with metrics.timer('category_filter_seconds'):
+                matched = [image for image in fresh if matches_category(image, category)]
+            hit_rates.record(category, len(fresh), len(matched))
+        collected.extend(matched[:needed])
+        
+        if not images or idx == BING_MAX_IDX:
+            break
+        idx = min(idx + len(images), BING_MAX_IDX)
+    
+    return collected
 
-def fetch_wallpaper_data(num=1, resolution='1920x1080', wallpaper_type='all', offset=0):
+def fetch_wallpaper_data(num=1, resolution='1920x1080', wallpaper_type='all', offset=0, mkt='en-US'):
     """
     Fetch wallpaper data from Bing API and filter by type
     
@@ -75,66 +151,63 @@ def fetch_wallpaper_data(num=1, resolution='1920x1080', wallpaper_type='all', of
         resolution: Image resolution
         wallpaper_type: Type of wallpaper (nature, architecture, etc.)
         offset: Offset for image pagination (0 = most recent)
+        mkt: Bing market to query
     
     Returns:
         JSON data containing filtered wallpaper information
     """
-    # Request more images to allow for filtering
-    request_count = max(num * 3, 8)  # Get at least 3x what we need
-    
-    # Use the provided offset but ensure within API limits
-    idx = min(offset, 16)
-    
-    params = {
-        'format': 'js',
-        'idx': idx,
-        'n': request_count,  # Request more to allow for filtering
-        'mkt': 'en-US',
-    }
-    
-    print(f"Fetching from Bing API with idx={idx}, n={request_count}")
-    
-    response = requests.get(BING_API_URL, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        
-        # If we're not filtering by type, return raw data
-        if wallpaper_type == "all":
-            # Still cap at requested number
-            if 'images' in data:
-                data['images'] = data['images'][:num]
-            return data
-            
-        # Filter images by type
-        if 'images' in data:
-            filtered_images = []
-            
-            for image in data['images']:
-                if matches_category(image, wallpaper_type):
-                    filtered_images.append(image)
-                    # Stop once we have enough
-                    if len(filtered_images) >= num:
-                        break
-            
-            # Replace with filtered images
-            data['images'] = filtered_images
-            print(f"Found {len(filtered_images)} images matching type '{wallpaper_type}'")
-            return data
-        
-        return data
-    else:
-        response.raise_for_status()
+    images = collect_images(num, category=wallpaper_type, offset=offset, mkt=mkt)
+    if wallpaper_type != 'all':
+        logger.debug("Found %d images matching type '%s'", len(images), wallpaper_type)
+    return {'images': images}
 
-def get_wallpaper_url(wallpaper_data):
-    """Extract the wallpaper URL from the API response"""
+def get_wallpaper_url(wallpaper_data, resolution=None, resolver=None):
+    """
+    Extract the wallpaper URL from the API response
+    
+    Args:
+        wallpaper_data: JSON data from fetch_wallpaper_data
+        resolution: Requested "WIDTHxHEIGHT"; picks the best fitting urlbase
+            variant (e.g. _UHD.jpg for 3840x2160) instead of the default image
+        resolver: ResolutionResolver to use (defaults to the shared one)
+    """
     if 'images' in wallpaper_data and len(wallpaper_data['images']) > 0:
         image = wallpaper_data['images'][0]
-        # Add proper resolution formatting to URL
-        base_url = f"https://www.bing.com{image['url']}"
-        # Resolution is typically already embedded in the URL
-        return base_url
+        if resolution:
+            resolver = resolver or get_default_resolver()
+            return resolver.resolve(image, resolution, base_url=BING_BASE_URL)
+        return bing_url(image['url'])
     return None
 
+def bing_date(startdate):
+    """Turn Bing's '20250406' startdate into an ISO date ('2025-04-06')"""
+    if startdate and len(startdate) == 8 and startdate.isdigit():
+        return f"{startdate[:4]}-{startdate[4:6]}-{startdate[6:]}"
+    return startdate
+
+def image_metadata(image, category=None, resolution=None):
+    """
+    Collect the catalog metadata of one image from the API response
+    
+    Args:
+        image: One entry of the 'images' list
+        category: Category the image was fetched for
+        resolution: Requested resolution
+    
+    Returns:
+        Dict usable as WallpaperCatalog metadata
+    """
+    return {
+        'provider': 'Bing',
+        'category': category,
+        'resolution': resolution,
+        'date': bing_date(image.get('startdate')),
+        'title': image.get('title', ''),
+        'copyright': image.get('copyright', ''),
+        'description': image.get('desc', ''),
+        'hsh': image.get('hsh'),
+    }
+
 def get_wallpaper_title(wallpaper_data):
     """Extract the wallpaper title from the API response"""
     if 'images' in wallpaper_data and len(wallpaper_data['images']) > 0:
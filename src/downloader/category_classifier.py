@@ -0,0 +1,101 @@
+import re
+
+# Suffixes accepted after a keyword, so "tree" also matches "trees"
+PLURAL_SUFFIXES = ('', 's', 'es')
+
+# Upper bound on remembered keyword combinations
+MAX_MEMO_SIZE = 4096
+
+_WORD_RE = re.compile(r"\w+")
+
+class CategoryClassifier:
+    """
+    Classify archive entries against every category in a single pass
+
+    Keywords are compiled once into a lookup of whole words (plus their
+    plural forms), and each entry is tokenized once and intersected with it.
+    Matching has word-boundary semantics, so "sea" matches "sea" and "seas"
+    but not "season". Multi-word keywords go through one compiled regex
+    alternation.
+    """
+
+    def __init__(self, category_keywords, exclude_keywords=None):
+        exclude_keywords = exclude_keywords or {}
+        self.categories = set(category_keywords) | set(exclude_keywords)
+        self._includes = {}
+        self._excludes = {}
+        # Categories without include keywords match anything that isn't excluded
+        self._unfiltered = frozenset(
+            category for category in self.categories
+            if not category_keywords.get(category)
+        )
+
+        for category, words in category_keywords.items():
+            for word in words:
+                self._includes.setdefault(word.lower(), set()).add(category)
+        for category, words in exclude_keywords.items():
+            for word in words:
+                self._excludes.setdefault(word.lower(), set()).add(category)
+
+        # Map every accepted word form back to its keyword
+        self._forms = {}
+        phrases = []
+        for word in set(self._includes) | set(self._excludes):
+            if _WORD_RE.fullmatch(word):
+                for suffix in PLURAL_SUFFIXES:
+                    self._forms.setdefault(word + suffix, word)
+            else:
+                phrases.append(word)
+
+        if phrases:
+            alternation = '|'.join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+            self._phrase_pattern = re.compile(rf"\b({alternation})(?:s|es)?\b")
+        else:
+            self._phrase_pattern = None
+
+        # Category sets for keyword combinations already seen
+        self._memo = {}
+
+    def _keywords_in(self, image_data):
+        text = f"{image_data.get('title') or ''} {image_data.get('copyright') or ''} {image_data.get('desc') or ''}".lower()
+        forms = self._forms
+        found = {forms[token] for token in forms.keys() & _WORD_RE.findall(text)}
+        if self._phrase_pattern is not None:
+            found.update(self._phrase_pattern.findall(text))
+        return frozenset(found)
+
+    def _categories_for(self, keywords):
+        included = set()
+        excluded = set()
+        for word in keywords:
+            included.update(self._includes.get(word, ()))
+            excluded.update(self._excludes.get(word, ()))
+        return frozenset((included | self._unfiltered) - excluded)
+
+    def classify(self, image_data):
+        """
+        Return the set of categories an image belongs to
+
+        Args:
+            image_data: Image data from Bing API
+
+        Returns:
+            Frozen set of category names
+        """
+        keywords = self._keywords_in(image_data)
+        categories = self._memo.get(keywords)
+        if categories is None:
+            if len(self._memo) >= MAX_MEMO_SIZE:
+                self._memo.clear()
+            categories = self._memo[keywords] = self._categories_for(keywords)
+        return categories
+
+    def classify_many(self, images):
+        """Classify a batch of images, returns one category set per image"""
+        return [self.classify(image) for image in images]
+
+    def matches(self, image_data, category):
+        """Check if an image matches a given category"""
+        if category == "all" or category not in self.categories:
+            return True
+        return category in self.classify(image_data)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import json
+import logging
+import math
+import os
+import threading
+
+DEFAULT_STATS_FILE = os.path.join('data', 'cache', 'category_hit_rates.json')
+# Prior belief before anything is observed: 1 match in 3 images, the old fixed 3x over-fetch
+PRIOR_MATCHES = 1.0
+PRIOR_SEEN = 3.0
+# Once this many images were seen, older observations are halved so the rate follows recent archives
+MAX_SEEN = 500.0
+# Ask for a little more than the expected need so one request usually suffices
+SAFETY_FACTOR = 1.25
+
+logger = logging.getLogger(__name__)
+
+class CategoryHitRates:
+    """
+    Persistent per-category fraction of archive images that match the category
+
+    Used to size archive requests: a category that matches half of all
+    images needs about twice as many images requested as results wanted.
+    """
+
+    def __init__(self, stats_file=DEFAULT_STATS_FILE):
+        self.stats_file = stats_file
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._stats is not None:
+            return
+        try:
+            with open(self.stats_file, 'r') as file:
+                self._stats = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self._stats = {}
+
+    def _save(self):
+        if not self.stats_file:
+            return
+        directory = os.path.dirname(self.stats_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.stats_file}.tmp"
+        try:
+            with open(temp_file, 'w') as file:
+                json.dump(self._stats, file)
+            os.replace(temp_file, self.stats_file)
+        except OSError as e:
+            logger.warning("Error saving category hit rates: %s", e)
+
+    def rate(self, category):
+        """Smoothed fraction of images matching category (1.0 for 'all')"""
+        if category == 'all':
+            return 1.0
+        with self._lock:
+            self._load()
+            stats = self._stats.get(category, {})
+            matched = stats.get('matched', 0) + PRIOR_MATCHES
+            seen = stats.get('seen', 0) + PRIOR_SEEN
+        return matched / seen
+
+    def record(self, category, seen, matched):
+        """Record that matched of seen archive images belonged to category"""
+        if category == 'all' or not seen:
+            return
+        with self._lock:
+            self._load()
+            stats = self._stats.setdefault(category, {'seen': 0, 'matched': 0})
+            stats['seen'] += seen
+            stats['matched'] += matched
+            if stats['seen'] > MAX_SEEN:
+                stats['seen'] /= 2
+                stats['matched'] /= 2
+            self._save()
+
+    def request_size(self, category, needed, maximum):
+        """
+        Number of images to request to get needed matches in one call
+
+        Args:
+            category: Category being filtered for
+            needed: Matching images still wanted
+            maximum: Largest request the API serves
+        """
+        if needed <= 0:
+            return 0
+        wanted = math.ceil(needed * SAFETY_FACTOR / self.rate(category)) if category != 'all' else needed
+        # Round up to a power of two so small rate changes don't change the
+        # request, which would also miss the metadata cache
+        return min(maximum, 1 << (max(1, wanted) - 1).bit_length())
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            return {category: dict(values) for category, values in self._stats.items()}
+
+_default_hit_rates = None
+
+def get_default_hit_rates():
+    """Return the process-wide category hit rates"""
+    global _default_hit_rates
+    if _default_hit_rates is None:
+        _default_hit_rates = CategoryHitRates()
+    return _default_hit_rates
+
+def set_default_hit_rates(hit_rates):
+    """
+    Replace the process-wide category hit rates (e.g. with temporary ones in tests)
+
+    Args:
+        hit_rates: The new CategoryHitRates, or None to create default ones on next use
+
+    Returns:
+        The previous hit rates, to restore them later
+    """
+    global _default_hit_rates
+    previous, _default_hit_rates = _default_hit_rates, hit_rates
+    return previous
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_QUOTA_FILE = os.path.join('data', 'download_quota.sqlite')
+# A reservation whose worker died without committing or releasing it
+# stops counting against the limit after this many seconds
+DEFAULT_RESERVATION_TTL = 15 * 60
+BUSY_TIMEOUT_MS = 10000
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp).date().isoformat()
+
+class MemoryQuota:
+    """
+    Daily download quota kept in process memory
+
+    Every WallpaperDownloader in the process that shares the instance shares
+    the quota; it starts from zero again when the process restarts.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._day = _day(clock())
+        self._used = 0
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def _roll_over(self):
+        today = _day(self.clock())
+        if today != self._day:
+            self._day = today
+            self._used = 0
+
+    def reserve(self, limit):
+        """
+        Reserve one download slot for today
+
+        Returns:
+            A token to pass to commit/release, or None if the limit is reached
+        """
+        with self._lock:
+            self._roll_over()
+            if self._used + self._reserved >= limit:
+                return None
+            self._reserved += 1
+            return self._day
+
+    def commit(self, token):
+        """Turn a reservation into a completed download"""
+        with self._lock:
+            self._reserved -= 1
+            self._roll_over()
+            if token == self._day:
+                self._used += 1
+
+    def release(self, token):
+        """Give a reserved slot back after a failed download"""
+        with self._lock:
+            self._reserved -= 1
+
+    def renew(self, token):
+        """Keep a reservation alive during a long download (they never expire here)"""
+        return True
+
+    def used_today(self):
+        with self._lock:
+            self._roll_over()
+            return self._used
+
+    def close(self):
+        pass
+
+class SQLiteQuota:
+    """
+    Daily download quota shared by every process using the same database
+
+    The database runs in WAL mode so reads never block. Reservations take
+    SQLite's write lock only for one short BEGIN IMMEDIATE transaction, so
+    N concurrent workers can't overshoot the limit between them. A
+    reservation has an expiry, so a worker that crashes mid-download
+    gives its slot back once the expiry passes.
+    """
+
+    def __init__(self, db_file=DEFAULT_QUOTA_FILE, reservation_ttl=DEFAULT_RESERVATION_TTL, clock=time.time):
+        self.db_file = db_file
+        self.reservation_ttl = reservation_ttl
+        self.clock = clock
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            db_file, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT PRIMARY KEY,
+                used INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reservations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reservations_day ON reservations (day, expires_at);
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, work):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def reserve(self, limit):
+        """
+        Atomically reserve one download slot for today across all processes
+
+        Returns:
+            A token to pass to commit/release, or None if the limit is reached
+        """
+        now = self.clock()
+        today = _day(now)
+
+        def work(conn):
+            conn.execute("DELETE FROM reservations WHERE expires_at <= ?", (now,))
+            row = conn.execute("SELECT used FROM usage WHERE day = ?", (today,)).fetchone()
+            used = row[0] if row else 0
+            reserved = conn.execute(
+                "SELECT COUNT(*) FROM reservations WHERE day = ?", (today,)
+            ).fetchone()[0]
+            if used + reserved >= limit:
+                return None
+            cursor = conn.execute(
+                "INSERT INTO reservations (day, expires_at) VALUES (?, ?)",
+                (today, now + self.reservation_ttl),
+            )
+            return cursor.lastrowid
+
+        return self._transaction(work)
+
+    def commit(self, token):
+        """Turn a reservation into a completed download"""
+        def work(conn):
+            row = conn.execute("SELECT day FROM reservations WHERE id = ?", (token,)).fetchone()
+            # An expired reservation was already swept, count it for today
+            day = row[0] if row else _day(self.clock())
+            conn.execute("DELETE FROM reservations WHERE id = ?", (token,))
+            conn.execute(
+                "INSERT INTO usage (day, used) VALUES (?, 1) "
+                "ON CONFLICT(day) DO UPDATE SET used = used + 1",
+                (day,),
+            )
+
+        self._transaction(work)
+
+    def release(self, token):
+        """Give a reserved slot back after a failed download"""
+        with self._lock:
+            self._conn.execute("DELETE FROM reservations WHERE id = ?", (token,))
+
+    def renew(self, token):
+        """
+        Push a reservation's expiry reservation_ttl seconds ahead again
+
+        Downloads that may outlast the TTL (slow UHD transfers) call this
+        while they run, so their slot isn't swept and handed out twice.
+
+        Returns:
+            False if the reservation had already expired
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE reservations SET expires_at = ? WHERE id = ?",
+                (self.clock() + self.reservation_ttl, token),
+            )
+            return cursor.rowcount > 0
+
+    def used_today(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT used FROM usage WHERE day = ?", (_day(self.clock()),)
+            ).fetchone()
+        return row[0] if row else 0
@@ -0,0 +1,181 @@
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = os.path.join('data', 'cache', 'bing_metadata.json')
+DEFAULT_TTL = 3600  # Serve without revalidating for an hour
+DEFAULT_MAX_STALE = 7 * 24 * 3600  # Serve stale data for up to a week if upstream is down
+
+class MetadataCache:
+    """
+    Persistent cache for Bing archive metadata keyed by (idx, n, mkt)
+
+    Fresh entries are served straight from the cache. Expired entries are
+    revalidated with ETag/If-Modified-Since, and the cached copy is served
+    when the upstream answers 304 or cannot be reached.
+    """
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL, max_stale=DEFAULT_MAX_STALE):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale_served = 0
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(idx, n, mkt):
+        return f"{idx}|{n}|{mkt}"
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        if not self.cache_file:
+            # Memory-only cache, see _save
+            self._entries = {}
+            return
+        try:
+            with open(self.cache_file, 'r') as file:
+                self._entries = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w') as file:
+                json.dump(self._entries, file)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning("Error saving metadata cache: %s", e)
+
+    def fetch(self, url, params, requester=None, timeout=10):
+        """
+        Fetch archive metadata, going to the network only when needed
+
+        Args:
+            url: Archive endpoint URL
+            params: Query parameters, must include idx, n and mkt
+            requester: Callable with the requests.get signature
+            timeout: Request timeout in seconds
+
+        Returns:
+            Decoded JSON data (a copy that callers may modify)
+        """
+        requester = requester or requests.get
+        key = self.make_key(params.get('idx', 0), params.get('n', 1), params.get('mkt', ''))
+
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry and now - entry['fetched_at'] < self.ttl:
+                self.hits += 1
+                metrics.incr('metadata_cache_requests_total', result='hit')
+                return copy.deepcopy(entry['data'])
+
+            headers = {}
+            if entry:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = requester(url, params=params, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            if entry and self._usable_when_stale(entry):
+                with self._lock:
+                    self.hits += 1
+                    self.stale_served += 1
+                metrics.incr('metadata_cache_requests_total', result='stale')
+                return copy.deepcopy(entry['data'])
+            raise
+
+        with self._lock:
+            if response.status_code == 304 and entry:
+                entry['fetched_at'] = time.time()
+                self.hits += 1
+                self.revalidations += 1
+                metrics.incr('metadata_cache_requests_total', result='revalidated')
+                self._save()
+                return copy.deepcopy(entry['data'])
+
+            if response.status_code == 200:
+                data = response.json()
+                self._entries[key] = {
+                    'data': data,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time(),
+                }
+                self.misses += 1
+                metrics.incr('metadata_cache_requests_total', result='miss')
+                self._save()
+                return copy.deepcopy(data)
+
+            if entry and self._usable_when_stale(entry):
+                self.hits += 1
+                self.stale_served += 1
+                metrics.incr('metadata_cache_requests_total', result='stale')
+                return copy.deepcopy(entry['data'])
+
+        response.raise_for_status()
+        raise requests.HTTPError(f"Unexpected status {response.status_code} from {url}", response=response)
+
+    def _usable_when_stale(self, entry):
+        return time.time() - entry['fetched_at'] < self.max_stale
+
+    def stats(self):
+        """Return the hit/miss counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'stale_served': self.stale_served,
+            }
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+_default_cache = None
+
+def get_default_cache():
+    """Return the process-wide metadata cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MetadataCache()
+    return _default_cache
+
+def set_default_cache(cache):
+    """
+    Replace the process-wide metadata cache (e.g. with a temporary one in tests)
+
+    Args:
+        cache: The new MetadataCache, or None to create a default one on next use
+
+    Returns:
+        The previous cache, to restore it later
+    """
+    global _default_cache
+    previous, _default_cache = _default_cache, cache
+    return previous
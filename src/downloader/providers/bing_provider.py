@@ -1,9 +1,17 @@
-import requests
+import logging
 from .provider_base import WallpaperProvider
+from ..bing_api import bing_date, bing_url, collect_images, fetch_archive_page, matches_category
+from ..resolution_resolver import get_default_resolver
+from ...config.settings import BING_ARCHIVE_WINDOWS
+from ...utils.metrics import metrics
 
-BING_API_URL = "https://www.bing.com/HPImageArchive.aspx"
+logger = logging.getLogger(__name__)
 
 class BingProvider(WallpaperProvider):
+    def __init__(self, market='en-US', resolver=None):
+        self.market = market
+        self.resolver = resolver
+
     @property
     def name(self):
         return "Bing"
@@ -17,48 +25,45 @@ class BingProvider(WallpaperProvider):
         ]
     
     def fetch_wallpapers(self, count=1, category='all', resolution='1920x1080', offset=0):
-        # Request more images to allow for filtering
-        request_count = max(count * 3, 8)
-        
-        # Use the provided offset but ensure within API limits
-        idx = min(offset, 16)
-        
-        params = {
-            'format': 'js',
-            'idx': idx,
-            'n': request_count,
-            'mkt': 'en-US',
-        }
-        
-        print(f"Fetching from Bing API with idx={idx}, n={request_count}")
+        images = collect_images(count, category=category, offset=offset, mkt=self.market, requester=self._get)
+        return self._convert(images, category, resolution, filtered=True)
+    
+    def _fetch_page(self, cursor, category, resolution, page_size, **kwargs):
+        # Bing serves at most 8 images per call, so pages are the archive windows
+        position = cursor or 0
+        idx, n = BING_ARCHIVE_WINDOWS[position]
+        logger.debug("Fetching from Bing API with idx=%d, n=%d", idx, n)
+        data = fetch_archive_page(idx=idx, n=n, mkt=self.market, requester=self._get)
+        images = data.get('images', [])
+        next_position = position + 1 if images and position + 1 < len(BING_ARCHIVE_WINDOWS) else None
+        return self._convert(images, category, resolution), next_position
+    
+    def _convert(self, images, category, resolution, filtered=False):
+        """Filter archive images by category and convert them to our standardized format"""
+        if category != 'all' and not filtered:
+            with metrics.timer('category_filter_seconds'):
+                images = [img for img in images if self._matches_category(img, category)]
         
-        response = requests.get(BING_API_URL, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            results = []
-            
-            if 'images' in data:
-                images = data['images']
-                # Filter by category if needed
-                if category != 'all':
-                    images = [img for img in images if self._matches_category(img, category)]
-                
-                # Convert to our standardized format
-                for image in images[:count]:
-                    url = f"https://www.bing.com{image['url']}"
-                    results.append({
-                        'url': url,
-                        'title': image.get('title', ''),
-                        'provider': self.name,
-                        'resolution': resolution,
-                        'category': category
-                    })
-            
-            return results
-        else:
-            response.raise_for_status()
+        resolver = self.resolver or get_default_resolver()
+        urls = resolver.resolve_many(images, resolution, base_url=bing_url(''))
+        results = []
+        for image, url in zip(images, urls):
+            thumbnail_url = None
+            if image.get('urlbase'):
+                thumbnail_url = bing_url(f"{image['urlbase']}_320x180.jpg")
+            results.append({
+                'url': url,
+                'thumbnail_url': thumbnail_url,
+                'title': image.get('title', ''),
+                'copyright': image.get('copyright', ''),
+                'description': image.get('desc', ''),
+                'date': bing_date(image.get('startdate')),
+                'provider': self.name,
+                'resolution': resolution,
+                'category': category,
+                'hsh': image.get('hsh')
+            })
+        return results
     
     def _matches_category(self, image, category):
-        # Implementation of the existing category matching code
-        # (Copy the existing matches_category function logic here)
-        # ...
\ No newline at end of file
+        return matches_category(image, category)
\ No newline at end of file
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .provider_base import request_deadline
+
+DEFAULT_DEADLINE = 10.0  # Seconds the whole fan-out may take
+DEFAULT_HEDGE_AFTER = 2.0  # Seconds before a slow provider gets a second request
+
+class ProviderAggregator:
+    """
+    Fan a fetch out to several wallpaper providers concurrently
+
+    Every provider is queried at once under a global deadline. A provider
+    that hasn't answered after hedge_after seconds gets one duplicate
+    (hedged) request and whichever copy answers first wins. Collection stops
+    as soon as enough matching wallpapers have arrived; requests still
+    queued are cancelled and late answers are ignored.
+
+    Provider HTTP requests get timeouts capped by the deadline, and every
+    fetch runs on its own threads, so a provider that hangs past one
+    deadline can't starve the next fetch.
+    """
+
+    def __init__(self, providers, provider_kwargs=None, max_workers=None):
+        """
+        Args:
+            providers: WallpaperProvider instances to query
+            provider_kwargs: Extra fetch_wallpapers kwargs per provider name,
+                e.g. {"Unsplash": {"api_key": "..."}}
+            max_workers: Threads per fetch (defaults to room for every
+                provider plus one hedge each)
+        """
+        self.providers = list(providers)
+        self.provider_kwargs = provider_kwargs or {}
+        self.max_workers = max_workers or max(1, len(self.providers) * 2)
+
+    def close(self):
+        """Nothing to release, every fetch shuts its own threads down"""
+
+    @staticmethod
+    def _supports(provider, category):
+        categories = provider.supported_categories
+        return not categories or category in categories
+
+    @staticmethod
+    def _matches(wallpaper, category, resolution):
+        if category != 'all' and wallpaper.get('category') not in (None, category):
+            return False
+        return wallpaper.get('resolution') in (None, resolution)
+
+    def _submit(self, executor, end, provider, count, category, resolution, offset):
+        kwargs = self.provider_kwargs.get(provider.name, {})
+        return executor.submit(
+            self._call, provider, end, count=count, category=category,
+            resolution=resolution, offset=offset, **kwargs
+        )
+
+    @staticmethod
+    def _call(provider, end, **kwargs):
+        with request_deadline(end):
+            return provider.fetch_wallpapers(**kwargs)
+
+    def fetch(self, count=1, category='all', resolution='1920x1080', offset=0,
+              deadline=DEFAULT_DEADLINE, hedge_after=DEFAULT_HEDGE_AFTER):
+        """
+        Collect the first count wallpapers matching category and resolution
+
+        Returns:
+            Dict with:
+                - wallpapers: Up to count standardized wallpaper dicts
+                - latency: Seconds until each provider answered (None if it didn't)
+                - errors: Error message per provider whose requests all failed
+                - timed_out: Names of providers that hadn't answered in time
+        """
+        started = time.monotonic()
+        end = started + deadline
+        providers = [p for p in self.providers if self._supports(p, category)]
+        # Calls still running at the deadline keep their threads, so they must not be shared
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='provider-fetch')
+        try:
+            return self._collect(executor, providers, started, end, count, category, resolution, offset,
+                                 hedge_after)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, executor, providers, started, end, count, category, resolution, offset, hedge_after):
+        pending = {}
+        for provider in providers:
+            future = self._submit(executor, end, provider, count, category, resolution, offset)
+            pending[future] = provider
+        hedged = set()
+        answered = set()
+        latency = {provider.name: None for provider in providers}
+        errors = {}
+        wallpapers = []
+        seen_urls = set()
+
+        while pending and len(wallpapers) < count:
+            now = time.monotonic()
+            if now >= end:
+                break
+
+            waiting = {p.name for p in pending.values()} - answered - hedged
+            timeout = end - now
+            if waiting and hedge_after is not None:
+                timeout = min(timeout, max(0, started + hedge_after - now))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                if provider.name in answered:
+                    continue  # The other copy of a hedged request already won
+                try:
+                    results = future.result() or []
+                except Exception as e:
+                    if provider not in pending.values():
+                        errors[provider.name] = str(e)
+                    continue
+
+                answered.add(provider.name)
+                errors.pop(provider.name, None)
+                latency[provider.name] = time.monotonic() - started
+                for other in [f for f, p in pending.items() if p is provider]:
+                    other.cancel()
+                    del pending[other]
+
+                for wallpaper in results:
+                    if len(wallpapers) >= count:
+                        break
+                    if wallpaper.get('url') in seen_urls or not self._matches(wallpaper, category, resolution):
+                        continue
+                    seen_urls.add(wallpaper.get('url'))
+                    wallpapers.append(wallpaper)
+
+            if hedge_after is not None and time.monotonic() >= started + hedge_after:
+                for provider in list(pending.values()):
+                    if provider.name in answered or provider.name in hedged:
+                        continue
+                    hedged.add(provider.name)
+                    future = self._submit(executor, end, provider, count, category, resolution, offset)
+                    pending[future] = provider
+
+        timed_out = [name for name in latency if name not in answered and name not in errors]
+        return {
+            'wallpapers': wallpapers,
+            'latency': latency,
+            'errors': errors,
+            'timed_out': timed_out,
+        }
\ No newline at end of file
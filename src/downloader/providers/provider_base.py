@@ -1,4 +1,41 @@
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_REQUEST_TIMEOUT = 10  # Seconds, for requests that don't set their own
+
+_deadline = threading.local()
+
+@contextmanager
+def request_deadline(deadline):
+    """
+    Cap the timeout of every provider request made by this thread
+
+    Args:
+        deadline: time.monotonic() value by which requests must have finished
+    """
+    previous = getattr(_deadline, 'value', None)
+    _deadline.value = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _deadline.value = previous
+
+def _capped_timeout(timeout, url):
+    """The request timeout left under the current thread's deadline"""
+    deadline = getattr(_deadline, 'value', None)
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        import requests
+        raise requests.Timeout(f"Deadline passed before requesting {url}")
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
 
 class WallpaperProvider(ABC):
     """Base class for all wallpaper providers"""
@@ -9,6 +46,31 @@ class WallpaperProvider(ABC):
         """Return the name of the provider"""
         pass
     
+    @property
+    def session(self):
+        """Return the HTTP session owned by this provider, created on first use"""
+        session = getattr(self, '_session', None)
+        if session is None:
+            import requests
+            session = self._session = requests.Session()
+        return session
+    
+    @property
+    def rate_limiter(self):
+        """Return the rate limiter shared by every instance of this provider"""
+        from .rate_limiter import get_rate_limiter
+        return get_rate_limiter(self.name)
+    
+    def _request(self, method, url, timeout=DEFAULT_REQUEST_TIMEOUT, **kwargs):
+        """Send a request through this provider's session and rate limiter, within any request_deadline"""
+        # Every retry gets the time that is left, not the full timeout again
+        return self.rate_limiter.request(
+            lambda: self.session.request(method, url, timeout=_capped_timeout(timeout, url), **kwargs)
+        )
+    
+    def _get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+    
     @property
     def requires_api_key(self):
         """Return True if this provider requires an API key"""
@@ -27,9 +89,83 @@ class WallpaperProvider(ABC):
         Returns:
             list of dicts containing:
                 - url: Direct URL to the wallpaper image
+                - thumbnail_url: URL of a small preview variant, if any
                 - title: Title or description
                 - provider: Provider name
                 - resolution: Image resolution
                 - category: Category or tags
         """
-        pass
\ No newline at end of file
+        pass
+    
+    def _fetch_page(self, cursor, category, resolution, page_size, **kwargs):
+        """
+        Fetch one page for iter_wallpapers
+        
+        Providers override this to page the way their API does. The default
+        treats cursor as the fetch_wallpapers offset and advances it by one.
+        
+        Args:
+            cursor: Position of the page (None asks for the first page)
+            category: Category to fetch
+            resolution: Requested resolution
+            page_size: Preferred number of wallpapers per page
+            **kwargs: Provider-specific fetch arguments (e.g. api_key)
+        
+        Returns:
+            Tuple of (wallpapers, cursor of the next page or None at the end)
+        """
+        offset = cursor or 0
+        wallpapers = self.fetch_wallpapers(
+            count=page_size, category=category, resolution=resolution, offset=offset, **kwargs
+        )
+        return wallpapers or [], (offset + 1 if wallpapers else None)
+    
+    def iter_wallpapers(self, category='all', resolution='1920x1080', limit=None, page_size=DEFAULT_PAGE_SIZE,
+                        **kwargs):
+        """
+        Lazily yield wallpapers page by page, prefetching the next page in the background
+        
+        While the caller works through one page (e.g. downloading it), the
+        next one is already being fetched. Wallpapers seen on an earlier page
+        are skipped. Closing the generator, or simply no longer pulling from
+        it, cancels the pending prefetch.
+        
+        Args:
+            category: Category to fetch
+            resolution: Requested resolution
+            limit: Stop after this many wallpapers (None for as many as the provider has)
+            page_size: Preferred number of wallpapers per request
+            **kwargs: Provider-specific fetch arguments (e.g. api_key)
+        
+        Yields:
+            Wallpaper dicts in the fetch_wallpapers format
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{self.name}-prefetch')
+        future = executor.submit(self._fetch_page, None, category, resolution, page_size, **kwargs)
+        seen = set()
+        yielded = 0
+        try:
+            while future is not None:
+                wallpapers, cursor = future.result()
+                future = None
+                remaining = None if limit is None else limit - yielded
+                if cursor is not None and (remaining is None or len(wallpapers) < remaining):
+                    future = executor.submit(self._fetch_page, cursor, category, resolution, page_size, **kwargs)
+                
+                for wallpaper in wallpapers:
+                    key = wallpaper.get('hsh') or wallpaper.get('url')
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    yield wallpaper
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+                
+                if future is None and cursor is not None:
+                    # The page held duplicates, so the skipped prefetch is needed after all
+                    future = executor.submit(self._fetch_page, cursor, category, resolution, page_size, **kwargs)
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
\ No newline at end of file
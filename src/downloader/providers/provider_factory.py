@@ -1,17 +1,89 @@
-from .bing_provider import BingProvider
-from .unsplash_provider import UnsplashProvider
-# Import other providers as you implement them
+import importlib
+import threading
+
+# Entry point group third-party packages use to add providers
+ENTRY_POINT_GROUP = 'bing_wallpaper_downloader.providers'
+
+# Built-in providers as "module:Class", imported on first use
+BUILTIN_PROVIDERS = {
+    "Bing": ".bing_provider:BingProvider",
+    "Unsplash": ".unsplash_provider:UnsplashProvider",
+    # Add other providers as they're implemented
+}
+
+def _discover_entry_points():
+    """Return {name: entry point} for providers installed as plugins"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        return {}
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10
+        found = entry_points().get(ENTRY_POINT_GROUP, [])
+    return {entry_point.name: entry_point for entry_point in found}
 
 class ProviderFactory:
     """Factory for creating wallpaper provider instances"""
     
-    @staticmethod
-    def get_provider(provider_name):
-        """Get a provider instance by name"""
-        if provider_name == "Bing":
-            return BingProvider()
-        elif provider_name == "Unsplash":
-            return UnsplashProvider()
-        # Add other providers as they're implemented
-        else:
-            raise ValueError(f"Unknown provider: {provider_name}")
\ No newline at end of file
+    _registry = dict(BUILTIN_PROVIDERS)
+    _plugins_loaded = False
+    _instances = {}
+    _lock = threading.RLock()
+    
+    @classmethod
+    def register_provider(cls, provider_name, target):
+        """Register a provider class, or a "module:Class" string imported on first use"""
+        with cls._lock:
+            cls._registry[provider_name] = target
+            cls._instances.pop(provider_name, None)
+    
+    @classmethod
+    def unregister_provider(cls, provider_name):
+        """Remove a registered provider and its cached instance, returns True if it was registered"""
+        with cls._lock:
+            cls._instances.pop(provider_name, None)
+            return cls._registry.pop(provider_name, None) is not None
+    
+    @classmethod
+    def _load_plugins(cls):
+        # Scanning installed distributions is slow, so only do it when needed
+        if cls._plugins_loaded:
+            return
+        for name, entry_point in _discover_entry_points().items():
+            cls._registry.setdefault(name, entry_point)
+        cls._plugins_loaded = True
+    
+    @classmethod
+    def available_providers(cls):
+        """Return the names of every registered provider"""
+        with cls._lock:
+            cls._load_plugins()
+            return sorted(cls._registry)
+    
+    @classmethod
+    def _resolve(cls, target):
+        if isinstance(target, str):
+            module_name, class_name = target.split(':')
+            module = importlib.import_module(module_name, package=__package__)
+            return getattr(module, class_name)
+        if hasattr(target, 'load'):  # Entry point
+            return target.load()
+        return target
+    
+    @classmethod
+    def get_provider(cls, provider_name):
+        """Get a provider instance by name, creating it on first use"""
+        with cls._lock:
+            provider = cls._instances.get(provider_name)
+            if provider is not None:
+                return provider
+            
+            if provider_name not in cls._registry:
+                cls._load_plugins()
+            if provider_name not in cls._registry:
+                raise ValueError(f"Unknown provider: {provider_name}")
+            
+            provider = cls._resolve(cls._registry[provider_name])()
+            cls._instances[provider_name] = provider
+            return provider
@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from ...config.settings import PROVIDER_RATE_LIMITS
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 5
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5  # Seconds before the first retry (before jitter)
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_MAX_RETRY_AFTER = 300.0  # Longer Retry-After values are not waited for
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 60.0
+
+class ProviderUnavailableError(requests.RequestException):
+    """Raised when a provider's circuit breaker is open"""
+
+class TokenBucket:
+    """Token bucket that blocks callers until a request may be sent"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+    def defer(self, seconds):
+        """Hand out no tokens for the next seconds (e.g. after a Retry-After)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a provider that keeps failing
+
+    After failure_threshold consecutive failures the circuit opens and
+    requests are refused for reset_timeout seconds. Then a single trial
+    request is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None and self.clock() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self.clock() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds from a Retry-After header (seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        # "-0000" dates parse as naive datetimes, RFC 9110 dates are always UTC
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+class RateLimiter:
+    """
+    Pace, retry and circuit-break the requests sent to one provider
+
+    Requests wait for a token, 429 and 5xx answers and connection errors are
+    retried with exponential backoff and full jitter (honouring Retry-After),
+    and a provider that keeps failing is shed by the circuit breaker.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 max_retry_after=DEFAULT_MAX_RETRY_AFTER, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic, sleep=time.sleep):
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, send):
+        """
+        Send a request through the limiter
+
+        Args:
+            send: Callable that performs the request and returns a response
+
+        Returns:
+            The response (the last one if every retry failed)
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise ProviderUnavailableError("Provider is unavailable, circuit breaker is open")
+            self.bucket.acquire()
+            last_attempt = attempt == self.max_retries
+
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                self.breaker.record_failure()
+                if last_attempt:
+                    raise
+                self.sleep(self._backoff(attempt))
+                continue
+            except Exception:
+                # Not retried, but still settle a half-open trial so the circuit can't stay stuck
+                self.breaker.record_failure()
+                raise
+
+            if response.status_code == 429 or response.status_code >= 500:
+                # 429 means we are too fast, not that the provider is down
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if last_attempt or delay > self.max_retry_after:
+                    return response
+                if response.status_code == 429:
+                    # Pause every caller sharing this provider, not just this one
+                    self.bucket.defer(delay)
+                else:
+                    self.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return response
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def configure_rate_limiter(provider_name, **kwargs):
+    """Replace a provider's limiter, kwargs are passed to RateLimiter"""
+    with _limiters_lock:
+        _limiters[provider_name] = limiter = RateLimiter(**kwargs)
+        return limiter
+
+def get_rate_limiter(provider_name):
+    """Return the limiter shared by every instance of a provider"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider_name)
+        if limiter is None:
+            config = PROVIDER_RATE_LIMITS.get(provider_name, {})
+            limiter = RateLimiter(
+                rate=config.get('rate', DEFAULT_RATE),
+                burst=config.get('burst', DEFAULT_BURST),
+            )
+            _limiters[provider_name] = limiter
+        return limiter
\ No newline at end of file
@@ -1,6 +1,8 @@
-import requests
 from .provider_base import WallpaperProvider
 
+UNSPLASH_API_URL = "https://api.unsplash.com"
+MAX_PER_PAGE = 30  # Largest per_page the search endpoint accepts
+
 class UnsplashProvider(WallpaperProvider):
     @property
     def name(self):
@@ -25,35 +27,49 @@ class UnsplashProvider(WallpaperProvider):
         # Map our categories to Unsplash query terms
         query = self._map_category_to_query(category)
         
+        data = self._search(api_key, query, per_page=count, page=offset + 1)  # Unsplash uses 1-based indexing
+        return self._convert(data, category, resolution)
+    
+    def _fetch_page(self, cursor, category, resolution, page_size, api_key=None, **kwargs):
+        if not api_key:
+            raise ValueError("Unsplash API requires an API key")
+        page = cursor or 1
+        data = self._search(api_key, self._map_category_to_query(category),
+                            per_page=min(page_size, MAX_PER_PAGE), page=page)
+        results = self._convert(data, category, resolution)
+        next_page = page + 1 if results and page < data.get('total_pages', 0) else None
+        return results, next_page
+    
+    def _search(self, api_key, query, per_page, page):
+        """Run one /search/photos request and return the decoded JSON"""
         params = {
             'client_id': api_key,
             'query': query,
-            'per_page': count,
-            'page': offset + 1,  # Unsplash uses 1-based indexing
+            'per_page': per_page,
+            'page': page,
             'orientation': 'landscape'  # Best for wallpapers
         }
         
-        response = requests.get("https://api.unsplash.com/search/photos", params=params)
-        if response.status_code == 200:
-            data = response.json()
-            results = []
+        response = self._get(f"{UNSPLASH_API_URL}/search/photos", params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    def _convert(self, data, category, resolution):
+        """Convert search results to our standardized format"""
+        results = []
+        for photo in data.get('results', []):
+            # Get the URL that matches our requested resolution best
+            url = self._get_best_resolution_url(photo['urls'], resolution)
             
-            if 'results' in data:
-                for photo in data['results']:
-                    # Get the URL that matches our requested resolution best
-                    url = self._get_best_resolution_url(photo['urls'], resolution)
-                    
-                    results.append({
-                        'url': url,
-                        'title': photo.get('description', 'Unsplash Wallpaper'),
-                        'provider': self.name,
-                        'resolution': resolution,
-                        'category': category
-                    })
-                    
-            return results
-        else:
-            response.raise_for_status()
+            results.append({
+                'url': url,
+                'thumbnail_url': photo['urls'].get('small'),
+                'title': photo.get('description', 'Unsplash Wallpaper'),
+                'provider': self.name,
+                'resolution': resolution,
+                'category': category
+            })
+        return results
             
     def _map_category_to_query(self, category):
         """Map our internal categories to Unsplash search queries"""
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import requests
+from ..utils.metrics import metrics
+
+DEFAULT_CACHE_FILE = os.path.join('data', 'cache', 'bing_variants.json')
+DEFAULT_TTL = 7 * 24 * 3600  # Bing doesn't remove variants, a week is conservative
+DEFAULT_MISSING_TTL = 24 * 3600  # Re-check variants that were missing once a day
+DEFAULT_TIMEOUT = 5
+DEFAULT_MAX_WORKERS = 4
+
+# Image variants Bing serves for every urlbase (suffix -> width, height), smallest first
+BING_VARIANTS = {
+    '1366x768': (1366, 768),
+    '1920x1080': (1920, 1080),
+    '1920x1200': (1920, 1200),
+    'UHD': (3840, 2160),
+}
+
+_VARIANT_RE = re.compile(r"_(UHD|\d+x\d+)\.jpg", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+def variant_candidates(resolution):
+    """
+    Bing variants for a "WIDTHxHEIGHT" resolution, best first
+
+    The smallest variant covering the resolution comes first (no upscaling,
+    no wasted bytes), then larger ones, then smaller ones as a last resort.
+    """
+    try:
+        width, height = (int(part) for part in resolution.lower().split('x'))
+    except (AttributeError, ValueError):
+        return list(BING_VARIANTS)
+    covering = [name for name, (w, h) in BING_VARIANTS.items() if w >= width and h >= height]
+    smaller = [name for name in reversed(list(BING_VARIANTS)) if name not in covering]
+    return covering + smaller
+
+def embedded_variant(url):
+    """Variant suffix of an archive 'url' field (e.g. '1920x1080'), or None"""
+    match = _VARIANT_RE.search(url or '')
+    return match.group(1) if match else None
+
+class ResolutionResolver:
+    """
+    Pick the Bing image variant that best fits a requested resolution
+
+    Candidate variants of an image's urlbase are checked with HEAD requests
+    whose outcome is cached (on disk, with a TTL), so each variant of each
+    image is probed at most once per TTL. The variant embedded in the
+    archive's own 'url' is known to exist and is never probed. When nothing
+    can be verified, the archive's default URL is used. The cache file is
+    written once per resolve/resolve_many call, without expired entries.
+    """
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, ttl=DEFAULT_TTL, missing_ttl=DEFAULT_MISSING_TTL,
+                 requester=None, timeout=DEFAULT_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            cache_file: JSON file the probe results are kept in (None for memory only)
+            ttl: Seconds an available variant is trusted
+            missing_ttl: Seconds a missing variant is trusted
+            requester: Callable with the requests.head signature
+            timeout: HEAD request timeout in seconds
+            max_workers: Concurrent probes in resolve_many
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._requester = requester
+        self._session = None
+        self._entries = None
+        self._dirty = False
+        self._batch_depth = 0
+        self._lock = threading.Lock()
+
+    def _head(self, url, **kwargs):
+        if self._requester:
+            return self._requester(url, **kwargs)
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session.head(url, **kwargs)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.cache_file, 'r') as file:
+                self._entries = json.load(file)
+        except (TypeError, FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        now = time.time()
+        self._entries = {
+            url: entry for url, entry in self._entries.items()
+            if now - entry['checked_at'] < (self.ttl if entry['available'] else self.missing_ttl)
+        }
+        self._dirty = False
+        if not self.cache_file:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w') as file:
+                json.dump(self._entries, file)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning("Error saving variant cache: %s", e)
+
+    def is_available(self, url):
+        """
+        Check whether url exists, from the cache or with a HEAD request
+
+        Returns:
+            True or False, or None if the check failed (network error)
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+            if entry:
+                ttl = self.ttl if entry['available'] else self.missing_ttl
+                if time.time() - entry['checked_at'] < ttl:
+                    metrics.incr('resolution_probes_total', result='cached')
+                    return entry['available']
+
+        try:
+            response = self._head(url, allow_redirects=True, timeout=self.timeout)
+        except requests.RequestException:
+            metrics.incr('resolution_probes_total', result='error')
+            return None
+        if response.status_code >= 500 or response.status_code == 429:
+            metrics.incr('resolution_probes_total', result='error')
+            return None
+
+        available = response.status_code < 400
+        metrics.incr('resolution_probes_total', result='available' if available else 'missing')
+        with self._lock:
+            self._entries[url] = {'available': available, 'checked_at': time.time()}
+            self._dirty = True
+            if not self._batch_depth:
+                self._save()
+        return available
+
+    @contextmanager
+    def _batch(self):
+        """Write new probe results once, when the outermost batch ends"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._save()
+
+    def resolve(self, image, resolution, base_url=''):
+        """
+        Return the URL of the variant of image that best fits resolution
+
+        Args:
+            image: Archive image dict with 'url' and 'urlbase'
+            resolution: Requested "WIDTHxHEIGHT"
+            base_url: Prefix for the archive's relative paths (e.g. https://www.bing.com)
+        """
+        default_url = f"{base_url}{image['url']}"
+        urlbase = image.get('urlbase')
+        if not urlbase:
+            return default_url
+
+        known = embedded_variant(image['url'])
+        with self._batch():
+            for variant in variant_candidates(resolution):
+                if variant == known:
+                    return default_url
+                url = f"{base_url}{urlbase}_{variant}.jpg"
+                available = self.is_available(url)
+                if available:
+                    return url
+                if available is None:
+                    # Can't tell right now, don't guess at variants that may not exist
+                    break
+        return default_url
+
+    def resolve_many(self, images, resolution, base_url=''):
+        """resolve() for several images, probing them concurrently"""
+        with self._batch():
+            if len(images) <= 1 or self.max_workers <= 1:
+                return [self.resolve(image, resolution, base_url) for image in images]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(images))) as executor:
+                return list(executor.map(lambda image: self.resolve(image, resolution, base_url), images))
+
+    def clear(self):
+        """Drop every cached probe result"""
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+_default_resolver = None
+
+def get_default_resolver():
+    """Return the process-wide resolution resolver"""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = ResolutionResolver()
+    return _default_resolver
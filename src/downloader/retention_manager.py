@@ -0,0 +1,273 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from ..config.settings import DEFAULT_RETENTION_POLICY, DEFAULT_SAVE_LOCATION, RETENTION_POLICIES
+from ..utils.metrics import metrics
+
+DEFAULT_INDEX_FILE = os.path.join('data', 'retention_index.sqlite')
+EVICTION_BATCH = 64  # Candidates fetched per query while enforcing the budget
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif', '.bmp')
+
+# Column the eviction order is based on, per policy (oldest first)
+POLICIES = {
+    'lru': 'last_access',
+    'age': 'added_at',
+}
+
+logger = logging.getLogger(__name__)
+
+class RetentionManager:
+    """
+    Keep a wallpaper library within a byte and file-count budget
+
+    Every file is recorded once when it is saved, in an SQLite index of
+    size, age and last access, with running totals kept alongside. Checking
+    the budget reads the totals and eviction walks an index on the policy's
+    column, so the cost depends on the number of files evicted, not on the
+    size of the library. The directory is only scanned by sync(), e.g. to
+    adopt files that existed before the index.
+
+    Favorites are never evicted. If the budget can only be met by evicting
+    favorites, the library is left over budget.
+    """
+
+    def __init__(self, directory, index_file=DEFAULT_INDEX_FILE, max_bytes=None, max_files=None, policy='lru',
+                 on_evict=None, clock=time.time):
+        """
+        Args:
+            directory: Library directory (the save_location setting)
+            index_file: SQLite file holding the index
+            max_bytes: Byte budget (None or 0 for no limit)
+            max_files: File-count budget (None or 0 for no limit)
+            policy: 'lru' evicts the least recently used file first, 'age' the oldest download
+            on_evict: Callables called with the path of every evicted file
+                (e.g. WallpaperCatalog.remove)
+            clock: Time source, for tests
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown retention policy: {policy}")
+        self.directory = directory
+        self.index_file = index_file
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.policy = policy
+        self.on_evict = list(on_evict or [])
+        self.clock = clock
+        index_directory = os.path.dirname(index_file)
+        if index_directory:
+            os.makedirs(index_directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Serializes enforce() so concurrent callers never pick the same candidates
+        self._enforce_lock = threading.Lock()
+        self._conn = sqlite3.connect(index_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    added_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    favorite INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS files_lru ON files (favorite, last_access);
+                CREATE INDEX IF NOT EXISTS files_age ON files (favorite, added_at);
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    bytes INTEGER NOT NULL,
+                    files INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO totals (id, bytes, files) VALUES (1, 0, 0);
+                CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+                    UPDATE totals SET bytes = bytes + new.size, files = files + 1 WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+                    UPDATE totals SET bytes = bytes - old.size, files = files - 1 WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE OF size ON files BEGIN
+                    UPDATE totals SET bytes = bytes - old.size + new.size WHERE id = 1;
+                END;
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, path, size=None, favorite=None):
+        """
+        Add a newly saved file to the index (or refresh its size)
+
+        Args:
+            path: The saved file
+            size: Its size in bytes (read from disk if not given)
+            favorite: Mark (True) or unmark (False) it as a favorite
+        """
+        if size is None:
+            size = os.path.getsize(path)
+        now = self.clock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO files (path, size, added_at, last_access, favorite) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, last_access = excluded.last_access",
+                (path, size, now, now, int(bool(favorite))),
+            )
+            if favorite is not None:
+                self._conn.execute("UPDATE files SET favorite = ? WHERE path = ?", (int(favorite), path))
+
+    def touch(self, path):
+        """Mark a file as used (e.g. set as the desktop wallpaper)"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET last_access = ? WHERE path = ?", (self.clock(), path))
+
+    def set_favorite(self, path, favorite=True):
+        """Protect a file from eviction (or lift the protection)"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE files SET favorite = ? WHERE path = ?", (int(favorite), path)
+            ).rowcount > 0
+
+    def forget(self, path):
+        """Drop a file from the index without touching the disk"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM files WHERE path = ?", (path,)).rowcount > 0
+
+    def move(self, path, new_path, size=None):
+        """
+        Follow a file that was replaced by new_path (e.g. after transcoding), keeping its ages
+
+        Returns:
+            False if path isn't indexed (e.g. it was evicted meanwhile)
+        """
+        if size is None:
+            size = os.path.getsize(new_path)
+        # Wait for a running enforce(), so path is either evicted or moved, never both
+        with self._enforce_lock, self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE files SET path = ?, size = ? WHERE path = ?", (new_path, size, path)
+            ).rowcount > 0
+
+    def usage(self):
+        """Return (bytes, files) currently indexed"""
+        with self._lock:
+            return self._conn.execute("SELECT bytes, files FROM totals WHERE id = 1").fetchone()
+
+    def _over_budget(self, used_bytes, used_files):
+        return bool((self.max_bytes and used_bytes > self.max_bytes) or
+                    (self.max_files and used_files > self.max_files))
+
+    def enforce(self):
+        """
+        Evict files until the library fits the budget
+
+        Returns:
+            List of evicted paths, in eviction order
+        """
+        with self._enforce_lock:
+            evicted = self._evict()
+
+        for path in evicted:
+            metrics.incr('retention_evictions_total', policy=self.policy)
+            for callback in self.on_evict:
+                try:
+                    callback(path)
+                except Exception as e:
+                    logger.error("Error in eviction callback for %s: %s", path, e)
+        return evicted
+
+    def _evict(self):
+        """Delete files in policy order while over budget, returns their paths"""
+        column = POLICIES[self.policy]
+        evicted = []
+        while True:
+            used_bytes, used_files = self.usage()
+            if not self._over_budget(used_bytes, used_files):
+                break
+            with self._lock:
+                candidates = self._conn.execute(
+                    f"SELECT path, size FROM files WHERE favorite = 0 ORDER BY {column} LIMIT ?",
+                    (EVICTION_BATCH,),
+                ).fetchall()
+            if not candidates:
+                logger.warning("Library is over budget but only favorites are left")
+                break
+
+            batch = []
+            for path, size in candidates:
+                if not self._over_budget(used_bytes, used_files):
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Already gone, just drop it from the index
+                except OSError as e:
+                    logger.error("Error evicting %s: %s", path, e)
+                    continue
+                batch.append(path)
+                used_bytes -= size
+                used_files -= 1
+
+            if not batch:
+                break
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in batch])
+            evicted.extend(batch)
+        return evicted
+
+    def sync(self):
+        """
+        Reconcile the index with the directory (full scan)
+
+        Only needed once to adopt an existing library, or after files were
+        changed outside the application. Files already indexed keep their
+        access times; new ones are dated by their modification time.
+
+        Returns:
+            Tuple of (files added, files dropped)
+        """
+        on_disk = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    on_disk[path] = (stat.st_size, stat.st_mtime)
+
+        with self._lock, self._conn:
+            indexed = {path for (path,) in self._conn.execute("SELECT path FROM files")}
+            added = [
+                (path, size, mtime, mtime) for path, (size, mtime) in on_disk.items() if path not in indexed
+            ]
+            dropped = [(path,) for path in indexed if path not in on_disk]
+            self._conn.executemany(
+                "INSERT INTO files (path, size, added_at, last_access) VALUES (?, ?, ?, ?)", added
+            )
+            self._conn.executemany("DELETE FROM files WHERE path = ?", dropped)
+        return len(added), len(dropped)
+
+def retention_from_settings(settings, index_file=DEFAULT_INDEX_FILE):
+    """
+    Build the retention manager described by the settings (ConfigManager.settings)
+
+    Returns:
+        A RetentionManager, or None if neither storage_max_bytes nor
+        storage_max_files sets a budget
+    """
+    if not (settings.storage_max_bytes or settings.storage_max_files):
+        return None
+    policy = settings.retention_policy
+    if policy not in RETENTION_POLICIES:
+        logger.warning("Unknown retention policy %r, using %r", policy, DEFAULT_RETENTION_POLICY)
+        policy = DEFAULT_RETENTION_POLICY
+    return RetentionManager(
+        settings.save_location or DEFAULT_SAVE_LOCATION,
+        index_file,
+        max_bytes=settings.storage_max_bytes,
+        max_files=settings.storage_max_files,
+        policy=policy,
+    )
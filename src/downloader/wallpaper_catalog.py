@@ -0,0 +1,254 @@
+import os
+import sqlite3
+import threading
+import time
+from ..utils.image_utils import parse_resolution
+
+DEFAULT_CATALOG_FILE = os.path.join('data', 'wallpaper_catalog.sqlite')
+
+# Columns callers may filter and sort on; every one of them is indexed
+FILTER_COLUMNS = ('provider', 'category', 'resolution', 'date')
+ORDER_COLUMNS = {
+    'date': 'date DESC, id DESC',
+    'added': 'added_at DESC, id DESC',
+    'title': 'title COLLATE NOCASE, id',
+}
+
+def _image_size(path):
+    """Read (width, height) from the image header, None if it can't be read"""
+    try:
+        from PIL import Image
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+
+class WallpaperCatalog:
+    """
+    Searchable SQLite catalog of downloaded wallpapers
+
+    Keeps the metadata providers return (title, copyright, description,
+    date) next to indexed provider/category/resolution/dimension columns,
+    with an FTS5 index over the text, so a large library can be listed and
+    searched without scanning the wallpaper directory.
+    """
+
+    def __init__(self, catalog_file=DEFAULT_CATALOG_FILE):
+        self.catalog_file = catalog_file
+        directory = os.path.dirname(catalog_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(catalog_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS wallpapers (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    url TEXT,
+                    provider TEXT,
+                    category TEXT,
+                    resolution TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    date TEXT,
+                    title TEXT NOT NULL DEFAULT '',
+                    copyright TEXT NOT NULL DEFAULT '',
+                    description TEXT NOT NULL DEFAULT '',
+                    hsh TEXT,
+                    content_hash TEXT,
+                    size INTEGER,
+                    added_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS wallpapers_provider ON wallpapers (provider, date);
+                CREATE INDEX IF NOT EXISTS wallpapers_category ON wallpapers (category, date);
+                CREATE INDEX IF NOT EXISTS wallpapers_resolution ON wallpapers (resolution, date);
+                CREATE INDEX IF NOT EXISTS wallpapers_dimensions ON wallpapers (width, height);
+                CREATE INDEX IF NOT EXISTS wallpapers_date ON wallpapers (date);
+                CREATE INDEX IF NOT EXISTS wallpapers_added ON wallpapers (added_at);
+                CREATE INDEX IF NOT EXISTS wallpapers_url ON wallpapers (url);
+                CREATE INDEX IF NOT EXISTS wallpapers_hsh ON wallpapers (hsh);
+            """)
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS wallpapers_fts USING fts5(
+                    title, copyright, description,
+                    content='wallpapers', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS wallpapers_ai AFTER INSERT ON wallpapers BEGIN
+                    INSERT INTO wallpapers_fts (rowid, title, copyright, description)
+                    VALUES (new.id, new.title, new.copyright, new.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS wallpapers_ad AFTER DELETE ON wallpapers BEGIN
+                    INSERT INTO wallpapers_fts (wallpapers_fts, rowid, title, copyright, description)
+                    VALUES ('delete', old.id, old.title, old.copyright, old.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS wallpapers_au AFTER UPDATE ON wallpapers BEGIN
+                    INSERT INTO wallpapers_fts (wallpapers_fts, rowid, title, copyright, description)
+                    VALUES ('delete', old.id, old.title, old.copyright, old.description);
+                    INSERT INTO wallpapers_fts (rowid, title, copyright, description)
+                    VALUES (new.id, new.title, new.copyright, new.description);
+                END;
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, path, metadata=None, url=None, content_hash=None, size=None):
+        """
+        Record (or update) a downloaded wallpaper
+
+        Args:
+            path: Where the wallpaper is saved
+            metadata: Dict with any of provider, category, resolution, width,
+                height, date, title, copyright, description and hsh
+            url: URL the wallpaper was downloaded from
+            content_hash: SHA-256 of the file
+            size: File size in bytes
+
+        Returns:
+            The row id of the wallpaper
+        """
+        metadata = dict(metadata or {})
+        width, height = metadata.get('width'), metadata.get('height')
+        if not (width and height):
+            width, height = _image_size(path) or self._resolution_size(metadata.get('resolution'))
+        if size is None and os.path.exists(path):
+            size = os.path.getsize(path)
+
+        row = {
+            'path': path,
+            'url': url or metadata.get('url'),
+            'provider': metadata.get('provider'),
+            'category': metadata.get('category'),
+            'resolution': metadata.get('resolution'),
+            'width': width,
+            'height': height,
+            'date': metadata.get('date'),
+            'title': metadata.get('title') or '',
+            'copyright': metadata.get('copyright') or '',
+            'description': metadata.get('description') or '',
+            'hsh': metadata.get('hsh'),
+            'content_hash': content_hash,
+            'size': size,
+            'added_at': time.time(),
+        }
+        columns = ', '.join(row)
+        placeholders = ', '.join(f':{column}' for column in row)
+        # Re-adding a path refreshes its metadata but keeps when it first entered the library
+        updates = ', '.join(f'{column} = excluded.{column}' for column in row if column not in ('path', 'added_at'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO wallpapers ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(path) DO UPDATE SET {updates}",
+                row,
+            )
+            return self._conn.execute("SELECT id FROM wallpapers WHERE path = ?", (path,)).fetchone()[0]
+
+    @staticmethod
+    def _resolution_size(resolution):
+        try:
+            return parse_resolution(resolution)
+        except (AttributeError, ValueError):
+            return None, None
+
+    def get(self, path):
+        """Return the catalog entry for path as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM wallpapers WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, path):
+        """Drop path from the catalog, returns True if it was there"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM wallpapers WHERE path = ?", (path,)).rowcount > 0
+
+    def move(self, path, new_path, size=None):
+        """Point the entry for path at new_path (e.g. after transcoding), returns True if it was there"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE wallpapers SET path = ?, size = COALESCE(?, size) WHERE path = ?", (new_path, size, path)
+            ).rowcount > 0
+
+    def count(self, **filters):
+        """Number of wallpapers matching the filters (see list)"""
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM wallpapers{where}", params).fetchone()[0]
+
+    def list(self, order='date', limit=100, offset=0, **filters):
+        """
+        List wallpapers, newest first by default
+
+        Args:
+            order: 'date', 'added' or 'title'
+            limit: Maximum number of entries
+            offset: Entries to skip (for paging)
+            **filters: provider, category, resolution or date for equality,
+                min_width/min_height, since/until (inclusive ISO dates)
+
+        Returns:
+            List of catalog entries as dicts
+        """
+        where, params = self._where(filters)
+        params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM wallpapers{where} ORDER BY {ORDER_COLUMNS[order]} LIMIT ? OFFSET ?",
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, text, limit=50, offset=0, **filters):
+        """
+        Full-text search over title, copyright and description, best match first
+
+        Args:
+            text: Words to look for; each must appear (prefix matches allowed)
+            limit: Maximum number of entries
+            offset: Entries to skip (for paging)
+            **filters: Same filters as list
+
+        Returns:
+            List of catalog entries as dicts
+        """
+        query = self._fts_query(text)
+        if not query:
+            return self.list(limit=limit, offset=offset, **filters)
+        where, params = self._where(filters, prefix='w.')
+        where = where.replace(' WHERE ', ' AND ', 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT w.* FROM wallpapers_fts JOIN wallpapers w ON w.id = wallpapers_fts.rowid "
+                f"WHERE wallpapers_fts MATCH ?{where} ORDER BY bm25(wallpapers_fts) LIMIT ? OFFSET ?",
+                [query] + params + [limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _fts_query(text):
+        # Quote every word so user input can't be parsed as FTS5 syntax
+        words = [word.replace('"', '') for word in (text or '').split()]
+        return ' '.join(f'"{word}"*' for word in words if word)
+
+    @staticmethod
+    def _where(filters, prefix=''):
+        clauses = []
+        params = []
+        for column in FILTER_COLUMNS:
+            if filters.get(column) is not None:
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(filters[column])
+        for key, clause in (('min_width', 'width >= ?'), ('min_height', 'height >= ?'),
+                            ('since', 'date >= ?'), ('until', 'date <= ?')):
+            if filters.get(key) is not None:
+                clauses.append(prefix + clause)
+                params.append(filters[key])
+        unknown = set(filters) - set(FILTER_COLUMNS) - {'min_width', 'min_height', 'since', 'until'}
+        if unknown:
+            raise ValueError(f"Unknown catalog filter: {', '.join(sorted(unknown))}")
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
@@ -1,50 +1,577 @@
 import requests
+import hashlib
+import logging
 import os
-from datetime import datetime
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from .download_quota import DEFAULT_QUOTA_FILE, MemoryQuota, SQLiteQuota
+from .retention_manager import retention_from_settings
+from ..config.settings import DAILY_DOWNLOAD_LIMIT
+from ..utils.transcoder import transcoder_from_settings
+from ..utils.metrics import metrics
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PER_HOST_LIMIT = 4
+
+# Adaptive read size bounds for streaming downloads
+MIN_CHUNK_SIZE = 16 * 1024
+INITIAL_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Grow the read size while a read takes less than this, shrink it above twice this
+TARGET_READ_SECONDS = 0.1
+
+PARTIAL_SUFFIX = '.part'
+# Sidecar of a partial file holding the ETag/Last-Modified it was downloaded under
+VALIDATOR_SUFFIX = '.validator'
+# Seconds between renewals of the quota reservation of a running transfer
+RESERVATION_RENEW_INTERVAL = 60.0
+
+# Minimum seconds between perceptual-hash index saves triggered by background work
+PHASH_SAVE_INTERVAL = 30.0
+
+logger = logging.getLogger(__name__)
+
+class NearDuplicateError(Exception):
+    """Raised when a downloaded image is perceptually identical to one already stored"""
+
+def _response_validator(response):
+    """Strong ETag, or else Last-Modified, of a response (None if it has neither)"""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+def _continues_at(response, offset, validator):
+    """Whether a 206 response continues the partial file of offset bytes downloaded under validator"""
+    content_range = response.headers.get('Content-Range', '')
+    try:
+        unit, spec = content_range.split(' ', 1)
+        start = int(spec.split('-', 1)[0])
+    except ValueError:
+        return False
+    if unit != 'bytes' or start != offset:
+        return False
+    etag = response.headers.get('ETag')
+    # A server ignoring If-Range still gives itself away by a different ETag
+    return not (etag and validator.startswith('"') and etag != validator)
+
+def _read_validator(path):
+    try:
+        with open(path, 'r') as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+def _write_validator(path, validator):
+    """Store validator next to a partial file (None removes it)"""
+    try:
+        if validator:
+            with open(path, 'w') as file:
+                file.write(validator)
+        elif os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        logger.warning("Error updating %s: %s", path, e)
 
 class WallpaperDownloader:
-    def __init__(self, download_limit=5):
+    def __init__(self, download_limit=5, max_workers=DEFAULT_MAX_WORKERS, per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                 store=None, quota=None, catalog=None, phash_index=None, retention=None, transcoder=None):
+        """
+        Args:
+            download_limit: Maximum downloads per day
+            max_workers: Worker threads used by download_many
+            per_host_limit: Maximum concurrent transfers per host
+            store: Optional WallpaperStore used to skip content already on disk
+            quota: Daily quota accounting; pass a SQLiteQuota to share the
+                limit between processes and restarts (defaults to a
+                per-process MemoryQuota, from_settings uses a SQLiteQuota)
+            catalog: Optional WallpaperCatalog every download is recorded in
+            phash_index: Optional PerceptualHashIndex; downloads that are a
+                near-duplicate of an indexed image are rejected
+            retention: Optional RetentionManager; every download is recorded
+                and the library budget enforced after it
+            transcoder: Optional Transcoder every new download is queued on
+                (WebP/AVIF re-encoding in the background); the catalog,
+                retention and perceptual-hash indexes follow the new file.
+                Not used together with a store, which identifies stored
+                files by the content of the originals
+        """
         self.download_limit = download_limit
-        self.downloaded_today = 0
-        self.reset_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-    def download_wallpaper(self, wallpaper_url, save_path):
-        """Download a wallpaper from URL and save it to the given path"""
-        current_time = datetime.now()
-        
-        # Reset counter if it's a new day
-        if current_time.date() > self.reset_time.date():
-            self.downloaded_today = 0
-            self.reset_time = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        if self.downloaded_today < self.download_limit:
-            try:
-                response = requests.get(wallpaper_url, stream=True)
-                response.raise_for_status()
-                
-                # Ensure the directory exists
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                
-                with open(save_path, 'wb') as file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        file.write(chunk)
-                        
-                self.downloaded_today += 1
-                print(f"Downloaded wallpaper: {wallpaper_url} to {save_path}")
-                return True
-            except Exception as e:
-                print(f"Error downloading wallpaper: {str(e)}")
-                return False
-        else:
-            print("Daily download limit reached.")
+        self.store = store
+        self.catalog = catalog
+        self.phash_index = phash_index
+        self.retention = retention
+        if retention is not None:
+            retention.on_evict.append(self._evicted)
+        self.transcoder = transcoder
+        if transcoder is not None:
+            transcoder.on_done.append(self._transcoded)
+        self.quota = quota or MemoryQuota()
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self._host_locks = {}
+        self._host_locks_lock = threading.Lock()
+        self._phash_dirty = False
+        self._phash_saved_at = time.monotonic()
+        self._phash_save_lock = threading.Lock()
+        self.session = self._create_session()
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        """
+        Build a downloader configured by the settings (ConfigManager.settings)
+
+        The daily limit comes from daily_download_limit and is kept in the
+        SQLiteQuota at DEFAULT_QUOTA_FILE, so it holds across restarts and
+        every process downloading on this machine. The library
+        budget (storage_max_bytes, storage_max_files, retention_policy) is
+        enforced on save_location when one is set. New downloads are
+        re-encoded in the background when transcode_format is set.
+
+        Args:
+            settings: Typed settings view
+            **kwargs: Further constructor arguments (store, catalog, ...),
+                these take precedence over the settings
+        """
+        kwargs.setdefault('download_limit', settings.daily_download_limit or DAILY_DOWNLOAD_LIMIT)
+        if 'quota' not in kwargs:
+            kwargs['quota'] = SQLiteQuota(DEFAULT_QUOTA_FILE)
+        if 'retention' not in kwargs:
+            kwargs['retention'] = retention_from_settings(settings)
+        if 'transcoder' not in kwargs:
+            kwargs['transcoder'] = transcoder_from_settings(settings)
+        return cls(**kwargs)
+
+    def _create_session(self):
+        """Create a pooled HTTP session shared by every download"""
+        session = requests.Session()
+        pool_size = max(self.max_workers, self.per_host_limit)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def downloaded_today(self):
+        """Downloads completed today against this downloader's quota"""
+        return self.quota.used_today()
+
+    def _reserve_slot(self):
+        """Reserve one slot of the daily quota, returns a token or None if the limit is reached"""
+        return self.quota.reserve(self.download_limit)
+
+    def _commit_slot(self, token):
+        self.quota.commit(token)
+
+    def _release_slot(self, token):
+        self.quota.release(token)
+
+    def _slot_renewer(self, token):
+        """Return a callback that keeps token's reservation alive, renewing it at most once a minute"""
+        ttl = getattr(self.quota, 'reservation_ttl', None)
+        interval = min(RESERVATION_RENEW_INTERVAL, ttl / 3) if ttl else RESERVATION_RENEW_INTERVAL
+        renewed_at = time.monotonic()
+
+        def renew():
+            nonlocal renewed_at
+            now = time.monotonic()
+            if now - renewed_at >= interval:
+                renewed_at = now
+                if not self.quota.renew(token):
+                    logger.warning("Download quota reservation expired during a transfer")
+        return renew
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._host_locks_lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_locks[host]
+
+    def download_wallpaper(self, wallpaper_url, save_path, hsh=None, metadata=None):
+        """
+        Download a wallpaper from URL and save it to the given path
+
+        Args:
+            wallpaper_url: URL of the image
+            save_path: Destination file
+            hsh: Provider-side content hash (Bing's 'hsh' field), used to
+                skip images that are already stored
+            metadata: Title, copyright, date, category etc. recorded in the
+                catalog (see WallpaperCatalog.add)
+
+        Returns:
+            Boolean indicating if the wallpaper is available at save_path
+        """
+        success, _ = self._download(wallpaper_url, save_path, hsh, metadata)
+        self.flush()
+        return success
+
+    def _download(self, wallpaper_url, save_path, hsh=None, metadata=None):
+        """Download a single wallpaper, returns (success, error message)"""
+        if self.store:
+            content_hash = self.store.lookup(url=wallpaper_url, source_hash=hsh)
+            if content_hash:
+                try:
+                    stored_path = self.store.link(content_hash, save_path)
+                    metrics.incr('store_hits_total')
+                    logger.info("Wallpaper already stored: %s at %s", wallpaper_url, stored_path)
+                    self._catalog_download(wallpaper_url, stored_path, hsh, metadata, content_hash)
+                    self._retain(stored_path)
+                    return True, None
+                except OSError as e:
+                    logger.warning("Error linking stored wallpaper: %s", e)
+
+        claimed = False
+        token = self._reserve_slot()
+        if token is None:
+            metrics.incr('download_limit_rejections_total')
+            logger.warning("Daily download limit reached.")
+            return False, "Daily download limit reached"
+
+        try:
+            with self._host_semaphore(wallpaper_url):
+                with metrics.timer('download_transfer_seconds'):
+                    content_hash, size, claimed = self._transfer(wallpaper_url, save_path,
+                                                                 self._slot_renewer(token))
+
+            if self.store:
+                self._store_download(wallpaper_url, save_path, content_hash, size, hsh)
+            self._commit_slot(token)
+            self._catalog_download(wallpaper_url, save_path, hsh, metadata, content_hash, size)
+            if claimed:
+                self._phash_dirty = True
+            self._retain(save_path, size)
+            metrics.incr('downloads_total', result='success')
+            logger.info("Downloaded wallpaper: %s to %s", wallpaper_url, save_path)
+            self._transcode(save_path)
+            return True, None
+        except NearDuplicateError as e:
+            self._release_slot(token)
+            metrics.incr('near_duplicates_rejected_total')
+            logger.info("Skipped wallpaper: %s", e)
+            return False, str(e)
+        except Exception as e:
+            self._release_slot(token)
+            if claimed:
+                self.phash_index.remove(save_path)
+            metrics.incr('downloads_total', result='error')
+            logger.error("Error downloading wallpaper: %s", e)
+            return False, str(e)
+
+    def _transfer(self, wallpaper_url, save_path, on_progress=None):
+        """
+        Stream a wallpaper into a temporary file and atomically move it into place
+
+        A partial file left by an interrupted transfer is resumed with a Range
+        request when the server supports it. The partial file is kept when the
+        transfer fails so the next attempt can pick up where it stopped. The
+        resume is conditional (If-Range on the ETag or Last-Modified the
+        partial file was downloaded under), and a 206 that doesn't continue
+        exactly at the partial file's end restarts the transfer, so a
+        changed remote file is never spliced onto old bytes.
+
+        Args:
+            wallpaper_url: URL of the image
+            save_path: Destination file
+            on_progress: Optional callable invoked after every chunk read
+
+        Returns:
+            Tuple of (SHA-256 hex digest, size in bytes, whether save_path was
+            newly added to the perceptual-hash index)
+        """
+        # Ensure the directory exists
+        directory = os.path.dirname(save_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        part_path = save_path + PARTIAL_SUFFIX
+        validator_path = part_path + VALIDATOR_SUFFIX
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = _read_validator(validator_path) if offset else None
+        if not validator:
+            # Without a validator there's no telling whether the partial file still matches
+            offset = 0
+
+        headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset else {}
+        response = self.session.get(wallpaper_url, stream=True, headers=headers)
+        if response.status_code == 416 or (
+                response.status_code == 206 and not _continues_at(response, offset, validator)):
+            # The partial file doesn't fit the current resource, start over
+            response.close()
+            offset = 0
+            response = self.session.get(wallpaper_url, stream=True)
+        response.raise_for_status()
+
+        with response:
+            hasher = hashlib.sha256()
+            if response.status_code == 206 and offset:
+                mode = 'ab'
+                # Hash the bytes we already have before appending the rest
+                with open(part_path, 'rb') as existing:
+                    for block in iter(lambda: existing.read(MAX_CHUNK_SIZE), b''):
+                        hasher.update(block)
+            else:
+                mode = 'wb'
+                offset = 0
+                _write_validator(validator_path, _response_validator(response))
+
+            # Content-Length counts encoded bytes, so it can only be checked for identity bodies
+            content_length = response.headers.get('Content-Length')
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            if content_length and encoding == 'identity':
+                expected_size = offset + int(content_length)
+            else:
+                expected_size = None
+
+            with open(part_path, mode) as file:
+                size = offset + self._stream_to_file(response, file, hasher, on_progress)
+
+        if expected_size is not None and size != expected_size:
+            raise IOError(f"Incomplete download: received {size} of {expected_size} bytes")
+
+        content_hash = hasher.hexdigest()
+        claimed = False
+        # Exact copies of stored content are hardlinked by the store, only
+        # new content is checked for near-duplicates
+        if self.phash_index is not None and not (self.store and self.store.path_for(content_hash)):
+            claimed = self._claim_perceptual_hash(part_path, save_path)
+        try:
+            os.replace(part_path, save_path)
+        except OSError:
+            if claimed:
+                self.phash_index.remove(save_path)
+            raise
+        _write_validator(validator_path, None)
+        return content_hash, size, claimed
+
+    def _claim_perceptual_hash(self, part_path, save_path):
+        """
+        Index a finished transfer by perceptual hash before it is moved into place
+
+        Returns:
+            True if save_path was added to the index by this call (False if
+            it was indexed already or can't be hashed)
+
+        Raises:
+            NearDuplicateError: if a near-identical image is already indexed
+                (the partial file is deleted)
+        """
+        from ..utils.perceptual_hash import dhash
+
+        try:
+            phash = dhash(part_path)
+        except Exception as e:
+            logger.debug("Can't compute perceptual hash of %s: %s", save_path, e)
             return False
+        already_indexed = save_path in self.phash_index
+        matches = self.phash_index.claim(save_path, phash)
+        if matches:
+            os.remove(part_path)
+            _write_validator(part_path + VALIDATOR_SUFFIX, None)
+            duplicate, distance = matches[0]
+            raise NearDuplicateError(f"{save_path} is a near-duplicate of {duplicate} (distance {distance})")
+        return not already_indexed
+
+    def _stream_to_file(self, response, file, hasher, on_progress=None):
+        """Copy the response body to file, adapting the read size to the observed throughput"""
+        chunk_size = INITIAL_CHUNK_SIZE
+        written = 0
+        # Timing every write is only worth it when someone is collecting it
+        time_writes = metrics.enabled
+        write_seconds = 0.0
+        while True:
+            started = time.perf_counter()
+            chunk = response.raw.read(chunk_size, decode_content=True)
+            if not chunk:
+                break
+            elapsed = time.perf_counter() - started
+            hasher.update(chunk)
+            if time_writes:
+                write_started = time.perf_counter()
+                file.write(chunk)
+                write_seconds += time.perf_counter() - write_started
+            else:
+                file.write(chunk)
+            written += len(chunk)
+            if on_progress is not None:
+                on_progress()
+
+            if elapsed < TARGET_READ_SECONDS and len(chunk) == chunk_size:
+                chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+            elif elapsed > TARGET_READ_SECONDS * 2:
+                chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+
+        if time_writes:
+            metrics.observe('download_disk_write_seconds', write_seconds)
+            metrics.incr('download_bytes_total', written)
+        return written
+
+    def _store_download(self, wallpaper_url, save_path, content_hash, size, hsh):
+        """Index a finished download, replacing duplicate content with a link"""
+        canonical = self.store.add(wallpaper_url, content_hash, save_path, size, source_hash=hsh)
+        if os.path.abspath(canonical) != os.path.abspath(save_path):
+            os.remove(save_path)
+            self.store.link(content_hash, save_path)
+            logger.info("Duplicate content of %s, linked instead of copied", canonical)
+
+    def _catalog_download(self, wallpaper_url, save_path, hsh, metadata, content_hash, size=None):
+        """Record a finished download in the catalog; a catalog failure doesn't fail the download"""
+        if not self.catalog:
+            return
+        metadata = dict(metadata or {})
+        if hsh and not metadata.get('hsh'):
+            metadata['hsh'] = hsh
+        try:
+            self.catalog.add(save_path, metadata, url=wallpaper_url, content_hash=content_hash, size=size)
+        except sqlite3.Error as e:
+            logger.warning("Error recording wallpaper in catalog: %s", e)
+
+    def _retain(self, save_path, size=None):
+        """Record a finished download and evict what no longer fits the library budget"""
+        if self.retention is None:
+            return
+        try:
+            self.retention.record(save_path, size)
+            evicted = self.retention.enforce()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Error enforcing the library budget: %s", e)
+            return
+        if evicted:
+            logger.info("Evicted %d wallpaper(s) to stay within the library budget", len(evicted))
+
+    def _evicted(self, path):
+        """Retention callback: drop an evicted file from every other index"""
+        if self.catalog:
+            try:
+                self.catalog.remove(path)
+            except sqlite3.Error as e:
+                logger.warning("Error removing evicted wallpaper from catalog: %s", e)
+        if self.store:
+            try:
+                self.store.remove_path(path)
+            except sqlite3.Error as e:
+                logger.warning("Error removing evicted wallpaper from store: %s", e)
+        if self.phash_index is not None and self.phash_index.remove(path):
+            self._phash_dirty = True
+
+    def _transcode(self, save_path):
+        """Queue a finished download for re-encoding; a transcoder failure doesn't fail the download"""
+        if self.transcoder is None or self.store:
+            return
+        try:
+            self.transcoder.submit(save_path)
+        except RuntimeError as e:
+            # The pool was shut down or a worker process died
+            logger.warning("Error queueing %s for transcoding: %s", save_path, e)
+
+    def _transcoded(self, result):
+        """Transcoder callback: point the indexes at the re-encoded file"""
+        source, path = result['source'], result.get('path')
+        if result.get('error') or path == source or os.path.exists(source):
+            # Failed, not smaller than the original, or the original was kept
+            return
+        if self.retention is not None:
+            try:
+                tracked = self.retention.move(source, path, result['bytes'])
+            except sqlite3.Error as e:
+                logger.warning("Error updating retention index after transcoding: %s", e)
+                tracked = True
+            if not tracked:
+                # The original was evicted while it was being transcoded
+                logger.info("Discarding %s, its original was evicted", path)
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning("Error removing %s: %s", path, e)
+                return
+        if self.catalog:
+            try:
+                self.catalog.move(source, path, result['bytes'])
+            except sqlite3.Error as e:
+                logger.warning("Error updating catalog after transcoding: %s", e)
+        if self.phash_index is not None and self.phash_index.move(source, path):
+            self._phash_dirty = True
+            self._save_phash_index(force=False)
+
+    def _save_phash_index(self, force=True):
+        """
+        Persist the perceptual-hash index if it changed since the last save
+
+        Args:
+            force: Save now; otherwise only if PHASH_SAVE_INTERVAL passed since the last save
+        """
+        if self.phash_index is None or not self.phash_index.index_file:
+            return
+        with self._phash_save_lock:
+            if not self._phash_dirty:
+                return
+            if not force and time.monotonic() - self._phash_saved_at < PHASH_SAVE_INTERVAL:
+                return
+            self._phash_dirty = False
+            self._phash_saved_at = time.monotonic()
+            try:
+                self.phash_index.save()
+            except OSError as e:
+                self._phash_dirty = True
+                logger.warning("Error saving perceptual-hash index: %s", e)
+
+    def flush(self):
+        """
+        Save pending index changes
+
+        Called after every download_wallpaper and download_many call; call it
+        before exiting when a transcoder may still have been moving files.
+        """
+        self._save_phash_index()
+
+    def download_many(self, items, max_workers=None):
+        """
+        Download several wallpapers concurrently over the shared session
+
+        Args:
+            items: Iterable of (wallpaper_url, save_path[, hsh[, metadata]])
+                tuples or dicts with 'url', 'save_path' and optional 'hsh'
+                and 'metadata' keys
+            max_workers: Override for the number of worker threads
+
+        Returns:
+            List of dicts (url, save_path, success, error), one per item and
+            in the same order as the input
+        """
+        jobs = []
+        for item in items:
+            if isinstance(item, dict):
+                jobs.append((item['url'], item['save_path'], item.get('hsh'), item.get('metadata')))
+            else:
+                url, save_path, *rest = item
+                rest += [None] * (2 - len(rest))
+                jobs.append((url, save_path, rest[0], rest[1]))
+
+        if not jobs:
+            return []
+
+        workers = min(max_workers or self.max_workers, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(lambda job: self._download(*job), jobs))
+        # One index save for the whole batch
+        self.flush()
+
+        return [
+            {'url': url, 'save_path': save_path, 'success': success, 'error': error}
+            for (url, save_path, _, _), (success, error) in zip(jobs, outcomes)
+        ]
 
     def set_download_limit(self, limit):
         """Set the daily download limit"""
         try:
             self.download_limit = int(limit)
-            print(f"Download limit set to: {self.download_limit}")
+            logger.info("Download limit set to: %d", self.download_limit)
             return True
         except Exception as e:
-            print(f"Error setting download limit: {str(e)}")
+            logger.error("Error setting download limit: %s", e)
             return False
\ No newline at end of file
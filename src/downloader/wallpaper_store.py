@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_INDEX_FILE = os.path.join('data', 'wallpaper_index.sqlite')
+
+class WallpaperStore:
+    """
+    Content-addressed index of downloaded wallpapers
+
+    Keeps a persistent SQLite mapping of url -> SHA-256 -> path, so a
+    wallpaper that was already downloaded (under any URL or Bing hsh) is
+    never fetched or stored twice. Duplicates become hardlinks to the
+    canonical file, or an alias row when hardlinks aren't possible.
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE):
+        self.index_file = index_file
+        directory = os.path.dirname(index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_file, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    source_hash TEXT
+                );
+                CREATE INDEX IF NOT EXISTS urls_source_hash ON urls (source_hash);
+                CREATE TABLE IF NOT EXISTS aliases (
+                    path TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL
+                );
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def path_for(self, content_hash):
+        """Return the canonical path holding the given content, or None if it is gone"""
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def lookup(self, url=None, source_hash=None):
+        """
+        Find already stored content for a URL or a provider-side hash (Bing's hsh)
+
+        Returns:
+            The SHA-256 of the stored content, or None if it isn't on disk
+        """
+        with self._lock:
+            row = None
+            if url:
+                row = self._conn.execute("SELECT hash FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None and source_hash:
+                row = self._conn.execute(
+                    "SELECT hash FROM urls WHERE source_hash = ? LIMIT 1", (source_hash,)
+                ).fetchone()
+        if row and self.path_for(row[0]):
+            return row[0]
+        return None
+
+    def add(self, url, content_hash, path, size, source_hash=None):
+        """
+        Record freshly downloaded content
+
+        Returns:
+            The canonical path for the content. If it differs from path, the
+            content was already stored and the new file is a duplicate.
+        """
+        canonical = self.path_for(content_hash)
+        with self._lock, self._conn:
+            # path may have been overwritten, it no longer holds what it used to
+            self._release(path, content_hash)
+            if canonical is None:
+                canonical = path
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (hash, path, size) VALUES (?, ?, ?)",
+                    (content_hash, path, size),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, hash, source_hash) VALUES (?, ?, ?)",
+                (url, content_hash, source_hash),
+            )
+        return canonical
+
+    def link(self, content_hash, save_path):
+        """
+        Make stored content available at save_path without copying it
+
+        Returns:
+            The path that holds the content: save_path when a hardlink could
+            be made, otherwise the canonical path (recorded as an alias)
+        """
+        canonical = self.path_for(content_hash)
+        if canonical is None:
+            raise FileNotFoundError(f"No stored content for {content_hash}")
+
+        if os.path.abspath(canonical) == os.path.abspath(save_path):
+            return save_path
+        if os.path.exists(save_path) and os.path.samefile(canonical, save_path):
+            return save_path
+
+        # Link beside save_path and rename over it, replacing whatever it held before
+        temp_path = f"{save_path}.link"
+        try:
+            directory = os.path.dirname(save_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            os.link(canonical, temp_path)
+            os.replace(temp_path, save_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO aliases (path, hash) VALUES (?, ?)",
+                    (save_path, content_hash),
+                )
+            return canonical
+        # Remember the link so it can take over as canonical path (see remove_path)
+        with self._lock, self._conn:
+            self._release(save_path, content_hash)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aliases (path, hash) VALUES (?, ?)", (save_path, content_hash)
+            )
+        return save_path
+
+    def remove_path(self, path):
+        """
+        Forget a path whose file was deleted (e.g. evicted by the retention manager)
+
+        If path was the canonical copy of its content, another linked copy
+        still on disk becomes canonical; without one the content is dropped
+        from the index and will be downloaded again when needed.
+        """
+        with self._lock, self._conn:
+            self._release(path)
+
+    def _release(self, path, content_hash=None):
+        """Drop the rows placing content other than content_hash at path (lock held)"""
+        self._conn.execute("DELETE FROM aliases WHERE path = ? AND hash IS NOT ?", (path, content_hash))
+        for (stale_hash,) in self._conn.execute(
+            "SELECT hash FROM blobs WHERE path = ? AND hash IS NOT ?", (path, content_hash)
+        ).fetchall():
+            for (alias,) in self._conn.execute(
+                "SELECT path FROM aliases WHERE hash = ?", (stale_hash,)
+            ).fetchall():
+                if os.path.exists(alias):
+                    self._conn.execute("UPDATE blobs SET path = ? WHERE hash = ?", (alias, stale_hash))
+                    self._conn.execute("DELETE FROM aliases WHERE path = ?", (alias,))
+                    break
+            else:
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (stale_hash,))
+                self._conn.execute("DELETE FROM aliases WHERE hash = ?", (stale_hash,))
+
+    def resolve(self, path):
+        """Return the file that actually holds the content for path (following aliases)"""
+        if os.path.exists(path):
+            return path
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM aliases WHERE path = ?", (path,)).fetchone()
+        if row:
+            return self.path_for(row[0])
+        return None
\ No newline at end of file
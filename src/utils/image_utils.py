@@ -1,6 +1,18 @@
-def resize_image(image, size):
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from ..config.settings import RESOLUTION_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+def _lanczos():
     from PIL import Image
-    return image.resize(size, Image.ANTIALIAS)
+    # Image.ANTIALIAS was removed in Pillow 10, Image.Resampling exists since 9.1
+    resampling = getattr(Image, 'Resampling', Image)
+    return resampling.LANCZOS
+
+def resize_image(image, size):
+    return image.resize(size, _lanczos())
 
 def save_image(image, path):
     image.save(path)
@@ -14,4 +26,102 @@ def convert_image_format(image, format):
     img_byte_arr = BytesIO()
     image.save(img_byte_arr, format=format)
     img_byte_arr.seek(0)
-    return img_byte_arr.getvalue()
\ No newline at end of file
+    return img_byte_arr.getvalue()
+
+def parse_resolution(resolution):
+    """Turn a "WIDTHxHEIGHT" string into a (width, height) tuple"""
+    width, height = resolution.lower().split('x')
+    return int(width), int(height)
+
+def derivative_path(source_path, resolution, output_dir=None):
+    """Return where the derivative of source_path at resolution is stored"""
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    directory = output_dir or os.path.dirname(source_path)
+    return os.path.join(directory, f"{stem}_{resolution}.jpg")
+
+def generate_derivatives(source_path, output_dir=None, resolutions=None, quality=90):
+    """
+    Produce every requested resolution from one downloaded original
+
+    The original is decoded only once, at the smallest JPEG draft scale that
+    still covers every requested size. Each derivative is cropped exactly once,
+    from the smallest uncropped downscale made so far that covers it in both
+    dimensions, so crops for different aspect ratios never compound. Sizes
+    larger than the original are skipped.
+
+    Args:
+        source_path: Path of the original image
+        output_dir: Directory for the derivatives (defaults to the original's)
+        resolutions: List of "WIDTHxHEIGHT" strings (defaults to RESOLUTION_OPTIONS)
+        quality: JPEG quality of the derivatives
+
+    Returns:
+        Dict mapping resolution strings to derivative paths
+    """
+    from PIL import Image
+
+    sizes = sorted(
+        {parse_resolution(resolution) for resolution in (resolutions or RESOLUTION_OPTIONS)},
+        key=lambda size: size[0] * size[1],
+        reverse=True,
+    )
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = {}
+    with Image.open(source_path) as image:
+        source_width, source_height = image.size
+        sizes = [(w, h) for w, h in sizes if w <= source_width and h <= source_height]
+        if not sizes:
+            return results
+
+        # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+        image.draft('RGB', (max(w for w, _ in sizes), max(h for _, h in sizes)))
+        # Full-frame (never cropped) versions of the original, largest first
+        scaled = [image.convert('RGB')]
+
+    for width, height in sizes:
+        base = min((candidate for candidate in scaled
+                    if candidate.width >= width and candidate.height >= height),
+                   key=lambda candidate: candidate.width * candidate.height)
+        scale = max(width / base.width, height / base.height)
+        cover_size = (max(width, round(base.width * scale)), max(height, round(base.height * scale)))
+        if cover_size != base.size:
+            base = base.resize(cover_size, _lanczos())
+            scaled.append(base)
+        left = (base.width - width) // 2
+        top = (base.height - height) // 2
+        derivative = base.crop((left, top, left + width, top + height))
+        resolution = f"{width}x{height}"
+        path = derivative_path(source_path, resolution, output_dir)
+        derivative.save(path, 'JPEG', quality=quality)
+        results[resolution] = path
+    return results
+
+def _derivatives_job(job):
+    source_path, output_dir, resolutions, quality = job
+    try:
+        return source_path, generate_derivatives(source_path, output_dir, resolutions, quality), None
+    except Exception as e:
+        return source_path, {}, str(e)
+
+def generate_derivatives_batch(source_paths, output_dir=None, resolutions=None, quality=90, max_workers=None):
+    """
+    Run generate_derivatives for many originals across a process pool
+
+    Returns:
+        Dict mapping each source path to a dict with 'derivatives' and 'error'
+    """
+    jobs = [(path, output_dir, resolutions, quality) for path in source_paths]
+    if not jobs:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(_derivatives_job, jobs))
+
+    results = {}
+    for source_path, derivatives, error in outcomes:
+        if error:
+            logger.error("Error generating derivatives for %s: %s", source_path, error)
+        results[source_path] = {'derivatives': derivatives, 'error': error}
+    return results
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""
+Perceptual hashing for near-duplicate wallpaper detection
+
+A dHash survives rescaling, recompression and small crops, so the same
+Bing image saved at another resolution, from another market or re-served
+by another provider ends up a few bits away from the original. Hashes are
+kept in a packed uint64 NumPy array and compared with vectorized XOR and
+popcount scans.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+HASH_SIZE = 8  # 8x8 gradient bits, one uint64 per image
+DEFAULT_MAX_DISTANCE = 10  # Hamming distance at or below which two images count as duplicates
+DEFAULT_INDEX_FILE = os.path.join('data', 'phash_index.npz')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif')
+
+# Bits set in every byte value, for numpy builds without bitwise_count
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+logger = logging.getLogger(__name__)
+
+def popcount(values):
+    """Number of set bits in every element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def dhash(image_or_path):
+    """
+    Compute the 64-bit difference hash of an image
+
+    Args:
+        image_or_path: PIL image or path to an image file
+
+    Returns:
+        The hash as a Python int
+    """
+    from PIL import Image
+
+    if isinstance(image_or_path, Image.Image):
+        image = image_or_path
+        owned = False
+    else:
+        image = Image.open(image_or_path)
+        owned = True
+    try:
+        # Only a tiny thumbnail is needed, let the JPEG decoder skip most of the work
+        image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+        small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    finally:
+        if owned:
+            image.close()
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming_distance(first, second):
+    return bin(first ^ second).count('1')
+
+class PerceptualHashIndex:
+    """
+    In-memory index of perceptual hashes, persisted as a .npz file
+
+    Hashes live in one contiguous uint64 array (grown by doubling), so a
+    query is a single XOR/popcount pass over the whole library.
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, max_distance=DEFAULT_MAX_DISTANCE):
+        self.index_file = index_file
+        self.max_distance = max_distance
+        self._hashes = np.zeros(64, dtype=np.uint64)
+        self._paths = []
+        self._positions = {}
+        self._lock = threading.RLock()
+        if index_file and os.path.exists(index_file):
+            self.load()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return path in self._positions
+
+    @property
+    def hashes(self):
+        """The packed hashes, one per indexed path"""
+        return self._hashes[:len(self._paths)]
+
+    @property
+    def paths(self):
+        with self._lock:
+            return list(self._paths)
+
+    def load(self):
+        with np.load(self.index_file, allow_pickle=False) as data:
+            hashes = data['hashes'].astype(np.uint64)
+            paths = [str(path) for path in data['paths']]
+        with self._lock:
+            self._hashes = np.zeros(max(64, len(hashes)), dtype=np.uint64)
+            self._hashes[:len(hashes)] = hashes
+            self._paths = paths
+            self._positions = {path: position for position, path in enumerate(paths)}
+
+    def save(self):
+        """Write the index atomically (temp file + rename)"""
+        directory = os.path.dirname(self.index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.index_file}.tmp.npz"
+        with self._lock:
+            np.savez(temp_file, hashes=self.hashes, paths=np.array(self._paths, dtype=str))
+            os.replace(temp_file, self.index_file)
+
+    def add(self, path, phash):
+        """Index path under phash (replacing any previous hash for it)"""
+        with self._lock:
+            position = self._positions.get(path)
+            if position is None:
+                position = len(self._paths)
+                if position == len(self._hashes):
+                    grown = np.zeros(len(self._hashes) * 2, dtype=np.uint64)
+                    grown[:position] = self._hashes
+                    self._hashes = grown
+                self._paths.append(path)
+                self._positions[path] = position
+            self._hashes[position] = np.uint64(phash)
+
+    def remove(self, path):
+        """Drop path from the index, returns True if it was indexed"""
+        with self._lock:
+            position = self._positions.pop(path, None)
+            if position is None:
+                return False
+            last = len(self._paths) - 1
+            if position != last:
+                # Move the last entry into the hole to keep the array packed
+                moved = self._paths[last]
+                self._paths[position] = moved
+                self._hashes[position] = self._hashes[last]
+                self._positions[moved] = position
+            self._paths.pop()
+            return True
+
+    def move(self, path, new_path):
+        """Index path's hash under new_path instead, returns True if it was indexed"""
+        with self._lock:
+            if path not in self._positions:
+                return False
+            if new_path != path:
+                self.remove(new_path)
+            position = self._positions.pop(path)
+            self._paths[position] = new_path
+            self._positions[new_path] = position
+            return True
+
+    def hash_of(self, path):
+        """The hash indexed for path, or None"""
+        with self._lock:
+            position = self._positions.get(path)
+            return None if position is None else int(self._hashes[position])
+
+    def distances(self, phash):
+        """Hamming distance from phash to every indexed hash"""
+        with self._lock:
+            return popcount(self.hashes ^ np.uint64(phash))
+
+    def query(self, phash, max_distance=None, exclude=None):
+        """
+        Find indexed images close to phash
+
+        Args:
+            phash: Hash to look for
+            max_distance: Override for the index's max_distance
+            exclude: Path to leave out of the results (e.g. the image itself)
+
+        Returns:
+            List of (path, distance) tuples, closest first
+        """
+        limit = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            if not self._paths:
+                return []
+            distances = self.distances(phash)
+            matches = np.flatnonzero(distances <= limit)
+            matches = matches[np.argsort(distances[matches], kind='stable')]
+            return [
+                (self._paths[position], int(distances[position]))
+                for position in matches if self._paths[position] != exclude
+            ]
+
+    def claim(self, path, phash, max_distance=None):
+        """
+        Index path unless a near-duplicate is already indexed, in one atomic step
+
+        Returns:
+            The matching (path, distance) tuples; empty if path was added
+        """
+        with self._lock:
+            matches = self.query(phash, max_distance, exclude=path)
+            if not matches:
+                self.add(path, phash)
+            return matches
+
+    def duplicate_groups(self, max_distance=None):
+        """
+        Group every indexed image with its near-duplicates
+
+        Returns:
+            List of path lists, each with at least two near-identical images
+        """
+        limit = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            hashes = self.hashes.copy()
+            indexed_paths = list(self._paths)
+        parents = list(range(len(hashes)))
+
+        def find(position):
+            while parents[position] != position:
+                parents[position] = parents[parents[position]]
+                position = parents[position]
+            return position
+
+        for position in range(len(hashes) - 1):
+            # Only compare against later entries, earlier pairs were already seen
+            later = np.flatnonzero(popcount(hashes[position + 1:] ^ hashes[position]) <= limit)
+            for other in later + position + 1:
+                root, other_root = find(position), find(int(other))
+                if root != other_root:
+                    parents[other_root] = root
+
+        groups = {}
+        for position, path in enumerate(indexed_paths):
+            groups.setdefault(find(position), []).append(path)
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+def _hash_job(path):
+    try:
+        return path, dhash(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+def _pixel_count(path):
+    from PIL import Image
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+        return width * height
+    except Exception:
+        return 0
+
+def _is_within(path, directory):
+    return os.path.commonpath([path, directory]) == directory
+
+def dedupe_directory(directory, index=None, max_distance=DEFAULT_MAX_DISTANCE, delete=False, max_workers=None):
+    """
+    Find (and optionally delete) near-duplicate images in a directory tree
+
+    New or unindexed files are hashed in parallel worker processes. Paths are
+    compared by their real path, so a file indexed under another spelling
+    (e.g. the downloader's relative save_path) is never its own duplicate. In
+    each group the image with the most pixels (then the largest file) is kept,
+    and only files inside directory within max_distance of it are reported;
+    other links to the kept file are left alone.
+
+    Args:
+        directory: Directory to scan, e.g. data/wallpapers
+        index: PerceptualHashIndex to use and update (a fresh one by default)
+        max_distance: Hamming distance at or below which images are duplicates
+        delete: Remove the duplicates from disk and from the index
+        max_workers: Number of hashing processes
+
+    Returns:
+        List of {'keep': path, 'duplicates': [paths]} dicts, with real paths
+    """
+    directory = os.path.realpath(directory)
+    index = index if index is not None else PerceptualHashIndex(index_file=None)
+    for stale in [path for path in index.paths if not os.path.exists(path)]:
+        index.remove(stale)
+    # Every spelling the index knows each real path by
+    spellings = {}
+    for path in index.paths:
+        spellings.setdefault(os.path.realpath(path), []).append(path)
+
+    paths = set()
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.realpath(os.path.join(root, name))
+                if _is_within(path, directory):
+                    paths.add(path)
+
+    unindexed = sorted(path for path in paths if path not in spellings)
+    if unindexed:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for path, phash, error in executor.map(_hash_job, unindexed, chunksize=16):
+                if error:
+                    logger.warning("Error hashing %s: %s", path, error)
+                else:
+                    index.add(path, phash)
+                    spellings[path] = [path]
+
+    # Group only the files found under directory, each under its real path once
+    scanned = PerceptualHashIndex(index_file=None, max_distance=max_distance)
+    for path in sorted(paths):
+        if path in spellings:
+            scanned.add(path, index.hash_of(spellings[path][0]))
+
+    report = []
+    for group in scanned.duplicate_groups(max_distance):
+        # Groups chain near-duplicates (A~B~C), only delete what is close to the kept image
+        remaining = sorted(group, key=lambda path: (_pixel_count(path), os.path.getsize(path), path), reverse=True)
+        while remaining:
+            keep, candidates = remaining[0], remaining[1:]
+            keep_hash = scanned.hash_of(keep)
+            duplicates, remaining = [], []
+            for path in candidates:
+                if hamming_distance(keep_hash, scanned.hash_of(path)) > max_distance:
+                    remaining.append(path)
+                elif not os.path.samefile(keep, path):
+                    duplicates.append(path)
+            if not duplicates:
+                continue
+            if delete:
+                for path in duplicates:
+                    try:
+                        os.remove(path)
+                        for spelling in spellings.get(path, []):
+                            index.remove(spelling)
+                    except OSError as e:
+                        logger.warning("Error removing duplicate %s: %s", path, e)
+            report.append({'keep': keep, 'duplicates': duplicates})
+    return report
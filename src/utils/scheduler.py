@@ -1,23 +1,254 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Named frequencies (see DEFAULT_DOWNLOAD_FREQUENCY) in seconds
+NAMED_FREQUENCIES = {
+    'hourly': 3600,
+    'daily': 24 * 3600,
+    'weekly': 7 * 24 * 3600,
+}
+
+UNIT_SECONDS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 24 * 3600,
+    'week': 7 * 24 * 3600,
+}
+
+_FREQUENCY_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(second|minute|hour|day|week)s?\s*$', re.IGNORECASE)
+
+def parse_frequency(frequency):
+    """
+    Convert a frequency setting into an interval in seconds
+
+    Accepts a number of seconds, a named frequency ("hourly", "daily",
+    "weekly") or an "<amount> <unit>" string such as "1 second" or "15 minutes".
+    """
+    if isinstance(frequency, (int, float)):
+        seconds = float(frequency)
+    elif str(frequency).strip().lower() in NAMED_FREQUENCIES:
+        seconds = float(NAMED_FREQUENCIES[str(frequency).strip().lower()])
+    else:
+        match = _FREQUENCY_RE.match(str(frequency))
+        if not match:
+            raise ValueError(f"Unknown download frequency: {frequency}")
+        seconds = float(match.group(1)) * UNIT_SECONDS[match.group(2).lower()]
+    if seconds <= 0:
+        raise ValueError(f"Download frequency must be positive: {frequency}")
+    return seconds
+
 class Scheduler:
-    def __init__(self):
-        self.scheduled_tasks = []
-
-    def schedule_download(self, frequency, wallpaper_type, resolution):
-        # Logic to schedule wallpaper downloads based on user-defined settings
-        task = {
-            'frequency': frequency,
-            'type': wallpaper_type,
-            'resolution': resolution
-        }
-        self.scheduled_tasks.append(task)
+    """
+    Timer-driven download scheduler
+
+    Tasks live in a heap ordered by their next run time and a single worker
+    thread sleeps until the earliest one is due. Tasks sharing (provider,
+    type, resolution) that are due together fire as one callback. Last run
+    times are persisted, so runs missed while the process was down are
+    caught up once on start. Cancelling marks the heap entry as removed
+    instead of searching the heap for it.
+    """
+
+    def __init__(self, callback=None, state_file=None, jitter=0.0, coalesce_window=1.0, clock=time.time):
+        """
+        Args:
+            callback: Called as callback(provider, wallpaper_type, resolution)
+                for every group of due tasks
+            state_file: JSON file used to remember last run times
+            jitter: Random delay added to each run, as a fraction of its interval
+            coalesce_window: Tasks due within this many seconds of each other
+                fire together
+            clock: Time source (seconds since the epoch)
+        """
+        self.callback = callback
+        self.state_file = state_file
+        self.jitter = jitter
+        self.coalesce_window = coalesce_window
+        self.clock = clock
+        self._tasks = {}
+        self._entries = {}
+        self._heap = []
+        self._removed = 0
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._last_runs = self._load_state()
+
+    def _load_state(self):
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            with open(temp_file, 'w') as file:
+                json.dump(self._last_runs, file)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            logger.warning("Error saving scheduler state: %s", e)
+
+    @staticmethod
+    def _state_key(task):
+        return f"{task['provider']}|{task['type']}|{task['resolution']}|{task['interval']}"
+
+    def _jittered(self, when, interval):
+        if self.jitter:
+            when += random.uniform(0, self.jitter * interval)
+        return when
+
+    def _push(self, task, when):
+        # The sequence number breaks ties so task ids are never compared
+        entry = [when, next(self._sequence), task['id']]
+        self._entries[task['id']] = entry
+        task['next_run'] = when
+        heapq.heappush(self._heap, entry)
+
+    def schedule_download(self, frequency, wallpaper_type, resolution, provider='Bing'):
+        """Schedule recurring downloads, returns the task dict"""
+        interval = parse_frequency(frequency)
+        now = self.clock()
+        with self._condition:
+            task = {
+                'id': next(self._ids),
+                'frequency': frequency,
+                'type': wallpaper_type,
+                'resolution': resolution,
+                'provider': provider,
+                'interval': interval,
+            }
+            last_run = self._last_runs.get(self._state_key(task))
+            if last_run is None:
+                when = self._jittered(now + interval, interval)
+            else:
+                # A run missed while the process was down is caught up once
+                when = max(last_run + interval, now)
+            self._tasks[task['id']] = task
+            self._push(task, when)
+            self._condition.notify()
         return task
 
     def cancel_schedule(self, task):
-        # Logic to cancel a scheduled wallpaper download
-        if task in self.scheduled_tasks:
-            self.scheduled_tasks.remove(task)
-            return True
-        return False
+        """Cancel a scheduled task (dict or id), returns False if it wasn't scheduled"""
+        task_id = task['id'] if isinstance(task, dict) else task
+        with self._condition:
+            if self._tasks.pop(task_id, None) is None:
+                return False
+            entry = self._entries.pop(task_id, None)
+            if entry is not None:  # None while the task is running
+                entry[2] = None  # Skipped when it reaches the top of the heap
+                self._removed += 1
+                if self._removed > len(self._heap) // 2:
+                    self._heap = [entry for entry in self._heap if entry[2] is not None]
+                    heapq.heapify(self._heap)
+                    self._removed = 0
+            self._condition.notify()
+        return True
 
     def get_scheduled_tasks(self):
-        return self.scheduled_tasks
\ No newline at end of file
+        with self._condition:
+            return list(self._tasks.values())
+
+    @property
+    def scheduled_tasks(self):
+        return self.get_scheduled_tasks()
+
+    def _next_due(self):
+        """Drop cancelled entries from the top of the heap and return the next run time"""
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._removed -= 1
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now):
+        """Pop every task due by now, grouped by (provider, type, resolution)"""
+        groups = {}
+        while True:
+            when = self._next_due()
+            if when is None or when > now + self.coalesce_window:
+                break
+            _, _, task_id = heapq.heappop(self._heap)
+            del self._entries[task_id]
+            task = self._tasks[task_id]
+            groups.setdefault((task['provider'], task['type'], task['resolution']), []).append(task)
+        return groups
+
+    def run_pending(self):
+        """Fire every due task group, returns the number of callbacks made"""
+        now = self.clock()
+        with self._condition:
+            groups = self._pop_due(now)
+        if not groups:
+            return 0
+
+        for provider, wallpaper_type, resolution in groups:
+            if self.callback:
+                try:
+                    self.callback(provider, wallpaper_type, resolution)
+                except Exception as e:
+                    logger.exception("Error running scheduled download: %s", e)
+
+        finished = self.clock()
+        with self._condition:
+            for tasks in groups.values():
+                for task in tasks:
+                    self._last_runs[self._state_key(task)] = finished
+                    if task['id'] not in self._tasks:
+                        continue  # Cancelled while running
+                    when = task['next_run'] + task['interval']
+                    if when <= finished:
+                        when = finished + task['interval']
+                    self._push(task, self._jittered(when, task['interval']))
+            self._save_state()
+        return len(groups)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                when = self._next_due()
+                delay = None if when is None else when - self.clock()
+                if delay is None or delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            self.run_pending()
+
+    def start(self):
+        """Start firing tasks on a background thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='wallpaper-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
\ No newline at end of file
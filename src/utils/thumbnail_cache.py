@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'thumbnails')
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MEMORY_ITEMS = 64
+THUMBNAIL_SIZE = (320, 180)
+
+class ThumbnailCache:
+    """
+    Size-bounded cache of preview thumbnails
+
+    Thumbnails are fetched from the provider's small image variant when one
+    is known, otherwise generated once from the full image. They are kept on
+    disk under a byte budget with LRU eviction, and the most recently used
+    ones are also held in memory.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_items=DEFAULT_MEMORY_ITEMS, size=THUMBNAIL_SIZE, session=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.size = size
+        self.session = session or requests.Session()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._disk = self._scan()
+
+    def _scan(self):
+        """Build the LRU index of files already on disk (oldest access first)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name[:-4], stat.st_size))
+        index = OrderedDict()
+        for _, key, size in sorted(entries):
+            index[key] = size
+            self._disk_bytes += size
+        return index
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def get(self, url, thumbnail_url=None):
+        """
+        Return JPEG thumbnail bytes for an image
+
+        Args:
+            url: URL of the full image (identifies the thumbnail)
+            thumbnail_url: URL of a small variant served by the provider
+
+        Returns:
+            Thumbnail bytes
+        """
+        key = self._key(url)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), 'rb') as file:
+                    data = file.read()
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._remember(key, data)
+                return data
+            except OSError:
+                pass
+
+        data = self._create(url, thumbnail_url)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, data)
+        self._store(key, data)
+        return data
+
+    def _create(self, url, thumbnail_url):
+        """Fetch the provider's small variant, or downscale the full image"""
+        if thumbnail_url:
+            try:
+                response = self.session.get(thumbnail_url, timeout=10)
+                response.raise_for_status()
+                return response.content
+            except requests.RequestException as e:
+                logger.debug("Thumbnail variant unavailable, generating it: %s", e)
+
+        from PIL import Image
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        with Image.open(BytesIO(response.content)) as image:
+            image.draft('RGB', self.size)
+            image = image.convert('RGB')
+            image.thumbnail(self.size)
+            output = BytesIO()
+            image.save(output, 'JPEG', quality=85)
+        return output.getvalue()
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _store(self, key, data):
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Error caching thumbnail: %s", e)
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            evicted = []
+            while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def get_previews(self, items, count=None, max_workers=8):
+        """
+        Load thumbnails for a preview grid concurrently
+
+        Args:
+            items: Provider result dicts with 'url' and optional 'thumbnail_url'
+            count: Number of items to preview (e.g. the preview_fetch_count setting)
+            max_workers: Number of concurrent fetches for uncached thumbnails
+
+        Returns:
+            List of thumbnail bytes (None where loading failed), in item order
+        """
+        items = list(items)[:count] if count else list(items)
+        if not items:
+            return []
+
+        def load(item):
+            try:
+                return self.get(item['url'], item.get('thumbnail_url'))
+            except Exception as e:
+                logger.warning("Error loading preview for %s: %s", item.get('url'), e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(load, items))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'disk_bytes': self._disk_bytes,
+                'disk_items': len(self._disk),
+            }
\ No newline at end of file
@@ -0,0 +1,234 @@
+import logging
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from ..config.settings import DEFAULT_TRANSCODE_QUALITY, TRANSCODE_FORMATS
+from .metrics import metrics
+
+# Pillow format name and file extension per target format
+ENCODERS = {
+    'webp': ('WEBP', '.webp'),
+    'avif': ('AVIF', '.avif'),
+}
+DEFAULT_FORMAT = 'webp'
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_NICENESS = 10  # Added to the worker processes' nice value
+
+PARTIAL_SUFFIX = '.part'
+
+logger = logging.getLogger(__name__)
+
+def transcoded_path(source_path, format=DEFAULT_FORMAT):
+    """Return where the transcoded copy of source_path is written"""
+    return os.path.splitext(source_path)[0] + ENCODERS[format][1]
+
+def transcode_image(source_path, format=DEFAULT_FORMAT, quality=DEFAULT_TRANSCODE_QUALITY, keep_original=False):
+    """
+    Re-encode an image to WebP or AVIF
+
+    The image is saved straight to a temporary file next to the destination,
+    which is renamed into place once complete, so a crash never leaves a
+    truncated image. Pillow's WebP and AVIF encoders still build the whole
+    encoded image in memory before writing it; what this avoids compared to
+    convert_image_format is the BytesIO buffer and the extra getvalue()
+    copy. If the result isn't smaller than the original, it is discarded and
+    the original kept.
+
+    Args:
+        source_path: Image to transcode
+        format: 'webp' or 'avif'
+        quality: Encoder quality (0-100)
+        keep_original: Keep the source file next to the transcoded one
+
+    Returns:
+        Dict with 'source', 'path' (where the image now is), 'original_bytes',
+        'bytes' and 'saved_bytes'
+    """
+    from PIL import Image
+
+    if format not in ENCODERS:
+        raise ValueError(f"Unknown transcode format: {format}")
+    pil_format, _ = ENCODERS[format]
+    output_path = transcoded_path(source_path, format)
+    if os.path.abspath(output_path) == os.path.abspath(source_path):
+        raise ValueError(f"{source_path} is already {format}")
+    part_path = output_path + PARTIAL_SUFFIX
+
+    original_bytes = os.path.getsize(source_path)
+    with Image.open(source_path) as image:
+        options = {'quality': quality}
+        for key in ('icc_profile', 'exif'):
+            if image.info.get(key):
+                options[key] = image.info[key]
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        try:
+            image.save(part_path, format=pil_format, **options)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    transcoded_bytes = os.path.getsize(part_path)
+    if transcoded_bytes >= original_bytes:
+        os.remove(part_path)
+        return {'source': source_path, 'path': source_path, 'original_bytes': original_bytes,
+                'bytes': original_bytes, 'saved_bytes': 0}
+
+    os.replace(part_path, output_path)
+    if not keep_original:
+        try:
+            os.remove(source_path)
+        except FileNotFoundError:
+            pass  # Deleted meanwhile (e.g. evicted), the caller decides what to do with the output
+    return {'source': source_path, 'path': output_path, 'original_bytes': original_bytes,
+            'bytes': transcoded_bytes, 'saved_bytes': original_bytes - transcoded_bytes}
+
+def _lower_priority(niceness):
+    """Process pool initializer: let downloads and the desktop go first"""
+    if niceness and hasattr(os, 'nice'):
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
+
+def _transcode_job(job):
+    source_path, format, quality, keep_original = job
+    try:
+        return transcode_image(source_path, format, quality, keep_original), None
+    except Exception as e:
+        return {'source': source_path}, str(e)
+
+def _report(outcome, error):
+    """Log and meter one finished job, marking failed outcomes with an 'error' key"""
+    if error:
+        outcome['error'] = error
+        metrics.incr('transcodes_total', result='error')
+        logger.error("Error transcoding %s: %s", outcome.get('source'), error)
+    else:
+        metrics.incr('transcodes_total', result='transcoded' if outcome['saved_bytes'] else 'kept')
+        metrics.incr('transcode_saved_bytes_total', outcome['saved_bytes'])
+        logger.info("Transcoded %s to %s, saved %d bytes",
+                    outcome['source'], outcome['path'], outcome['saved_bytes'])
+
+class Transcoder:
+    """
+    Background post-download stage that re-encodes wallpapers to WebP/AVIF
+
+    Jobs run on a bounded pool of low-priority worker processes; submit()
+    returns immediately. Every finished file is reported with the bytes it
+    saved to the on_done callbacks (and the transcode_saved_bytes_total
+    metric).
+    """
+
+    def __init__(self, format=DEFAULT_FORMAT, quality=DEFAULT_TRANSCODE_QUALITY, max_workers=DEFAULT_MAX_WORKERS,
+                 niceness=DEFAULT_NICENESS, keep_original=False, on_done=None):
+        """
+        Args:
+            format: 'webp' or 'avif'
+            quality: Encoder quality (0-100)
+            max_workers: Worker processes
+            niceness: Priority decrease of the worker processes (0 to keep it)
+            keep_original: Keep the source files next to the transcoded ones
+            on_done: Callables called with the result dict of every file
+                (see transcode_image; failed files have an 'error' key)
+        """
+        if format not in ENCODERS:
+            raise ValueError(f"Unknown transcode format: {format}")
+        self.format = format
+        self.quality = quality
+        self.max_workers = max_workers
+        self.niceness = niceness
+        self.keep_original = keep_original
+        self.on_done = list(on_done or [])
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=_lower_priority, initargs=(self.niceness,)
+                )
+            return self._executor
+
+    def submit(self, source_path):
+        """
+        Queue source_path for transcoding
+
+        Returns:
+            Future resolving to the result dict
+        """
+        job = (source_path, self.format, self.quality, self.keep_original)
+        future = self._get_executor().submit(_transcode_job, job)
+        # Resolved only after the on_done callbacks ran, so callers waiting on
+        # it see the catalog etc. already updated
+        result = Future()
+        future.add_done_callback(lambda done: self._finish(done, result, source_path))
+        return result
+
+    def _finish(self, future, result, source_path):
+        try:
+            outcome, error = future.result()
+        except (Exception, CancelledError) as e:
+            # The worker process died or the pool was shut down
+            outcome, error = {'source': source_path}, str(e) or type(e).__name__
+        _report(outcome, error)
+
+        for callback in self.on_done:
+            try:
+                callback(outcome)
+            except Exception as e:
+                logger.error("Error in transcode callback for %s: %s", outcome.get('source'), e)
+        result.set_result(outcome)
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes, waiting for queued files if wait is True"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+def transcode_batch(source_paths, format=DEFAULT_FORMAT, quality=DEFAULT_TRANSCODE_QUALITY, keep_original=False,
+                    max_workers=None, niceness=DEFAULT_NICENESS):
+    """
+    Transcode many images across a low-priority process pool
+
+    Returns:
+        Dict mapping each source path to its result dict (with an 'error'
+        key for failed files)
+    """
+    jobs = [(path, format, quality, keep_original) for path in source_paths]
+    if not jobs:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_lower_priority, initargs=(niceness,)) as executor:
+        outcomes = list(executor.map(_transcode_job, jobs))
+
+    results = {}
+    for (source_path, _, _, _), (outcome, error) in zip(jobs, outcomes):
+        _report(outcome, error)
+        results[source_path] = outcome
+    return results
+
+def transcoder_from_settings(settings, **kwargs):
+    """
+    Build the transcoder described by the settings (ConfigManager.settings)
+
+    Args:
+        settings: Typed settings view
+        **kwargs: Further Transcoder arguments (max_workers, niceness, ...)
+
+    Returns:
+        A Transcoder, or None if transcode_format is empty (keep originals)
+    """
+    format = (settings.transcode_format or '').lower()
+    if not format:
+        return None
+    if format not in TRANSCODE_FORMATS:
+        logger.warning("Unknown transcode format %r, keeping originals", settings.transcode_format)
+        return None
+    quality = settings.transcode_quality
+    if not isinstance(quality, int) or not 0 <= quality <= 100:
+        quality = DEFAULT_TRANSCODE_QUALITY
+    return Transcoder(format, quality, **kwargs)
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class LocalServer:
+    """Serve in-memory payloads over HTTP on localhost for the tests"""
+
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+        self.requests = []
+        self.status_overrides = {}
+        # path -> number of bytes after which the connection is dropped (once)
+        self.truncate_after = {}
+        self.support_ranges = True
+        # Servers that answer a Range request with 206 even when If-Range doesn't match
+        self.honor_if_range = True
+        # path -> start position served for Range requests, to fake broken servers
+        self.range_starts = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def _respond(self, send_body):
+                server.requests.append((self.command, self.path, dict(self.headers)))
+                path = self.path.split('?', 1)[0]
+                status = server.status_overrides.get(path)
+                if status:
+                    self.send_response(status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if path not in server.files:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.files[path]
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                start = 0
+                range_header = self.headers.get('Range')
+                if_range = self.headers.get('If-Range')
+                if if_range and if_range != etag and server.honor_if_range:
+                    range_header = None
+                if range_header and server.support_ranges:
+                    start = int(range_header.split('=', 1)[1].split('-', 1)[0])
+                    start = server.range_starts.get(path, start)
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body) - start))
+                self.end_headers()
+                if not send_body:
+                    return
+                cutoff = server.truncate_after.pop(path, None)
+                if cutoff is not None:
+                    self.wfile.write(body[start:start + cutoff])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:])
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
\ No newline at end of file
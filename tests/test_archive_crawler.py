@@ -0,0 +1,62 @@
+import os
+import tempfile
+import threading
+import unittest
+from src.downloader.archive_crawler import ArchiveCrawler
+from src.downloader.metadata_cache import MetadataCache
+
+ARCHIVE = {
+    'en-US': [
+        {'startdate': '20250405', 'hsh': 'h2', 'urlbase': '/th?id=OHR.Lake_EN-US1', 'title': 'Alpine lake'},
+        {'startdate': '20250404', 'hsh': 'h1', 'urlbase': '/th?id=OHR.Tower_EN-US2', 'title': 'Old tower'},
+    ],
+    'de-DE': [
+        {'startdate': '20250406', 'hsh': 'h3', 'urlbase': '/th?id=OHR.Forest_DE-DE3', 'title': 'Wald'},
+        {'startdate': '20250405', 'hsh': 'other', 'urlbase': '/th?id=OHR.Lake_DE-DE4', 'title': 'Bergsee'},
+    ],
+}
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class TestArchiveCrawler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = MetadataCache(os.path.join(self.tmp.name, 'metadata.json'))
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def requester(self, url, params=None, headers=None, timeout=None):
+        with self.lock:
+            self.calls.append((params['mkt'], params['idx']))
+        return FakeResponse({'images': ARCHIVE[params['mkt']] if params['idx'] == 0 else []})
+
+    def test_merges_markets_and_windows_without_duplicates(self):
+        crawler = ArchiveCrawler(
+            markets=['en-US', 'de-DE'], windows=[(0, 8), (7, 8)],
+            cache=self.cache, requester=self.requester,
+        )
+        catalog = crawler.crawl()
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual([image['startdate'] for image in catalog], ['20250406', '20250405', '20250404'])
+        lake = catalog[1]
+        self.assertEqual(lake['mkt'], 'en-US')
+        self.assertEqual(lake['markets'], ['en-US', 'de-DE'])
+
+    def test_filters_by_category(self):
+        crawler = ArchiveCrawler(markets=['en-US'], windows=[(0, 8)], cache=self.cache, requester=self.requester)
+        self.assertEqual([image['hsh'] for image in crawler.crawl('architecture')], ['h1'])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,40 @@
+import unittest
+from src.downloader.bing_api import classify_many, matches_category
+from src.downloader.category_classifier import CategoryClassifier
+
+class TestCategoryClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = CategoryClassifier(
+            {"all": [], "ocean": ["sea", "beach"], "nature": ["tree", "forest"]},
+            {"nature": ["city"]},
+        )
+
+    def test_matches_whole_words_only(self):
+        self.assertIn("ocean", self.classifier.classify({'title': 'Rough Sea near Dover'}))
+        self.assertNotIn("ocean", self.classifier.classify({'title': 'The holiday season'}))
+
+    def test_matches_plural_forms(self):
+        image = {'title': 'Autumn trees', 'copyright': 'Beaches of Portugal'}
+        self.assertEqual(self.classifier.classify(image), {"all", "ocean", "nature"})
+
+    def test_exclude_keywords_remove_category(self):
+        image = {'title': 'Forest above the city'}
+        self.assertEqual(self.classifier.classify(image), {"all"})
+
+    def test_all_and_unknown_categories_always_match(self):
+        self.assertTrue(self.classifier.matches({}, "all"))
+        self.assertTrue(self.classifier.matches({}, "volcanoes"))
+        self.assertFalse(self.classifier.matches({}, "ocean"))
+
+    def test_bing_api_helpers_use_classifier(self):
+        images = [
+            {'title': 'Lighthouse on the coast', 'copyright': '', 'desc': ''},
+            {'title': 'Grand Canyon at sunset', 'copyright': '', 'desc': ''},
+        ]
+        self.assertTrue(matches_category(images[0], "ocean"))
+        self.assertFalse(matches_category(images[1], "ocean"))
+        self.assertEqual([("ocean" in c) for c in classify_many(images)], [True, False])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.downloader.bing_api import collect_images, fetch_wallpaper_data
+from src.downloader.category_hit_rates import CategoryHitRates, set_default_hit_rates
+from src.downloader.metadata_cache import MetadataCache, set_default_cache
+
+ARCHIVE_DAYS = 15
+
+def archive_image(day):
+    # Every third day is a mountain, the rest are cities
+    subject = 'Mountain peak' if day % 3 == 0 else 'City skyline'
+    return {'url': f'/th?id=Img{day}_1920x1080.jpg', 'hsh': f'h{day}', 'title': subject, 'copyright': subject}
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class TestCategoryHitRates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stats_file = os.path.join(self.tmp.name, 'hit_rates.json')
+        self.saved_cache = set_default_cache(MetadataCache(os.path.join(self.tmp.name, 'metadata.json')))
+        self.calls = []
+
+    def tearDown(self):
+        set_default_cache(self.saved_cache)
+        self.tmp.cleanup()
+
+    def requester(self, url, params=None, **kwargs):
+        # Like Bing: idx is clamped to 7 and at most 8 images are returned
+        idx = min(params['idx'], 7)
+        n = min(params['n'], 8)
+        self.calls.append((params['idx'], params['n']))
+        days = range(idx, min(idx + n, ARCHIVE_DAYS))
+        return FakeResponse({'images': [archive_image(day) for day in days]})
+
+    def test_rates_start_from_the_prior_and_persist(self):
+        rates = CategoryHitRates(self.stats_file)
+        self.assertAlmostEqual(rates.rate('abstract'), 1 / 3)
+        self.assertEqual(rates.rate('all'), 1.0)
+        rates.record('cityscape', seen=97, matched=97)
+        reloaded = CategoryHitRates(self.stats_file)
+        self.assertAlmostEqual(reloaded.rate('cityscape'), 98 / 100)
+        self.assertEqual(reloaded.request_size('cityscape', 2, maximum=8), 4)
+        self.assertEqual(reloaded.request_size('abstract', 5, maximum=8), 8)
+        self.assertEqual(reloaded.request_size('all', 2, maximum=8), 2)
+        self.assertEqual(reloaded.request_size('all', 3, maximum=8), 4)
+
+    def test_old_observations_decay(self):
+        rates = CategoryHitRates(self.stats_file)
+        rates.record('ocean', seen=500, matched=0)
+        rates.record('ocean', seen=10, matched=10)
+        self.assertEqual(rates.stats()['ocean'], {'seen': 255, 'matched': 5})
+
+    def test_rare_category_walks_windows_until_it_has_enough(self):
+        rates = CategoryHitRates(self.stats_file)
+        images = collect_images(5, category='mountains', requester=self.requester, hit_rates=rates)
+        self.assertEqual([image['hsh'] for image in images], ['h0', 'h3', 'h6', 'h9', 'h12'])
+        self.assertEqual(self.calls, [(0, 8), (7, 8)])
+        self.assertAlmostEqual(rates.stats()['mountains']['matched'] / rates.stats()['mountains']['seen'], 5 / 15)
+
+    def test_common_category_requests_only_what_it_needs(self):
+        rates = CategoryHitRates(self.stats_file)
+        rates.record('cityscape', seen=300, matched=200)
+        images = collect_images(2, category='cityscape', requester=self.requester, hit_rates=rates)
+        self.assertEqual([image['hsh'] for image in images], ['h1', 'h2'])
+        self.assertEqual(self.calls, [(0, 4)])
+
+    def test_short_only_when_the_archive_runs_out(self):
+        rates = CategoryHitRates(self.stats_file)
+        images = collect_images(8, category='mountains', requester=self.requester, hit_rates=rates)
+        self.assertEqual(len(images), 5)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_fetch_wallpaper_data_returns_exactly_num(self):
+        previous = set_default_hit_rates(CategoryHitRates(self.stats_file))
+        self.addCleanup(set_default_hit_rates, previous)
+        with mock.patch('src.downloader.metadata_cache.requests.get', self.requester):
+            data = fetch_wallpaper_data(num=3, wallpaper_type='mountains')
+        self.assertEqual([image['hsh'] for image in data['images']], ['h0', 'h3', 'h6'])
+
+if __name__ == '__main__':
+    unittest.main()
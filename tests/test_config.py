@@ -1,4 +1,9 @@
+import json
+import os
+import tempfile
+import threading
 import unittest
+from unittest import mock
 from src.config.config_manager import ConfigManager
 
 class TestConfigManager(unittest.TestCase):
@@ -37,5 +42,103 @@ class TestConfigManager(unittest.TestCase):
     def tearDown(self):
         self.config_manager.save_config({})  # Clear the config after tests
 
+class TestBatchedConfigManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmp.name, 'config.json')
+        self.config_manager = ConfigManager(self.config_file, reload_interval=0)
+        self.config_manager.load_config()
+        self.changes = []
+        self.config_manager.add_listener(self.changes.append)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _on_disk(self):
+        with open(self.config_file) as file:
+            return json.load(file)
+
+    def test_batch_update_writes_once(self):
+        writes = []
+        save_config = self.config_manager.save_config
+        self.config_manager.save_config = lambda: writes.append(1) or save_config()
+        with self.config_manager.batch_update():
+            self.config_manager.set_setting('resolution', '3840x2160')
+            self.config_manager.set_setting('wallpaper_type', 'ocean')
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self._on_disk()['wallpaper_type'], 'ocean')
+        self.assertEqual(self.changes, [{'resolution': '3840x2160', 'wallpaper_type': 'ocean'}])
+
+    def test_failed_batch_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.config_manager.batch_update():
+                self.config_manager.set_setting('resolution', '3840x2160')
+                raise RuntimeError('abort')
+        self.assertEqual(self.config_manager.get_setting('resolution'), '1920x1080')
+        self.assertEqual(self._on_disk()['resolution'], '1920x1080')
+        self.assertEqual(self.changes, [])
+
+    def test_failed_nested_batch_rolls_back_only_itself(self):
+        with self.config_manager.batch_update():
+            self.config_manager.set_setting('wallpaper_type', 'ocean')
+            try:
+                with self.config_manager.batch_update():
+                    self.config_manager.set_setting('resolution', '3840x2160')
+                    raise RuntimeError('abort')
+            except RuntimeError:
+                pass
+        self.assertEqual(self._on_disk()['wallpaper_type'], 'ocean')
+        self.assertEqual(self._on_disk()['resolution'], '1920x1080')
+        self.assertEqual(self.changes, [{'wallpaper_type': 'ocean'}])
+
+    def test_unchanged_values_are_not_written(self):
+        with mock.patch.object(self.config_manager, 'save_config') as save_config:
+            self.assertTrue(self.config_manager.update_settings({'resolution': '1920x1080'}))
+            with self.config_manager.batch_update():
+                self.config_manager.set_setting('resolution', '3840x2160')
+                self.config_manager.set_setting('resolution', '1920x1080')
+        save_config.assert_not_called()
+        self.assertEqual(self.changes, [])
+
+    def test_failed_save_rolls_back_without_notifying(self):
+        with mock.patch.object(self.config_manager, 'save_config', return_value=False):
+            self.assertFalse(self.config_manager.update_settings({'resolution': '3840x2160'}))
+        self.assertEqual(self.changes, [])
+        self.assertEqual(self.config_manager.get_setting('resolution'), '1920x1080')
+        self.assertEqual(self.config_manager.settings.resolution, '1920x1080')
+        self.assertTrue(self.config_manager.update_settings({'resolution': '3840x2160'}))
+        self.assertEqual(self.changes, [{'resolution': '3840x2160'}])
+
+    def test_listeners_run_without_the_lock(self):
+        seen = []
+
+        def listener(changes):
+            # Reading settings from another thread must not block on the reloading thread
+            reader = threading.Thread(target=lambda: seen.append(self.config_manager.settings.resolution))
+            reader.start()
+            reader.join(timeout=5)
+
+        self.config_manager.add_listener(listener)
+        with open(self.config_file, 'w') as file:
+            json.dump({'resolution': '2560x1440'}, file)
+        os.utime(self.config_file, ns=(0, 0))
+        self.assertEqual(self.config_manager.settings.resolution, '2560x1440')
+        self.assertEqual(seen, ['2560x1440'])
+
+    def test_typed_settings_view(self):
+        self.config_manager.update_settings({'daily_download_limit': '6', 'manual_download': 'true'})
+        settings = self.config_manager.settings
+        self.assertEqual(settings.daily_download_limit, 6)
+        self.assertIs(settings.manual_download, True)
+        self.assertIsNone(settings.save_location)
+
+    def test_reloads_when_file_changes(self):
+        with open(self.config_file, 'w') as file:
+            json.dump({'resolution': '2560x1440'}, file)
+        os.utime(self.config_file, ns=(0, 0))
+        self.assertEqual(self.config_manager.get_setting('resolution'), '2560x1440')
+        self.assertEqual(self.changes[-1]['resolution'], '2560x1440')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.config.config_manager import ConfigManager
+from src.downloader.download_quota import MemoryQuota, SQLiteQuota
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from tests.local_server import LocalServer
+
+DAY = 24 * 3600
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _reserve_and_commit(db_file, limit, attempts, results):
+    quota = SQLiteQuota(db_file)
+    granted = 0
+    for _ in range(attempts):
+        token = quota.reserve(limit)
+        if token is not None:
+            quota.commit(token)
+            granted += 1
+    quota.close()
+    results.put(granted)
+
+class TestMemoryQuota(unittest.TestCase):
+
+    def test_reserve_commit_release(self):
+        quota = MemoryQuota()
+        first = quota.reserve(2)
+        second = quota.reserve(2)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(quota.reserve(2))
+        quota.release(second)
+        quota.commit(first)
+        self.assertEqual(quota.used_today(), 1)
+        self.assertIsNotNone(quota.reserve(2))
+
+    def test_resets_on_a_new_day(self):
+        clock = FakeClock()
+        quota = MemoryQuota(clock=clock)
+        quota.commit(quota.reserve(1))
+        self.assertIsNone(quota.reserve(1))
+        clock.now += DAY
+        self.assertEqual(quota.used_today(), 0)
+        self.assertIsNotNone(quota.reserve(1))
+
+class TestSQLiteQuota(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmp.name, 'quota.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_usage_survives_a_restart(self):
+        quota = SQLiteQuota(self.db_file)
+        quota.commit(quota.reserve(3))
+        quota.commit(quota.reserve(3))
+        quota.close()
+
+        reopened = SQLiteQuota(self.db_file)
+        self.assertEqual(reopened.used_today(), 2)
+        self.assertIsNotNone(reopened.reserve(3))
+        self.assertIsNone(reopened.reserve(3))
+        reopened.close()
+
+    def test_released_and_expired_reservations_free_their_slot(self):
+        clock = FakeClock()
+        quota = SQLiteQuota(self.db_file, reservation_ttl=60, clock=clock)
+        token = quota.reserve(1)
+        self.assertIsNone(quota.reserve(1))
+        quota.release(token)
+        self.assertIsNotNone(quota.reserve(1))  # Never committed, as if its worker died
+        self.assertIsNone(quota.reserve(1))
+        clock.now += 61
+        self.assertIsNotNone(quota.reserve(1))
+        quota.close()
+
+    def test_renewed_reservations_outlive_the_ttl(self):
+        clock = FakeClock()
+        quota = SQLiteQuota(self.db_file, reservation_ttl=60, clock=clock)
+        token = quota.reserve(1)
+        clock.now += 50
+        self.assertTrue(quota.renew(token))
+        clock.now += 50
+        self.assertIsNone(quota.reserve(1))
+        clock.now += 61
+        self.assertIsNotNone(quota.reserve(1))
+        self.assertFalse(quota.renew(token))
+        quota.close()
+
+    def test_new_day_starts_from_zero(self):
+        clock = FakeClock()
+        quota = SQLiteQuota(self.db_file, clock=clock)
+        quota.commit(quota.reserve(1))
+        self.assertIsNone(quota.reserve(1))
+        clock.now += DAY
+        self.assertEqual(quota.used_today(), 0)
+        self.assertIsNotNone(quota.reserve(1))
+        quota.close()
+
+    def test_concurrent_processes_never_exceed_the_limit(self):
+        SQLiteQuota(self.db_file).close()
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_reserve_and_commit, args=(self.db_file, 10, 8, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        granted = sum(results.get(timeout=5) for _ in workers)
+        self.assertEqual(granted, 10)
+        self.assertEqual(SQLiteQuota(self.db_file).used_today(), 10)
+
+    def test_downloaders_share_the_limit(self):
+        with LocalServer({f'/img{i}.jpg': bytes([i]) * 1000 for i in range(4)}) as server:
+            first = WallpaperDownloader(download_limit=3, quota=SQLiteQuota(self.db_file))
+            second = WallpaperDownloader(download_limit=3, quota=SQLiteQuota(self.db_file))
+            outcomes = [
+                downloader.download_wallpaper(f'{server.url}/img{i}.jpg', os.path.join(self.tmp.name, f'{i}.jpg'))
+                for i, downloader in enumerate([first, second, first, second])
+            ]
+        self.assertEqual(outcomes, [True, True, True, False])
+        self.assertEqual(first.downloaded_today, 3)
+        self.assertEqual(second.downloaded_today, 3)
+
+    def test_transfers_renew_their_reservation(self):
+        quota = SQLiteQuota(self.db_file)
+        downloader = WallpaperDownloader(download_limit=3, quota=quota)
+        with LocalServer({'/big.jpg': b'x' * (1024 * 1024)}) as server, \
+                mock.patch('src.downloader.wallpaper_downloader.RESERVATION_RENEW_INTERVAL', 0), \
+                mock.patch.object(quota, 'renew', wraps=quota.renew) as renew:
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/big.jpg',
+                                                          os.path.join(self.tmp.name, 'big.jpg')))
+        self.assertTrue(renew.called)
+        quota.close()
+
+    def test_from_settings_shares_the_quota_on_disk(self):
+        config = ConfigManager(os.path.join(self.tmp.name, 'config.json'), reload_interval=0)
+        config.load_config()
+        with mock.patch('src.downloader.wallpaper_downloader.DEFAULT_QUOTA_FILE', self.db_file):
+            downloader = WallpaperDownloader.from_settings(config.settings)
+        self.assertIsInstance(downloader.quota, SQLiteQuota)
+        self.assertEqual(downloader.quota.db_file, self.db_file)
+        downloader.quota.close()
+
+if __name__ == '__main__':
+    unittest.main()
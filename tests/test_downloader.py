@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
 from src.downloader.wallpaper_downloader import WallpaperDownloader
+from src.downloader.wallpaper_store import WallpaperStore
+from tests.local_server import LocalServer
 
 class TestWallpaperDownloader(unittest.TestCase):
 
@@ -21,5 +25,180 @@ class TestWallpaperDownloader(unittest.TestCase):
         result = self.downloader.download_wallpaper()  # Attempt to download again
         self.assertFalse(result)  # Assuming it returns False if limit is exceeded
 
+class TestDownloadMany(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = LocalServer({
+            f'/img{i}.jpg': bytes([i]) * 20000 for i in range(6)
+        }).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def _items(self, count):
+        return [
+            (f'{self.server.url}/img{i}.jpg', os.path.join(self.tmp.name, f'img{i}.jpg'))
+            for i in range(count)
+        ]
+
+    def test_download_many_saves_every_item(self):
+        downloader = WallpaperDownloader(download_limit=10, max_workers=3, per_host_limit=2)
+        results = downloader.download_many(self._items(6))
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(r['success'] for r in results))
+        for i, result in enumerate(results):
+            with open(result['save_path'], 'rb') as f:
+                self.assertEqual(f.read(), bytes([i]) * 20000)
+        self.assertEqual(downloader.downloaded_today, 6)
+
+    def test_download_many_respects_daily_limit(self):
+        downloader = WallpaperDownloader(download_limit=4, max_workers=6)
+        results = downloader.download_many(self._items(6))
+        self.assertEqual(sum(r['success'] for r in results), 4)
+        self.assertEqual(downloader.downloaded_today, 4)
+
+    def test_partial_failure_does_not_abort_batch(self):
+        downloader = WallpaperDownloader(download_limit=10)
+        items = self._items(2) + [(f'{self.server.url}/missing.jpg', os.path.join(self.tmp.name, 'missing.jpg'))]
+        results = downloader.download_many(items)
+        self.assertEqual([r['success'] for r in results], [True, True, False])
+        self.assertIsNotNone(results[2]['error'])
+        # The failed transfer hands its quota slot back
+        self.assertEqual(downloader.downloaded_today, 2)
+
+class TestContentAddressedStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        payload = b'jpeg' * 5000
+        self.server = LocalServer({'/a.jpg': payload, '/b.jpg': payload}).__enter__()
+        self.store = WallpaperStore(os.path.join(self.tmp.name, 'index.sqlite'))
+        self.downloader = WallpaperDownloader(download_limit=10, store=self.store)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_known_url_skips_network(self):
+        url = f'{self.server.url}/a.jpg'
+        self.assertTrue(self.downloader.download_wallpaper(url, self._path('first.jpg')))
+        self.assertTrue(self.downloader.download_wallpaper(url, self._path('second.jpg')))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(os.path.samefile(self._path('first.jpg'), self._path('second.jpg')))
+        self.assertEqual(self.downloader.downloaded_today, 1)
+
+    def test_known_hsh_skips_network(self):
+        self.downloader.download_wallpaper(f'{self.server.url}/a.jpg', self._path('first.jpg'), hsh='abc')
+        self.downloader.download_wallpaper(f'{self.server.url}/b.jpg', self._path('second.jpg'), hsh='abc')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_duplicate_content_is_linked(self):
+        self.downloader.download_wallpaper(f'{self.server.url}/a.jpg', self._path('first.jpg'))
+        self.downloader.download_wallpaper(f'{self.server.url}/b.jpg', self._path('second.jpg'))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(os.path.samefile(self._path('first.jpg'), self._path('second.jpg')))
+
+    def test_overwritten_path_is_not_served_for_its_old_url(self):
+        self.server.files['/b.jpg'] = b'other' * 5000
+        a_url, b_url = f'{self.server.url}/a.jpg', f'{self.server.url}/b.jpg'
+        self.assertTrue(self.downloader.download_wallpaper(a_url, self._path('current.jpg')))
+        self.assertTrue(self.downloader.download_wallpaper(b_url, self._path('current.jpg')))
+        self.assertTrue(self.downloader.download_wallpaper(a_url, self._path('again_a.jpg')))
+        self.assertEqual(len(self.server.requests), 3)
+        with open(self._path('again_a.jpg'), 'rb') as file:
+            self.assertEqual(file.read(), self.server.files['/a.jpg'])
+
+    def test_stored_content_replaces_an_existing_file(self):
+        self.server.files['/b.jpg'] = b'other' * 5000
+        a_url, b_url = f'{self.server.url}/a.jpg', f'{self.server.url}/b.jpg'
+        self.downloader.download_wallpaper(a_url, self._path('first.jpg'))
+        self.downloader.download_wallpaper(b_url, self._path('current.jpg'))
+        self.assertTrue(self.downloader.download_wallpaper(a_url, self._path('current.jpg')))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(os.path.samefile(self._path('first.jpg'), self._path('current.jpg')))
+        self.assertIsNone(self.store.lookup(url=b_url))
+
+    def test_overwritten_canonical_path_hands_over_to_a_link(self):
+        self.server.files['/b.jpg'] = b'other' * 5000
+        a_url, b_url = f'{self.server.url}/a.jpg', f'{self.server.url}/b.jpg'
+        self.downloader.download_wallpaper(a_url, self._path('current.jpg'))
+        self.downloader.download_wallpaper(a_url, self._path('copy.jpg'))
+        self.downloader.download_wallpaper(b_url, self._path('current.jpg'))
+        content_hash = self.store.lookup(url=a_url)
+        self.assertEqual(self.store.path_for(content_hash), self._path('copy.jpg'))
+        self.assertEqual(len(self.server.requests), 2)
+
+class TestResumableDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.payload = os.urandom(300000)
+        self.server = LocalServer({'/uhd.jpg': self.payload}).__enter__()
+        self.url = f'{self.server.url}/uhd.jpg'
+        self.save_path = os.path.join(self.tmp.name, 'uhd.jpg')
+        self.downloader = WallpaperDownloader(download_limit=10)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def test_interrupted_download_leaves_no_file_and_resumes(self):
+        self.server.truncate_after['/uhd.jpg'] = 100000
+        self.assertFalse(self.downloader.download_wallpaper(self.url, self.save_path))
+        self.assertFalse(os.path.exists(self.save_path))
+        resumed_from = os.path.getsize(self.save_path + '.part')
+        self.assertTrue(0 < resumed_from <= 100000)
+
+        self.assertTrue(self.downloader.download_wallpaper(self.url, self.save_path))
+        self.assertEqual(self.server.requests[-1][2].get('Range'), f'bytes={resumed_from}-')
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+        self.assertFalse(os.path.exists(self.save_path + '.part'))
+        self.assertEqual(self.downloader.downloaded_today, 1)
+
+    def test_restarts_when_server_ignores_range(self):
+        with open(self.save_path + '.part', 'wb') as f:
+            f.write(b'stale bytes')
+        self.server.support_ranges = False
+        self.assertTrue(self.downloader.download_wallpaper(self.url, self.save_path))
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+
+    def _interrupt(self):
+        self.server.truncate_after['/uhd.jpg'] = 100000
+        self.assertFalse(self.downloader.download_wallpaper(self.url, self.save_path))
+        self.assertTrue(os.path.exists(self.save_path + '.part.validator'))
+
+    def _assert_restarted_with(self, payload):
+        self.assertTrue(self.downloader.download_wallpaper(self.url, self.save_path))
+        with open(self.save_path, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+        self.assertFalse(os.path.exists(self.save_path + '.part.validator'))
+
+    def test_changed_remote_file_is_not_spliced(self):
+        self._interrupt()
+        changed = os.urandom(300000)
+        self.server.files['/uhd.jpg'] = changed
+        self._assert_restarted_with(changed)
+        self.assertIn('If-Range', self.server.requests[1][2])
+
+    def test_server_ignoring_if_range_is_caught_by_etag(self):
+        self._interrupt()
+        changed = os.urandom(300000)
+        self.server.files['/uhd.jpg'] = changed
+        self.server.honor_if_range = False
+        self._assert_restarted_with(changed)
+
+    def test_misplaced_content_range_restarts(self):
+        self._interrupt()
+        self.server.range_starts['/uhd.jpg'] = 50
+        self._assert_restarted_with(self.payload)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
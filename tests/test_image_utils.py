@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from src.utils.image_utils import generate_derivatives, generate_derivatives_batch, resize_image
+
+class TestImageUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = os.path.join(self.tmp.name, 'bing_original.jpg')
+        Image.linear_gradient('L').resize((1600, 900)).convert('RGB').save(self.original, 'JPEG')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resize_image(self):
+        image = Image.new('RGB', (400, 300))
+        self.assertEqual(resize_image(image, (200, 150)).size, (200, 150))
+
+    def test_generate_derivatives_skips_upscaling(self):
+        results = generate_derivatives(self.original, resolutions=['800x450', '320x240', '3840x2160'])
+        self.assertEqual(set(results), {'800x450', '320x240'})
+        for resolution, path in results.items():
+            with Image.open(path) as image:
+                self.assertEqual('%dx%d' % image.size, resolution)
+
+    def test_crops_do_not_compound(self):
+        # 5:4 then 4:3 from a 16:9 vertical gradient: both keep the full height
+        results = generate_derivatives(self.original, resolutions=['800x640', '640x480'])
+        for path in results.values():
+            with Image.open(path) as image:
+                gray = image.convert('L')
+                top = sum(gray.getpixel((x, 0)) for x in range(gray.width)) / gray.width
+                bottom = sum(gray.getpixel((x, gray.height - 1)) for x in range(gray.width)) / gray.width
+            self.assertLess(top, 4)
+            self.assertGreater(bottom, 251)
+
+    def test_batch_reports_errors_per_item(self):
+        missing = os.path.join(self.tmp.name, 'missing.jpg')
+        output_dir = os.path.join(self.tmp.name, 'derivatives')
+        results = generate_derivatives_batch([self.original, missing], output_dir, ['400x225'], max_workers=2)
+        self.assertIsNone(results[self.original]['error'])
+        self.assertTrue(os.path.exists(results[self.original]['derivatives']['400x225']))
+        self.assertIsNotNone(results[missing]['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import requests
+from src.downloader.metadata_cache import MetadataCache
+
+PARAMS = {'format': 'js', 'idx': 0, 'n': 8, 'mkt': 'en-US'}
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+class FakeRequester:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, url, params=None, headers=None, timeout=None):
+        self.calls.append(headers)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp.name, 'metadata.json')
+        self.data = {'images': [{'title': 'Alpine lake'}]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_entry_is_served_without_network(self):
+        cache = MetadataCache(self.cache_file, ttl=60)
+        requester = FakeRequester(FakeResponse(200, self.data))
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(len(requester.calls), 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_expired_entry_revalidates_with_etag(self):
+        cache = MetadataCache(self.cache_file, ttl=0)
+        requester = FakeRequester(
+            FakeResponse(200, self.data, {'ETag': '"abc"'}),
+            FakeResponse(304),
+        )
+        cache.fetch('url', PARAMS, requester)
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(requester.calls[1]['If-None-Match'], '"abc"')
+        self.assertEqual(cache.stats()['revalidations'], 1)
+
+    def test_stale_entry_served_when_upstream_unreachable(self):
+        cache = MetadataCache(self.cache_file, ttl=0)
+        requester = FakeRequester(
+            FakeResponse(200, self.data),
+            requests.ConnectionError('offline'),
+            FakeResponse(503),
+        )
+        cache.fetch('url', PARAMS, requester)
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(cache.stats()['stale_served'], 2)
+
+    def test_entries_persist_and_are_copied(self):
+        cache = MetadataCache(self.cache_file, ttl=60)
+        data = cache.fetch('url', PARAMS, FakeRequester(FakeResponse(200, self.data)))
+        data['images'].clear()
+
+        reloaded = MetadataCache(self.cache_file, ttl=60)
+        self.assertEqual(reloaded.fetch('url', PARAMS, FakeRequester()), self.data)
+
+    def test_memory_only_cache(self):
+        cache = MetadataCache(cache_file=None, ttl=60)
+        requester = FakeRequester(FakeResponse(200, self.data))
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(cache.fetch('url', PARAMS, requester), self.data)
+        self.assertEqual(len(requester.calls), 1)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from src.utils import metrics as metrics_module
+from src.utils.metrics import MetricsRegistry, enable_metrics
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from tests.local_server import LocalServer
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        registry.incr('downloads_total')
+        registry.observe('download_transfer_seconds', 0.2)
+        with registry.timer('bing_api_fetch_seconds'):
+            pass
+        self.assertEqual(registry.snapshot(), {'counters': {}, 'histograms': {}})
+
+    def test_counters_and_labels(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.incr('downloads_total', result='success')
+        registry.incr('downloads_total', result='success')
+        registry.incr('downloads_total', result='error')
+        registry.incr('download_bytes_total', 1500)
+        counters = registry.snapshot()['counters']
+        self.assertEqual(counters['download_bytes_total'], [{'labels': {}, 'value': 1500}])
+        by_result = {entry['labels']['result']: entry['value'] for entry in counters['downloads_total']}
+        self.assertEqual(by_result, {'success': 2, 'error': 1})
+
+    def test_histogram_snapshot_and_timer(self):
+        registry = MetricsRegistry(enabled=True, buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            registry.observe('download_transfer_seconds', value)
+        with registry.timer('bing_api_fetch_seconds'):
+            pass
+        histograms = registry.snapshot()['histograms']
+        transfer = histograms['download_transfer_seconds'][0]
+        self.assertEqual(transfer['count'], 4)
+        self.assertAlmostEqual(transfer['sum'], 4.05)
+        self.assertEqual(transfer['buckets'], {'0.1': 1, '1.0': 2, '+Inf': 1})
+        self.assertEqual(transfer['p50'], 1.0)
+        self.assertEqual(transfer['max'], 3.0)
+        self.assertEqual(histograms['bing_api_fetch_seconds'][0]['count'], 1)
+
+    def test_prometheus_text(self):
+        registry = MetricsRegistry(enabled=True, buckets=(0.1, 1.0))
+        registry.incr('downloads_total', result='success')
+        registry.observe('download_transfer_seconds', 0.5)
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE downloads_total counter', text)
+        self.assertIn('downloads_total{result="success"} 1', text)
+        self.assertIn('# TYPE download_transfer_seconds histogram', text)
+        self.assertIn('download_transfer_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('download_transfer_seconds_bucket{le="1.0"} 1', text)
+        self.assertIn('download_transfer_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('download_transfer_seconds_count 1', text)
+
+    def test_serve_exposes_both_formats(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.incr('store_hits_total')
+        server = registry.serve(port=0)
+        try:
+            host, port = server.server_address
+            with urllib.request.urlopen(f'http://{host}:{port}/metrics') as response:
+                self.assertIn('store_hits_total 1', response.read().decode())
+            with urllib.request.urlopen(f'http://{host}:{port}/metrics.json') as response:
+                self.assertEqual(json.loads(response.read())['counters']['store_hits_total'][0]['value'], 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+class TestDownloaderMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = LocalServer({'/a.jpg': b'a' * 5000, '/b.jpg': b'b' * 3000}).__enter__()
+        self.was_enabled = metrics_module.metrics.enabled
+        enable_metrics()
+        metrics_module.metrics.reset()
+
+    def tearDown(self):
+        enable_metrics(self.was_enabled)
+        metrics_module.metrics.reset()
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def test_download_records_stages_bytes_and_rejections(self):
+        downloader = WallpaperDownloader(download_limit=1)
+        self.assertTrue(downloader.download_wallpaper(f'{self.server.url}/a.jpg', os.path.join(self.tmp.name, 'a.jpg')))
+        self.assertFalse(downloader.download_wallpaper(f'{self.server.url}/b.jpg', os.path.join(self.tmp.name, 'b.jpg')))
+
+        snapshot = metrics_module.metrics.snapshot()
+        counters = {name: entries[0]['value'] for name, entries in snapshot['counters'].items()}
+        self.assertEqual(counters['download_bytes_total'], 5000)
+        self.assertEqual(counters['download_limit_rejections_total'], 1)
+        self.assertEqual(counters['downloads_total'], 1)
+        self.assertEqual(snapshot['histograms']['download_transfer_seconds'][0]['count'], 1)
+        self.assertEqual(snapshot['histograms']['download_disk_write_seconds'][0]['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from PIL import Image
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from src.downloader.wallpaper_store import WallpaperStore
+from src.utils import perceptual_hash
+from src.utils.perceptual_hash import PerceptualHashIndex, dedupe_directory, dhash, hamming_distance, popcount
+from tests.local_server import LocalServer
+
+def scene(seed, size=(1600, 900)):
+    """A smooth random landscape, different for every seed"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (6, 10, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.BICUBIC)
+
+def jpeg_bytes(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+class TestPerceptualHash(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_survives_rescaling_recompression_and_crops(self):
+        original = scene(1)
+        rescaled = original.resize((800, 450))
+        recompressed = Image.open(io.BytesIO(jpeg_bytes(original, quality=40)))
+        cropped = original.crop((24, 14, 1576, 886))
+        base = dhash(original)
+        for variant in (rescaled, recompressed, cropped):
+            self.assertLessEqual(hamming_distance(base, dhash(variant)), perceptual_hash.DEFAULT_MAX_DISTANCE)
+        self.assertGreater(hamming_distance(base, dhash(scene(2))), perceptual_hash.DEFAULT_MAX_DISTANCE)
+
+    def test_popcount_matches_lookup_fallback(self):
+        values = np.array([0, 1, 0xFF, 2 ** 64 - 1, 0x0F0F0F0F0F0F0F0F], dtype=np.uint64)
+        expected = [bin(int(value)).count('1') for value in values]
+        self.assertEqual(list(popcount(values)), expected)
+        table = perceptual_hash._POPCOUNT_TABLE
+        self.assertEqual(list(table[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)), expected)
+
+    def test_index_query_remove_and_persist(self):
+        index_file = os.path.join(self.tmp.name, 'phash.npz')
+        index = PerceptualHashIndex(index_file)
+        for i in range(100):
+            index.add(f'img{i}.jpg', i * 0x9E3779B97F4A7C15 % 2 ** 64)
+        target = 42 * 0x9E3779B97F4A7C15 % 2 ** 64
+        self.assertEqual(index.query(target ^ 0b101), [('img42.jpg', 2)])
+        self.assertTrue(index.remove('img3.jpg'))
+        self.assertFalse(index.remove('img3.jpg'))
+        index.save()
+
+        reloaded = PerceptualHashIndex(index_file)
+        self.assertEqual(len(reloaded), 99)
+        self.assertNotIn('img3.jpg', reloaded)
+        self.assertEqual(reloaded.query(target), [('img42.jpg', 0)])
+
+    def test_dedupe_directory_keeps_the_largest_version(self):
+        original = scene(7)
+        original.save(os.path.join(self.tmp.name, 'uhd.jpg'), quality=90)
+        original.resize((800, 450)).save(os.path.join(self.tmp.name, 'small.jpg'), quality=70)
+        scene(8).save(os.path.join(self.tmp.name, 'other.jpg'))
+
+        directory = os.path.realpath(self.tmp.name)
+        report = dedupe_directory(self.tmp.name, delete=True, max_workers=2)
+        self.assertEqual(report, [{'keep': os.path.join(directory, 'uhd.jpg'),
+                                   'duplicates': [os.path.join(directory, 'small.jpg')]}])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['other.jpg', 'uhd.jpg'])
+
+    def test_dedupe_directory_matches_relative_and_absolute_spellings(self):
+        library = os.path.join(self.tmp.name, 'w')
+        os.makedirs(library)
+        scene(7).save(os.path.join(library, 'a.jpg'))
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        index = PerceptualHashIndex(index_file=None)
+        index.add(os.path.join('w', 'a.jpg'), dhash(os.path.join('w', 'a.jpg')))
+
+        self.assertEqual(dedupe_directory(os.path.realpath(library), index=index, delete=True, max_workers=1), [])
+        self.assertEqual(os.listdir(library), ['a.jpg'])
+        self.assertEqual(index.paths, [os.path.join('w', 'a.jpg')])
+
+    def test_dedupe_directory_only_deletes_close_matches_inside_directory(self):
+        library = os.path.realpath(os.path.join(self.tmp.name, 'w'))
+        os.makedirs(library)
+        index = PerceptualHashIndex(index_file=None)
+        # a~b and b~c are within 10 bits, a and c are 12 apart
+        for name, size, phash in (('a.jpg', (160, 90), 0), ('b.jpg', (120, 90), 0x3F), ('c.jpg', (80, 60), 0xFFF)):
+            path = os.path.join(library, name)
+            Image.new('RGB', size).save(path)
+            index.add(path, phash)
+        outside = os.path.join(self.tmp.name, 'outside.jpg')
+        Image.new('RGB', (40, 30)).save(outside)
+        index.add(outside, 0)
+
+        report = dedupe_directory(library, index=index, delete=True, max_workers=1)
+        self.assertEqual(report, [{'keep': os.path.join(library, 'a.jpg'),
+                                   'duplicates': [os.path.join(library, 'b.jpg')]}])
+        self.assertEqual(sorted(os.listdir(library)), ['a.jpg', 'c.jpg'])
+        self.assertTrue(os.path.exists(outside))
+        self.assertNotIn(os.path.join(library, 'b.jpg'), index)
+
+    def test_dedupe_directory_leaves_hardlinks_alone(self):
+        path = os.path.join(self.tmp.name, 'a.jpg')
+        scene(7).save(path)
+        os.link(path, os.path.join(self.tmp.name, 'b.jpg'))
+        self.assertEqual(dedupe_directory(self.tmp.name, delete=True, max_workers=1), [])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['a.jpg', 'b.jpg'])
+
+    def test_downloader_rejects_near_duplicates_before_saving(self):
+        original = scene(3)
+        files = {
+            '/uhd.jpg': jpeg_bytes(original),
+            '/hd.jpg': jpeg_bytes(original.resize((960, 540)), quality=60),
+            '/other.jpg': jpeg_bytes(scene(4)),
+        }
+        index = PerceptualHashIndex(os.path.join(self.tmp.name, 'phash.npz'))
+        with LocalServer(files) as server:
+            downloader = WallpaperDownloader(download_limit=2, phash_index=index)
+            paths = {name: os.path.join(self.tmp.name, f'{name}.jpg') for name in ('uhd', 'hd', 'other')}
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/uhd.jpg', paths['uhd']))
+            self.assertFalse(downloader.download_wallpaper(f'{server.url}/hd.jpg', paths['hd']))
+            # The rejected duplicate didn't use up the second slot
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/other.jpg', paths['other']))
+
+        self.assertFalse(os.path.exists(paths['hd']))
+        self.assertFalse(os.path.exists(paths['hd'] + '.part'))
+        self.assertEqual(sorted(PerceptualHashIndex(index.index_file).paths), sorted([paths['uhd'], paths['other']]))
+
+    def test_exact_copies_are_left_to_the_store(self):
+        data = jpeg_bytes(scene(5))
+        index = PerceptualHashIndex(os.path.join(self.tmp.name, 'phash.npz'))
+        store = WallpaperStore(os.path.join(self.tmp.name, 'store.sqlite'))
+        first, second = (os.path.join(self.tmp.name, name) for name in ('first.jpg', 'second.jpg'))
+        with LocalServer({'/a.jpg': data, '/b.jpg': data}) as server:
+            downloader = WallpaperDownloader(download_limit=5, store=store, phash_index=index)
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/a.jpg', first))
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/b.jpg', second))
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertEqual(index.paths, [first])
+        store.close()
+
+    def test_failed_redownload_keeps_the_existing_entry(self):
+        index = PerceptualHashIndex(os.path.join(self.tmp.name, 'phash.npz'))
+        path = os.path.join(self.tmp.name, 'wallpaper.jpg')
+        with LocalServer({'/a.jpg': jpeg_bytes(scene(6))}) as server:
+            downloader = WallpaperDownloader(download_limit=5, phash_index=index)
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/a.jpg', path))
+            server.status_overrides['/a.jpg'] = 500
+            self.assertFalse(downloader.download_wallpaper(f'{server.url}/a.jpg', path))
+        self.assertEqual(index.paths, [path])
+
+    def test_download_many_saves_the_index_once(self):
+        files = {f'/{seed}.jpg': jpeg_bytes(scene(seed)) for seed in range(10, 14)}
+        index = PerceptualHashIndex(os.path.join(self.tmp.name, 'phash.npz'))
+        with LocalServer(files) as server, mock.patch.object(index, 'save', wraps=index.save) as save:
+            downloader = WallpaperDownloader(download_limit=10, phash_index=index)
+            items = [(f'{server.url}{name}', os.path.join(self.tmp.name, name.lstrip('/'))) for name in files]
+            results = downloader.download_many(items)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(len(PerceptualHashIndex(index.index_file)), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+from unittest import mock
+import requests
+from src.downloader.providers.provider_aggregator import ProviderAggregator
+from src.downloader.providers.provider_base import DEFAULT_REQUEST_TIMEOUT, WallpaperProvider, request_deadline
+
+class FakeProvider(WallpaperProvider):
+    def __init__(self, name, delays, fail=False, categories=None):
+        self._name = name
+        self.delays = list(delays)
+        self.fail = fail
+        self.categories = categories or []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def supported_categories(self):
+        return self.categories
+
+    def fetch_wallpapers(self, count=1, category='all', resolution='1920x1080', offset=0):
+        with self._lock:
+            attempt = self.calls
+            self.calls += 1
+        time.sleep(self.delays[min(attempt, len(self.delays) - 1)])
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return [
+            {'url': f'{self.name}/{attempt}/{i}', 'provider': self.name,
+             'resolution': resolution, 'category': category}
+            for i in range(count)
+        ]
+
+class TestProviderAggregator(unittest.TestCase):
+
+    def test_returns_first_results_and_reports_latency(self):
+        fast = FakeProvider('Fast', [0.01])
+        slow = FakeProvider('Slow', [1.0])
+        aggregator = ProviderAggregator([fast, slow])
+        result = aggregator.fetch(count=2, deadline=0.5, hedge_after=None)
+        aggregator.close()
+        self.assertEqual([w['provider'] for w in result['wallpapers']], ['Fast', 'Fast'])
+        self.assertLess(result['latency']['Fast'], 0.5)
+        self.assertIsNone(result['latency']['Slow'])
+        self.assertEqual(result['timed_out'], ['Slow'])
+
+    def test_hedged_request_wins_when_first_is_slow(self):
+        flaky = FakeProvider('Flaky', [1.0, 0.01])
+        aggregator = ProviderAggregator([flaky])
+        started = time.monotonic()
+        result = aggregator.fetch(count=1, deadline=2.0, hedge_after=0.05)
+        aggregator.close()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(flaky.calls, 2)
+        self.assertEqual(result['wallpapers'][0]['url'], 'Flaky/1/0')
+
+    def test_errors_and_unsupported_categories(self):
+        broken = FakeProvider('Broken', [0.0], fail=True)
+        cities = FakeProvider('Cities', [0.0], categories=['cityscape'])
+        nature = FakeProvider('Nature', [0.1], categories=['nature'])
+        aggregator = ProviderAggregator([broken, cities, nature])
+        result = aggregator.fetch(count=1, category='nature', deadline=1.0, hedge_after=None)
+        aggregator.close()
+        self.assertEqual(result['wallpapers'][0]['provider'], 'Nature')
+        self.assertNotIn('Cities', result['latency'])
+        self.assertIn('Broken', result['errors'])
+
+    def test_hung_calls_do_not_starve_the_next_fetch(self):
+        # The first request and its hedge both hang past the deadline
+        provider = FakeProvider('P', [1.0, 1.0, 0.01])
+        aggregator = ProviderAggregator([provider])
+        first = aggregator.fetch(count=1, deadline=0.2, hedge_after=0.02)
+        second = aggregator.fetch(count=1, deadline=0.5, hedge_after=None)
+        aggregator.close()
+        self.assertEqual(first['timed_out'], ['P'])
+        self.assertEqual([w['url'] for w in second['wallpapers']], ['P/2/0'])
+        self.assertEqual(second['timed_out'], [])
+
+    def test_request_timeouts_are_capped_by_the_deadline(self):
+        provider = FakeProvider('Capped', [0.0])
+        provider._session = mock.Mock(**{'request.return_value.status_code': 200})
+        provider._get('https://example.com/a')
+        self.assertEqual(provider._session.request.call_args.kwargs['timeout'], DEFAULT_REQUEST_TIMEOUT)
+        with request_deadline(time.monotonic() + 0.5):
+            provider._get('https://example.com/b', timeout=30)
+            self.assertLessEqual(provider._session.request.call_args.kwargs['timeout'], 0.5)
+        with request_deadline(time.monotonic() - 1), self.assertRaises(requests.Timeout):
+            provider._get('https://example.com/c')
+
+if __name__ == '__main__':
+    unittest.main()
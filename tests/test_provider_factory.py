@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import unittest
+from src.downloader.providers.provider_base import WallpaperProvider
+from src.downloader.providers.provider_factory import ProviderFactory
+
+class DummyProvider(WallpaperProvider):
+    @property
+    def name(self):
+        return "Dummy"
+
+    def fetch_wallpapers(self, count=1, category='all', resolution='1920x1080', offset=0):
+        return []
+
+class TestProviderFactory(unittest.TestCase):
+
+    def test_import_does_not_load_providers(self):
+        code = (
+            "import sys\n"
+            "import src.downloader.providers.provider_factory\n"
+            "print('requests' in sys.modules, any('bing_provider' in m for m in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), 'False False')
+
+    def test_instances_are_cached_with_their_session(self):
+        provider = ProviderFactory.get_provider("Bing")
+        self.assertIs(ProviderFactory.get_provider("Bing"), provider)
+        self.assertIs(provider.session, provider.session)
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            ProviderFactory.get_provider("Pexels")
+
+    def test_register_provider(self):
+        ProviderFactory.register_provider("Dummy", DummyProvider)
+        self.addCleanup(ProviderFactory.unregister_provider, "Dummy")
+        self.assertIn("Dummy", ProviderFactory.available_providers())
+        self.assertIsInstance(ProviderFactory.get_provider("Dummy"), DummyProvider)
+
+    def test_unregister_provider(self):
+        ProviderFactory.register_provider("Dummy", DummyProvider)
+        self.assertTrue(ProviderFactory.unregister_provider("Dummy"))
+        self.assertFalse(ProviderFactory.unregister_provider("Dummy"))
+        self.assertNotIn("Dummy", ProviderFactory.available_providers())
+        with self.assertRaises(ValueError):
+            ProviderFactory.get_provider("Dummy")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from src.downloader.metadata_cache import MetadataCache, set_default_cache
+from src.downloader.providers.bing_provider import BingProvider
+from src.downloader.providers.provider_base import WallpaperProvider
+from src.downloader.providers.unsplash_provider import UnsplashProvider
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+class PagedProvider(WallpaperProvider):
+    """Serves pages of numbered wallpapers, recording when each page is fetched"""
+
+    def __init__(self, pages, delay=0.0):
+        self.pages = pages
+        self.delay = delay
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    @property
+    def name(self):
+        return "Paged"
+
+    def fetch_wallpapers(self, count=1, category='all', resolution='1920x1080', offset=0):
+        time.sleep(self.delay)
+        with self.lock:
+            self.fetched.append((offset, time.monotonic()))
+        if offset >= self.pages:
+            return []
+        return [{'url': f'https://example.com/{offset}-{i}.jpg'} for i in range(count)]
+
+class TestIterWallpapers(unittest.TestCase):
+
+    def test_yields_across_pages_until_the_provider_runs_out(self):
+        provider = PagedProvider(pages=3)
+        urls = [w['url'] for w in provider.iter_wallpapers(page_size=2)]
+        self.assertEqual(len(urls), 6)
+        self.assertEqual(urls[:3], ['https://example.com/0-0.jpg', 'https://example.com/0-1.jpg',
+                                    'https://example.com/1-0.jpg'])
+
+    def test_limit_stops_without_fetching_unneeded_pages(self):
+        provider = PagedProvider(pages=100)
+        self.assertEqual(len(list(provider.iter_wallpapers(limit=5, page_size=5))), 5)
+        time.sleep(0.05)
+        self.assertEqual([offset for offset, _ in provider.fetched], [0])
+
+    def test_next_page_is_prefetched_while_the_consumer_works(self):
+        provider = PagedProvider(pages=3, delay=0.1)
+        iterator = provider.iter_wallpapers(page_size=1)
+        next(iterator)
+        time.sleep(0.25)  # Consumer busy downloading the first wallpaper
+        started = time.monotonic()
+        next(iterator)
+        self.assertLess(time.monotonic() - started, 0.05)
+        iterator.close()
+
+    def test_closing_the_iterator_stops_prefetching(self):
+        provider = PagedProvider(pages=100, delay=0.02)
+        iterator = provider.iter_wallpapers(page_size=1)
+        next(iterator)
+        next(iterator)
+        iterator.close()
+        time.sleep(0.1)
+        self.assertLessEqual(len(provider.fetched), 3)
+
+class TestProviderPaging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_cache = set_default_cache(MetadataCache(os.path.join(self.tmp.name, 'metadata.json')))
+
+    def tearDown(self):
+        set_default_cache(self.saved_cache)
+        self.tmp.cleanup()
+
+    def test_bing_walks_the_archive_windows(self):
+        calls = []
+
+        def requester(url, params=None, **kwargs):
+            calls.append((params['idx'], params['n']))
+            days = range(params['idx'], min(params['idx'] + params['n'], 15))
+            return FakeResponse({'images': [
+                {'url': f'/th?id=Img{day}_1920x1080.jpg', 'urlbase': f'/th?id=Img{day}',
+                 'hsh': f'h{day}', 'title': 'Lake', 'copyright': 'A lake', 'startdate': '20250401'}
+                for day in days
+            ]})
+
+        provider = BingProvider()
+        provider._get = requester
+        hashes = [w['hsh'] for w in provider.iter_wallpapers()]
+        self.assertEqual(calls, [(0, 8), (7, 8)])
+        self.assertEqual(hashes, [f'h{day}' for day in range(15)])
+
+    def test_unsplash_walks_pages_until_total_pages(self):
+        pages = []
+
+        def requester(url, params=None, **kwargs):
+            pages.append(params['page'])
+            return FakeResponse({'total_pages': 2, 'results': [
+                {'description': 'photo', 'urls': {'full': f"https://example.com/{params['page']}-{i}.jpg"}}
+                for i in range(params['per_page'])
+            ]})
+
+        provider = UnsplashProvider()
+        provider._get = requester
+        wallpapers = list(provider.iter_wallpapers(category='nature', page_size=50, api_key='key'))
+        self.assertEqual(pages, [1, 2])
+        self.assertEqual(len(wallpapers), 60)
+
+if __name__ == '__main__':
+    unittest.main()
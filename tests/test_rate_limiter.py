@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, timezone
+import requests
+from src.downloader.providers.rate_limiter import (
+    CircuitBreaker, ProviderUnavailableError, RateLimiter, TokenBucket, parse_retry_after
+)
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.time = FakeTime()
+
+    def make_limiter(self, **kwargs):
+        return RateLimiter(clock=self.time.clock, sleep=self.time.sleep, **kwargs)
+
+    def test_token_bucket_paces_after_burst(self):
+        bucket = TokenBucket(rate=2, capacity=3, clock=self.time.clock, sleep=self.time.sleep)
+        for _ in range(7):
+            bucket.acquire()
+        # 3 burst tokens, then 4 more at 2 per second
+        self.assertAlmostEqual(self.time.now, 2.0)
+
+    def test_retry_after_is_honoured(self):
+        limiter = self.make_limiter(rate=100, burst=100)
+        responses = [FakeResponse(429, {'Retry-After': '7'}), FakeResponse(200)]
+        response = limiter.request(lambda: responses.pop(0))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(7.0, self.time.sleeps)
+
+    def test_server_errors_are_retried_then_returned(self):
+        limiter = self.make_limiter(rate=100, burst=100, max_retries=2, failure_threshold=10)
+        calls = []
+        response = limiter.request(lambda: calls.append(1) or FakeResponse(503))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(calls), 3)
+
+    def test_circuit_breaker_sheds_load_then_recovers(self):
+        limiter = self.make_limiter(rate=100, burst=100, max_retries=0, failure_threshold=2, reset_timeout=30)
+
+        def fail():
+            raise requests.ConnectionError('down')
+
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                limiter.request(fail)
+        with self.assertRaises(ProviderUnavailableError):
+            limiter.request(lambda: FakeResponse(200))
+
+        self.time.now += 31
+        self.assertEqual(limiter.request(lambda: FakeResponse(200)).status_code, 200)
+        self.assertFalse(limiter.breaker.is_open)
+
+    def test_half_open_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=self.time.clock)
+        breaker.record_failure()
+        self.time.now += 11
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+
+    def test_half_open_trial_raising_other_errors_is_settled(self):
+        limiter = self.make_limiter(rate=100, burst=100, max_retries=0, failure_threshold=1, reset_timeout=10)
+
+        def fail():
+            raise requests.ConnectionError('down')
+
+        def redirect_loop():
+            raise requests.TooManyRedirects('loop')
+
+        with self.assertRaises(requests.ConnectionError):
+            limiter.request(fail)
+        self.time.now += 11
+        with self.assertRaises(requests.TooManyRedirects):
+            limiter.request(redirect_loop)
+        self.assertTrue(limiter.breaker.is_open)
+
+        self.time.now += 11
+        self.assertEqual(limiter.request(lambda: FakeResponse(200)).status_code, 200)
+        self.assertFalse(limiter.breaker.is_open)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        now = datetime(2015, 10, 21, 7, 27, tzinfo=timezone.utc)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 -0000', now=now), 60.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from src.downloader.bing_api import get_wallpaper_url
+from src.downloader.providers.bing_provider import BingProvider
+from src.downloader.resolution_resolver import ResolutionResolver, embedded_variant, variant_candidates
+from tests.local_server import LocalServer
+
+IMAGE = {'url': '/img/Lake_EN-US1_1920x1080.jpg&rf=LaDigue_1920x1080.jpg&pid=hp', 'urlbase': '/img/Lake_EN-US1'}
+
+class TestResolutionResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp.name, 'variants.json')
+        self.server = LocalServer({
+            '/img/Lake_EN-US1_1920x1080.jpg': b'hd',
+            '/img/Lake_EN-US1_UHD.jpg': b'uhd',
+        }).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def heads(self):
+        return [path for method, path, _ in self.server.requests if method == 'HEAD']
+
+    def test_candidates_prefer_the_smallest_covering_variant(self):
+        self.assertEqual(variant_candidates('1920x1080'), ['1920x1080', '1920x1200', 'UHD', '1366x768'])
+        self.assertEqual(variant_candidates('2560x1440'), ['UHD', '1920x1200', '1920x1080', '1366x768'])
+        self.assertEqual(variant_candidates('3840x2160')[0], 'UHD')
+        self.assertEqual(embedded_variant(IMAGE['url']), '1920x1080')
+
+    def test_default_variant_is_used_without_probing(self):
+        resolver = ResolutionResolver(self.cache_file)
+        url = resolver.resolve(IMAGE, '1920x1080', base_url=self.server.url)
+        self.assertEqual(url, self.server.url + IMAGE['url'])
+        self.assertEqual(self.heads(), [])
+
+    def test_uhd_is_probed_once_and_cached(self):
+        resolver = ResolutionResolver(self.cache_file)
+        for _ in range(3):
+            self.assertEqual(resolver.resolve(IMAGE, '3840x2160', base_url=self.server.url),
+                             f'{self.server.url}/img/Lake_EN-US1_UHD.jpg')
+        self.assertEqual(self.heads(), ['/img/Lake_EN-US1_UHD.jpg'])
+
+        reloaded = ResolutionResolver(self.cache_file)
+        reloaded.resolve(IMAGE, '2560x1440', base_url=self.server.url)
+        self.assertEqual(len(self.heads()), 1)
+
+    def test_missing_variant_falls_back(self):
+        image = {'url': '/img/Old_EN-US2_1920x1080.jpg', 'urlbase': '/img/Old_EN-US2'}
+        self.server.files['/img/Old_EN-US2_1920x1080.jpg'] = b'hd'
+        resolver = ResolutionResolver(self.cache_file)
+        url = resolver.resolve(image, '3840x2160', base_url=self.server.url)
+        # UHD and 1920x1200 are missing, the next best is the default 1920x1080
+        self.assertEqual(url, self.server.url + image['url'])
+        self.assertEqual(self.heads(), ['/img/Old_EN-US2_UHD.jpg', '/img/Old_EN-US2_1920x1200.jpg'])
+
+    def test_batch_writes_once_and_prunes_expired_entries(self):
+        with open(self.cache_file, 'w') as file:
+            json.dump({'https://old.example/a.jpg': {'available': True, 'checked_at': time.time() - 30 * 24 * 3600}},
+                      file)
+        images = [{'url': f'/img/P{i}_1920x1080.jpg', 'urlbase': f'/img/P{i}'} for i in range(4)]
+        resolver = ResolutionResolver(self.cache_file)
+        with mock.patch('src.downloader.resolution_resolver.os.replace', wraps=os.replace) as replace:
+            resolver.resolve_many(images, '3840x2160', base_url=self.server.url)
+        self.assertEqual(replace.call_count, 1)
+        self.assertEqual(len(self.heads()), 8)
+        with open(self.cache_file) as file:
+            entries = json.load(file)
+        self.assertEqual(len(entries), 8)
+        self.assertNotIn('https://old.example/a.jpg', entries)
+
+    def test_probe_errors_fall_back_to_the_default_url(self):
+        self.server.status_overrides['/img/Lake_EN-US1_UHD.jpg'] = 503
+        resolver = ResolutionResolver(self.cache_file)
+        self.assertEqual(resolver.resolve(IMAGE, '3840x2160', base_url=self.server.url), self.server.url + IMAGE['url'])
+        # Errors aren't cached, the next call probes again
+        del self.server.status_overrides['/img/Lake_EN-US1_UHD.jpg']
+        self.assertTrue(resolver.resolve(IMAGE, '3840x2160', base_url=self.server.url).endswith('_UHD.jpg'))
+
+    def test_get_wallpaper_url_and_provider_use_the_resolver(self):
+        resolver = ResolutionResolver(self.cache_file, requester=lambda url, **kwargs: type('R', (), {'status_code': 200})())
+        self.assertEqual(get_wallpaper_url({'images': [IMAGE]}, '3840x2160', resolver=resolver),
+                         'https://www.bing.com/img/Lake_EN-US1_UHD.jpg')
+        self.assertEqual(get_wallpaper_url({'images': [IMAGE]}),
+                         'https://www.bing.com' + IMAGE['url'])
+
+        provider = BingProvider(resolver=resolver)
+        wallpapers = provider._convert([IMAGE], 'all', '3840x2160')
+        self.assertEqual(wallpapers[0]['url'], 'https://www.bing.com/img/Lake_EN-US1_UHD.jpg')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.config.config_manager import ConfigManager
+from src.downloader.download_quota import MemoryQuota
+from src.downloader.retention_manager import RetentionManager, retention_from_settings
+from src.downloader.wallpaper_catalog import WallpaperCatalog
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from src.downloader.wallpaper_store import WallpaperStore
+from tests.local_server import LocalServer
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+class TestRetentionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.library = os.path.join(self.tmp.name, 'wallpapers')
+        os.makedirs(self.library)
+        self.index_file = os.path.join(self.tmp.name, 'retention.sqlite')
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        self.tmp.cleanup()
+
+    def manager(self, **kwargs):
+        manager = RetentionManager(self.library, self.index_file, clock=FakeClock(), **kwargs)
+        self.managers.append(manager)
+        return manager
+
+    def write(self, name, size=100):
+        path = os.path.join(self.library, name)
+        with open(path, 'wb') as file:
+            file.write(b'x' * size)
+        return path
+
+    def test_totals_follow_records(self):
+        manager = self.manager()
+        a = self.write('a.jpg', 100)
+        manager.record(a)
+        manager.record(self.write('b.jpg', 50))
+        self.assertEqual(manager.usage(), (150, 2))
+        manager.record(a, 300)
+        self.assertEqual(manager.usage(), (350, 2))
+        self.assertTrue(manager.forget(a))
+        self.assertEqual(manager.usage(), (50, 1))
+
+    def test_lru_evicts_least_recently_used(self):
+        manager = self.manager(max_files=2)
+        a, b, c = (self.write(name) for name in ('a.jpg', 'b.jpg', 'c.jpg'))
+        for path in (a, b, c):
+            manager.record(path)
+        manager.touch(a)
+        self.assertEqual(manager.enforce(), [b])
+        self.assertFalse(os.path.exists(b))
+        self.assertEqual(manager.usage(), (200, 2))
+
+    def test_age_policy_ignores_access(self):
+        manager = self.manager(max_bytes=250, policy='age')
+        a, b, c = (self.write(name) for name in ('a.jpg', 'b.jpg', 'c.jpg'))
+        for path in (a, b, c):
+            manager.record(path)
+        manager.touch(a)
+        self.assertEqual(manager.enforce(), [a])
+
+    def test_favorites_are_never_evicted(self):
+        manager = self.manager(max_files=1)
+        a, b, c = (self.write(name) for name in ('a.jpg', 'b.jpg', 'c.jpg'))
+        manager.record(a, favorite=True)
+        manager.record(b)
+        manager.record(c)
+        self.assertTrue(manager.set_favorite(c))
+        self.assertEqual(manager.enforce(), [b])
+        # Still over budget, but only favorites are left
+        self.assertEqual(manager.usage(), (200, 2))
+        self.assertTrue(os.path.exists(a) and os.path.exists(c))
+
+    def test_eviction_spans_batches_and_calls_back(self):
+        evicted = []
+        manager = self.manager(max_files=10, on_evict=[evicted.append])
+        paths = [self.write(f'{i:03d}.jpg', 10) for i in range(150)]
+        for path in paths:
+            manager.record(path)
+        self.assertEqual(manager.enforce(), paths[:140])
+        self.assertEqual(evicted, paths[:140])
+        self.assertEqual(manager.usage(), (100, 10))
+        self.assertEqual(manager.enforce(), [])
+
+    def test_concurrent_enforce_evicts_each_file_once(self):
+        evicted = []
+        manager = self.manager(max_files=10, on_evict=[evicted.append])
+        for i in range(100):
+            manager.record(self.write(f'{i:03d}.jpg', 10))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: manager.enforce(), range(8)))
+        self.assertEqual(sum(len(result) for result in results), 90)
+        self.assertEqual(len(evicted), len(set(evicted)))
+        self.assertEqual(manager.usage(), (100, 10))
+
+    def test_sync_adopts_and_drops_files(self):
+        manager = self.manager()
+        gone = os.path.join(self.library, 'gone.jpg')
+        manager.record(gone, 10)
+        self.write('a.jpg', 100)
+        self.write('notes.txt', 100)
+        self.assertEqual(manager.sync(), (1, 1))
+        self.assertEqual(manager.usage(), (100, 1))
+        self.assertEqual(manager.sync(), (0, 0))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            RetentionManager(self.library, self.index_file, policy='random')
+
+    def test_downloader_enforces_budget(self):
+        catalog = WallpaperCatalog(os.path.join(self.tmp.name, 'catalog.sqlite'))
+        manager = self.manager(max_files=2)
+        downloader = WallpaperDownloader(download_limit=10, catalog=catalog, retention=manager)
+        files = {f'/{i}.jpg': bytes([i]) * 1024 for i in range(3)}
+        with LocalServer(files) as server:
+            for i in range(3):
+                save_path = os.path.join(self.library, f'{i}.jpg')
+                self.assertTrue(downloader.download_wallpaper(f'{server.url}/{i}.jpg', save_path))
+        first = os.path.join(self.library, '0.jpg')
+        self.assertFalse(os.path.exists(first))
+        self.assertIsNone(catalog.get(first))
+        self.assertEqual(manager.usage(), (2048, 2))
+        self.assertEqual(catalog.count(), 2)
+
+    def test_store_hits_count_and_evicted_blobs_are_repointed(self):
+        store = WallpaperStore(os.path.join(self.tmp.name, 'store.sqlite'))
+        manager = self.manager(max_files=1)
+        downloader = WallpaperDownloader(download_limit=10, store=store, retention=manager)
+        first, second, third = (os.path.join(self.library, name) for name in ('1.jpg', '2.jpg', '3.jpg'))
+        with LocalServer({'/a.jpg': b'a' * 1024}) as server:
+            url = f'{server.url}/a.jpg'
+            self.assertTrue(downloader.download_wallpaper(url, first))
+            content_hash = store.lookup(url=url)
+            # The linked copy is budgeted too and pushes the original out
+            self.assertTrue(downloader.download_wallpaper(url, second))
+            self.assertFalse(os.path.exists(first))
+            self.assertEqual(store.path_for(content_hash), second)
+            self.assertEqual(manager.usage(), (1024, 1))
+
+            self.assertTrue(downloader.download_wallpaper(url, third))
+            self.assertEqual(len(server.requests), 1)
+        self.assertEqual(store.path_for(content_hash), third)
+        store.close()
+
+    def test_built_from_settings(self):
+        config = ConfigManager(os.path.join(self.tmp.name, 'config.json'), reload_interval=0)
+        config.load_config()
+        settings = config.settings
+        self.assertEqual((settings.storage_max_bytes, settings.storage_max_files, settings.retention_policy),
+                         (0, 0, 'lru'))
+        self.assertIsNone(WallpaperDownloader.from_settings(settings, quota=MemoryQuota()).retention)
+
+        config.update_settings({'save_location': self.library, 'storage_max_files': 3, 'retention_policy': 'oldest'})
+        manager = retention_from_settings(config.settings, self.index_file)
+        self.managers.append(manager)
+        self.assertEqual((manager.directory, manager.max_files, manager.policy), (self.library, 3, 'lru'))
+
+        downloader = WallpaperDownloader.from_settings(config.settings, retention=manager, quota=MemoryQuota())
+        self.assertIs(downloader.retention, manager)
+        self.assertEqual(downloader.download_limit, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+from src.utils.scheduler import Scheduler, parse_frequency
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp.name, 'scheduler.json')
+        self.clock = FakeClock()
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def callback(self, provider, wallpaper_type, resolution):
+        self.calls.append((provider, wallpaper_type, resolution))
+
+    def make_scheduler(self, **kwargs):
+        return Scheduler(callback=self.callback, state_file=self.state_file, clock=self.clock, **kwargs)
+
+    def test_parse_frequency(self):
+        self.assertEqual(parse_frequency('daily'), 86400)
+        self.assertEqual(parse_frequency('1 second'), 1)
+        self.assertEqual(parse_frequency('15 minutes'), 900)
+        with self.assertRaises(ValueError):
+            parse_frequency('sometimes')
+
+    def test_tasks_fire_when_due_and_coalesce(self):
+        scheduler = self.make_scheduler()
+        scheduler.schedule_download('hourly', 'nature', '1920x1080')
+        scheduler.schedule_download('hourly', 'nature', '1920x1080')
+        scheduler.schedule_download('hourly', 'ocean', '1920x1080')
+        self.assertEqual(scheduler.run_pending(), 0)
+
+        self.clock.now += 3600
+        self.assertEqual(scheduler.run_pending(), 2)
+        self.assertEqual(sorted(self.calls), [
+            ('Bing', 'nature', '1920x1080'),
+            ('Bing', 'ocean', '1920x1080'),
+        ])
+
+        self.clock.now += 3600
+        self.assertEqual(scheduler.run_pending(), 2)
+
+    def test_cancel_schedule(self):
+        scheduler = self.make_scheduler()
+        tasks = [scheduler.schedule_download('1 second', 'all', '1920x1080') for _ in range(5)]
+        for task in tasks[:4]:
+            self.assertTrue(scheduler.cancel_schedule(task))
+        self.assertFalse(scheduler.cancel_schedule(tasks[0]))
+        self.assertEqual(scheduler.get_scheduled_tasks(), [tasks[4]])
+
+        self.clock.now += 1
+        self.assertEqual(scheduler.run_pending(), 1)
+
+    def test_missed_runs_are_caught_up_once(self):
+        scheduler = self.make_scheduler()
+        scheduler.schedule_download('hourly', 'travel', '3840x2160')
+        self.clock.now += 3600
+        scheduler.run_pending()
+
+        # The process is down for a day and starts again
+        self.clock.now += 24 * 3600
+        restarted = self.make_scheduler()
+        restarted.schedule_download('hourly', 'travel', '3840x2160')
+        self.assertEqual(restarted.run_pending(), 1)
+        self.assertEqual(restarted.run_pending(), 0)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_background_thread_fires_tasks(self):
+        fired = threading.Event()
+        scheduler = Scheduler(callback=lambda *args: fired.set(), coalesce_window=0)
+        scheduler.schedule_download(0.05, 'all', '1920x1080')
+        scheduler.start()
+        try:
+            self.assertTrue(fired.wait(2))
+        finally:
+            scheduler.stop(timeout=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from PIL import Image
+from src.utils.thumbnail_cache import ThumbnailCache
+from tests.local_server import LocalServer
+
+def jpeg_bytes(size, color):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, 'JPEG')
+    return output.getvalue()
+
+class TestThumbnailCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'thumbs')
+        self.server = LocalServer({
+            '/full1.jpg': jpeg_bytes((1920, 1080), 'red'),
+            '/small1.jpg': jpeg_bytes((320, 180), 'red'),
+            '/full2.jpg': jpeg_bytes((1920, 1080), 'blue'),
+        }).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def _url(self, path):
+        return self.server.url + path
+
+    def test_repeated_previews_are_served_from_cache(self):
+        cache = ThumbnailCache(self.cache_dir)
+        first = cache.get(self._url('/full1.jpg'), self._url('/small1.jpg'))
+        self.assertEqual(cache.get(self._url('/full1.jpg'), self._url('/small1.jpg')), first)
+        self.assertEqual(len(self.server.requests), 1)
+
+        reopened = ThumbnailCache(self.cache_dir)
+        self.assertEqual(reopened.get(self._url('/full1.jpg')), first)
+        self.assertEqual(reopened.stats()['disk_hits'], 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_generates_thumbnail_when_no_variant(self):
+        cache = ThumbnailCache(self.cache_dir)
+        data = cache.get(self._url('/full2.jpg'), self._url('/missing_320x180.jpg'))
+        with Image.open(BytesIO(data)) as image:
+            self.assertLessEqual(image.size[0], 320)
+
+    def test_evicts_least_recently_used_over_budget(self):
+        cache = ThumbnailCache(self.cache_dir, max_bytes=1, memory_items=0)
+        cache.get(self._url('/full1.jpg'), self._url('/small1.jpg'))
+        cache.get(self._url('/full2.jpg'))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertEqual(cache.stats()['disk_items'], 1)
+
+    def test_get_previews_keeps_order_and_count(self):
+        cache = ThumbnailCache(self.cache_dir)
+        items = [
+            {'url': self._url('/full1.jpg'), 'thumbnail_url': self._url('/small1.jpg')},
+            {'url': self._url('/missing.jpg')},
+            {'url': self._url('/full2.jpg')},
+        ]
+        previews = cache.get_previews(items, count=2)
+        self.assertEqual(len(previews), 2)
+        self.assertIsNotNone(previews[0])
+        self.assertIsNone(previews[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from PIL import Image, features
+from src.config.config_manager import ConfigManager
+from src.downloader.download_quota import MemoryQuota
+from src.downloader.retention_manager import RetentionManager
+from src.downloader.wallpaper_catalog import WallpaperCatalog
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from src.utils.metrics import MetricsRegistry
+from src.utils.transcoder import Transcoder, transcode_batch, transcode_image, transcoder_from_settings
+from tests.local_server import LocalServer
+
+def photo_bytes(quality=95, size=(480, 270)):
+    # A smooth gradient with mild noise compresses like a photo
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, size[0])
+    y = np.linspace(0, 255, size[1])[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 6, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+class TestTranscoder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_transcode_replaces_original_and_reports_savings(self):
+        source = self.write('a.jpg', photo_bytes())
+        original_bytes = os.path.getsize(source)
+        result = transcode_image(source, 'webp', quality=75)
+        self.assertEqual(result['path'], os.path.join(self.tmp.name, 'a.webp'))
+        self.assertFalse(os.path.exists(source))
+        self.assertFalse(os.path.exists(result['path'] + '.part'))
+        self.assertEqual(result['original_bytes'], original_bytes)
+        self.assertEqual(result['bytes'], os.path.getsize(result['path']))
+        self.assertEqual(result['saved_bytes'], original_bytes - result['bytes'])
+        self.assertGreater(result['saved_bytes'], 0)
+        with Image.open(result['path']) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (480, 270)))
+
+    def test_larger_result_keeps_the_original(self):
+        buffer = io.BytesIO()
+        with Image.open(io.BytesIO(photo_bytes())) as image:
+            image.save(buffer, 'WEBP', quality=5)
+        source = self.write('b.jpg', buffer.getvalue())
+        result = transcode_image(source, 'webp', quality=100)
+        self.assertEqual((result['path'], result['saved_bytes']), (source, 0))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['b.jpg'])
+
+    @unittest.skipUnless(features.check('avif'), "Pillow built without AVIF")
+    def test_avif_keeping_original(self):
+        source = self.write('c.jpg', photo_bytes())
+        result = transcode_image(source, 'avif', quality=60, keep_original=True)
+        self.assertTrue(result['path'].endswith('.avif'))
+        self.assertTrue(os.path.exists(source))
+
+    def test_batch_reports_errors(self):
+        good = self.write('d.jpg', photo_bytes())
+        bad = self.write('e.jpg', b'not an image')
+        registry = MetricsRegistry(enabled=True)
+        with mock.patch('src.utils.transcoder.metrics', registry), \
+                self.assertLogs('src.utils.transcoder', level='ERROR'):
+            results = transcode_batch([good, bad], max_workers=2)
+        counters = registry.snapshot()['counters']
+        self.assertGreater(results[good]['saved_bytes'], 0)
+        self.assertIn('error', results[bad])
+        self.assertTrue(os.path.exists(bad))
+        self.assertEqual(counters['transcode_saved_bytes_total'][0]['value'], results[good]['saved_bytes'])
+
+    def test_downloader_queues_downloads_and_indexes_follow(self):
+        catalog = WallpaperCatalog(os.path.join(self.tmp.name, 'catalog.sqlite'))
+        retention = RetentionManager(self.tmp.name, os.path.join(self.tmp.name, 'retention.sqlite'))
+        reported = []
+        transcoder = Transcoder('webp', quality=75, max_workers=1, on_done=[reported.append])
+        downloader = WallpaperDownloader(catalog=catalog, retention=retention, transcoder=transcoder)
+        try:
+            with LocalServer({'/img.jpg': photo_bytes()}) as server:
+                save_path = os.path.join(self.tmp.name, 'img.jpg')
+                self.assertTrue(downloader.download_wallpaper(f'{server.url}/img.jpg', save_path,
+                                                              metadata={'title': 'Lake'}))
+            transcoder.shutdown(wait=True)
+        finally:
+            transcoder.shutdown(wait=False)
+
+        webp_path = os.path.join(self.tmp.name, 'img.webp')
+        self.assertEqual([result['path'] for result in reported], [webp_path])
+        self.assertIsNone(catalog.get(save_path))
+        entry = catalog.get(webp_path)
+        self.assertEqual((entry['title'], entry['size']), ('Lake', os.path.getsize(webp_path)))
+        self.assertEqual(retention.usage(), (os.path.getsize(webp_path), 1))
+        retention.close()
+        catalog.close()
+
+    def test_output_of_an_evicted_original_is_discarded(self):
+        retention = RetentionManager(self.tmp.name, os.path.join(self.tmp.name, 'retention.sqlite'))
+        downloader = WallpaperDownloader(retention=retention)
+        source = self.write('gone.jpg', photo_bytes())
+        retention.record(source)
+        retention.forget(source)
+        os.remove(source)
+        output = self.write('gone.webp', b'webp')
+        downloader._transcoded({'source': source, 'path': output, 'original_bytes': 10, 'bytes': 4,
+                                'saved_bytes': 6})
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual(retention.usage(), (0, 0))
+        retention.close()
+
+    def test_built_from_settings(self):
+        config = ConfigManager(os.path.join(self.tmp.name, 'config.json'), reload_interval=0)
+        config.load_config()
+        self.assertEqual((config.settings.transcode_format, config.settings.transcode_quality), ('', 80))
+        self.assertIsNone(transcoder_from_settings(config.settings))
+        self.assertIsNone(WallpaperDownloader.from_settings(config.settings, quota=MemoryQuota()).transcoder)
+
+        config.update_settings({'transcode_format': 'WebP', 'transcode_quality': 150})
+        transcoder = transcoder_from_settings(config.settings, max_workers=1)
+        self.assertEqual((transcoder.format, transcoder.quality, transcoder.max_workers), ('webp', 80, 1))
+        config.update_settings({'transcode_format': 'jpegxl'})
+        self.assertIsNone(transcoder_from_settings(config.settings))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.downloader.bing_api import image_metadata
+from src.downloader.wallpaper_catalog import WallpaperCatalog
+from src.downloader.wallpaper_downloader import WallpaperDownloader
+from tests.local_server import LocalServer
+
+def bing_image(day, title, copyright):
+    return {
+        'startdate': f'202504{day:02d}',
+        'title': title,
+        'copyright': copyright,
+        'desc': f'Story for {title}',
+        'hsh': f'hsh{day}',
+    }
+
+class TestWallpaperCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.catalog = WallpaperCatalog(os.path.join(self.tmp.name, 'catalog.sqlite'))
+        entries = [
+            (1, 'Alpine lake at dawn', 'Lake Louise, Canada (© Jane Doe)', 'nature', '1920x1080'),
+            (2, 'Château on the hill', 'Loire Valley, France (© John Roe)', 'architecture', '3840x2160'),
+            (3, 'Coral reef', 'Great Barrier Reef, Australia (© Ann Poe)', 'ocean', '1920x1080'),
+        ]
+        for day, title, copyright, category, resolution in entries:
+            metadata = image_metadata(bing_image(day, title, copyright), category=category, resolution=resolution)
+            self.catalog.add(os.path.join(self.tmp.name, f'{day}.jpg'), metadata, url=f'https://example.com/{day}.jpg')
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def test_add_stores_metadata_and_dimensions(self):
+        entry = self.catalog.get(os.path.join(self.tmp.name, '2.jpg'))
+        self.assertEqual(entry['title'], 'Château on the hill')
+        self.assertEqual(entry['date'], '2025-04-02')
+        self.assertEqual(entry['provider'], 'Bing')
+        self.assertEqual((entry['width'], entry['height']), (3840, 2160))
+        self.assertEqual(entry['hsh'], 'hsh2')
+
+    def test_search_title_and_copyright(self):
+        self.assertEqual([e['title'] for e in self.catalog.search('lake')], ['Alpine lake at dawn'])
+        self.assertEqual([e['title'] for e in self.catalog.search('france')], ['Château on the hill'])
+        # Diacritics are folded and prefixes match
+        self.assertEqual([e['title'] for e in self.catalog.search('chat')], ['Château on the hill'])
+        self.assertEqual(self.catalog.search('reef', category='nature'), [])
+        self.assertEqual(self.catalog.search('"unbalanced'), [])
+
+    def test_list_filters_and_order(self):
+        self.assertEqual([e['date'] for e in self.catalog.list()], ['2025-04-03', '2025-04-02', '2025-04-01'])
+        self.assertEqual([e['category'] for e in self.catalog.list(resolution='1920x1080')], ['ocean', 'nature'])
+        self.assertEqual([e['category'] for e in self.catalog.list(min_width=2560)], ['architecture'])
+        self.assertEqual(self.catalog.count(since='2025-04-02'), 2)
+        self.assertEqual(len(self.catalog.list(limit=1, offset=2)), 1)
+        with self.assertRaises(ValueError):
+            self.catalog.list(colour='blue')
+
+    def test_update_and_remove_keep_search_in_sync(self):
+        path = os.path.join(self.tmp.name, '1.jpg')
+        self.catalog.add(path, {'title': 'Frozen waterfall', 'resolution': '1920x1080'})
+        self.assertEqual(self.catalog.search('alpine'), [])
+        self.assertEqual(len(self.catalog.search('waterfall')), 1)
+        self.assertTrue(self.catalog.remove(path))
+        self.assertEqual(self.catalog.search('waterfall'), [])
+        self.assertEqual(self.catalog.count(), 2)
+
+    def test_re_adding_keeps_added_at(self):
+        path = os.path.join(self.tmp.name, '3.jpg')
+        added_at = self.catalog.get(path)['added_at']
+        with mock.patch('src.downloader.wallpaper_catalog.time.time', return_value=added_at + 3600):
+            self.catalog.add(path, {'title': 'Coral reef at night', 'resolution': '1920x1080'})
+        entry = self.catalog.get(path)
+        self.assertEqual((entry['title'], entry['added_at']), ('Coral reef at night', added_at))
+
+    def test_downloader_records_downloads(self):
+        with LocalServer({'/img.jpg': b'x' * 2048}) as server:
+            downloader = WallpaperDownloader(download_limit=5, catalog=self.catalog)
+            save_path = os.path.join(self.tmp.name, 'downloaded.jpg')
+            metadata = image_metadata(bing_image(5, 'Desert dunes', 'Sahara (© Sam Loe)'), resolution='1920x1080')
+            self.assertTrue(downloader.download_wallpaper(f'{server.url}/img.jpg', save_path, metadata=metadata))
+
+        entry = self.catalog.get(save_path)
+        self.assertEqual(entry['url'], f'{server.url}/img.jpg')
+        self.assertEqual(entry['size'], 2048)
+        self.assertEqual(len(entry['content_hash']), 64)
+        self.assertEqual(self.catalog.search('sahara')[0]['path'], save_path)
+
+if __name__ == '__main__':
+    unittest.main()